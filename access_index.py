@@ -0,0 +1,77 @@
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping
+
+EMPTY: FrozenSet[str] = frozenset()
+
+
+def normalize_user_id(user_id: Any) -> str:
+    """Приводить ID користувача до вигляду, у якому він зберігається в routers.json"""
+    return str(user_id).strip()
+
+
+class AccessIndex:
+    """
+    Індекс доступу, що будується разом зі знімком конфігурації.
+
+    Зберігає для кожного роутера множину користувачів, а для кожного
+    користувача - множину роутерів, тож перевірка доступу виконується за O(1),
+    а список роутерів користувача - за O(k). Індекс незмінний: після зміни
+    конфігурації updated() створює новий, перераховуючи лише змінені роутери.
+    """
+
+    __slots__ = ('_router_users', '_user_routers', '_order')
+
+    def __init__(self, router_users: Dict[str, FrozenSet[str]],
+                 user_routers: Dict[str, FrozenSet[str]], order: Dict[str, int]):
+        self._router_users = router_users
+        self._user_routers = user_routers
+        self._order = order
+
+    @staticmethod
+    def _order_of(routers: Mapping[str, FrozenSet[str]]) -> Dict[str, int]:
+        """Порядок роутерів у routers.json (для стабільного порядку списків)"""
+        return {name: position for position, name in enumerate(routers)}
+
+    @classmethod
+    def build(cls, routers: Mapping[str, FrozenSet[str]]) -> 'AccessIndex':
+        """Будує індекс з нуля за користувачами кожного роутера"""
+        router_users = {}
+        user_routers: Dict[str, set] = {}
+        for router_name, users in routers.items():
+            router_users[router_name] = users
+            for user_id in users:
+                user_routers.setdefault(user_id, set()).add(router_name)
+
+        return cls(router_users,
+                   {user_id: frozenset(names) for user_id, names in user_routers.items()},
+                   cls._order_of(routers))
+
+    def updated(self, routers: Mapping[str, FrozenSet[str]], changed: Iterable[str]) -> 'AccessIndex':
+        """Створює індекс для нової версії конфігурації, перераховуючи лише змінені роутери"""
+        router_users = dict(self._router_users)
+        user_routers = dict(self._user_routers)
+
+        for router_name in changed:
+            old_users = router_users.pop(router_name, EMPTY)
+            new_users = routers.get(router_name, EMPTY)
+            if router_name in routers:
+                router_users[router_name] = new_users
+
+            for user_id in old_users - new_users:
+                remaining = user_routers.get(user_id, EMPTY) - {router_name}
+                if remaining:
+                    user_routers[user_id] = remaining
+                else:
+                    user_routers.pop(user_id, None)
+            for user_id in new_users - old_users:
+                user_routers[user_id] = user_routers.get(user_id, EMPTY) | {router_name}
+
+        return AccessIndex(router_users, user_routers, self._order_of(routers))
+
+    def has_access(self, user_id: Any, router_name: str) -> bool:
+        """Чи має користувач доступ до роутера"""
+        return normalize_user_id(user_id) in self._router_users.get(router_name, EMPTY)
+
+    def get_user_routers(self, user_id: Any) -> List[str]:
+        """Роутери, доступні користувачу, у порядку routers.json"""
+        names = self._user_routers.get(normalize_user_id(user_id), EMPTY)
+        return sorted(names, key=self._order.__getitem__)
@@ -1,15 +1,23 @@
-import json
 import logging
-from typing import Dict, List, Tuple, Any, Optional
+from typing import Dict, List, Optional, Tuple, Any
 from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
+from config_store import ConfigStore, peek_router, router_users
+from keyboard_utils import KeyboardCache
+from bulk_provisioning import ProvisioningRow, ROW_APPLIED, ROW_UNCHANGED, ROW_INVALID
 from router_manager import RouterManager
+from router_model import Router
 
 class AccessManager:
     """Клас для управління доступом користувачів до роутерів"""
     
-    def __init__(self, config_file: str):
-        self.config_file = config_file
-        self.router_manager = RouterManager(config_file)
+    def __init__(self, store: ConfigStore, keyboard_cache: Optional[KeyboardCache] = None):
+        """
+        :param store: Спільне сховище routers.json (те саме, що й у RouterManager бота)
+        :param keyboard_cache: Кеш клавіатур роутерів (скидається при зміні роутера)
+        """
+        self.store = store
+        self.router_manager = RouterManager(store)
+        self.keyboard_cache = keyboard_cache if keyboard_cache is not None else KeyboardCache()
     
     def is_admin(self, user_id: int) -> bool:
         """Перевіряє, чи є користувач адміністратором"""
@@ -29,27 +37,14 @@ class AccessManager:
     def add_user_access(self, router_name: str, user_id: str) -> Tuple[bool, str]:
         """Додає користувача до списку дозволених для роутера"""
         try:
-            # Отримуємо поточні дані через router_manager
-            routers = self.router_manager.get_routers()
-            
-            if router_name not in routers:
+            router = self.router_manager.get_router(router_name)
+            if not router:
                 return False, f"Роутер '{router_name}' не знайдено"
             
-            if 'allowed_users' not in routers[router_name]:
-                routers[router_name]['allowed_users'] = []
-            
-            if user_id in routers[router_name]['allowed_users']:
+            # Зміна зберігається одним записом і публікується новою версією конфігурації
+            if user_id in router.allowed_users or not self.store.add_item(router_name, 'allowed_users', user_id):
                 return False, f"Користувач {user_id} вже має доступ до роутера '{router_name}'"
             
-            # Додаємо користувача
-            routers[router_name]['allowed_users'].append(user_id)
-            
-            # Зберігаємо зміни в файл
-            self._save_routers_to_file(routers)
-            
-            # Очищаємо кеш для оновлення даних
-            self.router_manager.clear_cache()
-            
             logging.info(f"Користувач {user_id} додано до роутера {router_name}")
             return True, f"Користувач {user_id} успішно додано до роутера '{router_name}'"
             
@@ -60,27 +55,13 @@ class AccessManager:
     def remove_user_access(self, router_name: str, user_id: str) -> Tuple[bool, str]:
         """Видаляє користувача зі списку дозволених для роутера"""
         try:
-            # Отримуємо поточні дані через router_manager
-            routers = self.router_manager.get_routers()
-            
-            if router_name not in routers:
+            router = self.router_manager.get_router(router_name)
+            if not router:
                 return False, f"Роутер '{router_name}' не знайдено"
             
-            if 'allowed_users' not in routers[router_name]:
-                return False, f"У роутера '{router_name}' немає списку дозволених користувачів"
-            
-            if user_id not in routers[router_name]['allowed_users']:
+            if user_id not in router.allowed_users or not self.store.remove_item(router_name, 'allowed_users', user_id):
                 return False, f"Користувач {user_id} не має доступу до роутера '{router_name}'"
             
-            # Видаляємо користувача
-            routers[router_name]['allowed_users'].remove(user_id)
-            
-            # Зберігаємо зміни в файл
-            self._save_routers_to_file(routers)
-            
-            # Очищаємо кеш для оновлення даних
-            self.router_manager.clear_cache()
-            
             logging.info(f"Користувач {user_id} видалено з роутера {router_name}")
             return True, f"Користувач {user_id} успішно видалено з роутера '{router_name}'"
             
@@ -95,29 +76,25 @@ class AccessManager:
             if not router:
                 return False, []
             
-            return True, router.get('allowed_users', [])
+            return True, sorted(router.allowed_users)
             
         except Exception as e:
             logging.error(f"Помилка отримання користувачів роутера {router_name}: {e}")
             return False, []
     
     def get_all_routers_info(self) -> Dict[str, Dict]:
-        """Отримує інформацію про всі роутери та їх користувачів через кеш"""
+        """
+        Отримує інформацію про всі роутери та їх користувачів через кеш.
+
+        Користувачі беруться з індексу доступу знімка. Для routers.d IP та
+        скрипти відомі лише для роутерів, модель яких вже завантажена (інакше
+        None): перелік не читає файл кожного роутера.
+        """
         try:
-            routers = self.router_manager.get_routers()
-            
+            models = self.store.get_snapshot().models
             routers_info = {}
-            for router_name, router_data in routers.items():
-                # Пропускаємо секцію адміністраторів та інші не-роутери
-                if router_name == 'admins' or not isinstance(router_data, dict):
-                    continue
-                
-                routers_info[router_name] = {
-                    'ip': router_data.get('ip', 'N/A'),
-                    'scripts': router_data.get('scripts', []),
-                    'users_count': len(router_data.get('allowed_users', [])),
-                    'allowed_users': router_data.get('allowed_users', [])
-                }
+            for router_name, users in router_users(models).items():
+                routers_info[router_name] = self._router_info(peek_router(models, router_name), users)
             
             return routers_info
             
@@ -125,24 +102,28 @@ class AccessManager:
             logging.error(f"Помилка отримання інформації про роутери: {e}")
             return {}
     
+    def get_router_info(self, router_name: str) -> Optional[Dict]:
+        """Отримує інформацію про один роутер (None - роутера немає або запис некоректний)"""
+        router = self.router_manager.get_router(router_name)
+        return self._router_info(router, router.allowed_users) if router else None
+    
+    @staticmethod
+    def _router_info(router: Optional[Router], users) -> Dict:
+        return {
+            'ip': router.ip if router else None,
+            'scripts': router.scripts if router else None,
+            'users_count': len(users),
+            'allowed_users': sorted(users)
+        }
+    
     def create_management_keyboard(self) -> InlineKeyboardMarkup:
         """Створює клавіатуру для управління доступом - одразу показує роутери"""
         keyboard = InlineKeyboardMarkup(row_width=1)
         
-        # Отримуємо список роутерів через кеш
-        routers = self.router_manager.get_routers()
-        
-        for router_name, router_data in routers.items():
-            # Пропускаємо секцію адміністраторів та інші не-роутери
-            if router_name == 'admins' or not isinstance(router_data, dict):
-                continue
-            
-            # Отримуємо додаткову інформацію про роутер
-            ip = router_data.get('ip', 'N/A')
-            users_count = len(router_data.get('allowed_users', []))
-            
+        # Отримуємо список роутерів з поточної версії конфігурації
+        for router_name, info in self.get_all_routers_info().items():
             # Створюємо текст кнопки з інформацією
-            button_text = f"🌐 {router_name}\n📡 {ip} | 👥 {users_count}"
+            button_text = f"🌐 {router_name}\n📡 {info['ip'] or '—'} | 👥 {info['users_count']}"
             
             keyboard.add(
                 InlineKeyboardButton(
@@ -155,6 +136,9 @@ class AccessManager:
         keyboard.add(
             InlineKeyboardButton("📊 Статистика", callback_data="access_stats")
         )
+        keyboard.add(
+            InlineKeyboardButton("📥 Масові зміни доступу", callback_data="access_bulk")
+        )
         keyboard.add(
             InlineKeyboardButton("🔄 Оновити кеш", callback_data="access_refresh_cache")
         )
@@ -162,7 +146,11 @@ class AccessManager:
         return keyboard
     
     def create_router_management_keyboard(self, router_name: str) -> InlineKeyboardMarkup:
-        """Створює клавіатуру для управління конкретним роутером"""
+        """Створює клавіатуру для управління конкретним роутером (з кешу клавіатур)"""
+        return self.keyboard_cache.get(router_name, 'access',
+                                       lambda: self._build_router_management_keyboard(router_name))
+    
+    def _build_router_management_keyboard(self, router_name: str) -> InlineKeyboardMarkup:
         keyboard = InlineKeyboardMarkup(row_width=1)
         
         # Отримуємо дані роутера через кеш
@@ -171,8 +159,8 @@ class AccessManager:
             return keyboard
         
         # Отримуємо кількість користувачів та скриптів
-        users_count = len(router.get('allowed_users', []))
-        scripts_count = len(router.get('scripts', []))
+        users_count = len(router.allowed_users)
+        scripts_count = len(router.scripts)
         
         # Кнопки управління користувачами
         keyboard.add(
@@ -201,6 +189,11 @@ class AccessManager:
             InlineKeyboardButton("➖ Видалити скрипт", callback_data=f"access_removescript_{router_name}")
         )
         
+        # Запуски за розкладом
+        keyboard.add(
+            InlineKeyboardButton("🗓 Розклад запусків", callback_data=f"access_schedules_{router_name}")
+        )
+        
         # Кнопка оновлення кешу для конкретного роутера
         keyboard.add(
             InlineKeyboardButton("🔄 Оновити кеш роутера", callback_data=f"access_refresh_router_{router_name}")
@@ -216,27 +209,13 @@ class AccessManager:
     def add_script_to_router(self, router_name: str, script_name: str) -> Tuple[bool, str]:
         """Додає скрипт до роутера"""
         try:
-            # Отримуємо поточні дані через router_manager
-            routers = self.router_manager.get_routers()
-            
-            if router_name not in routers:
+            router = self.router_manager.get_router(router_name)
+            if not router:
                 return False, f"Роутер '{router_name}' не знайдено"
             
-            if 'scripts' not in routers[router_name]:
-                routers[router_name]['scripts'] = []
-            
-            if script_name in routers[router_name]['scripts']:
+            if script_name in router.scripts or not self.store.add_item(router_name, 'scripts', script_name):
                 return False, f"Скрипт '{script_name}' вже існує в роутері '{router_name}'"
             
-            # Додаємо скрипт
-            routers[router_name]['scripts'].append(script_name)
-            
-            # Зберігаємо зміни в файл
-            self._save_routers_to_file(routers)
-            
-            # Очищаємо кеш для оновлення даних
-            self.router_manager.clear_cache()
-            
             logging.info(f"Скрипт '{script_name}' додано до роутера {router_name}")
             return True, f"Скрипт '{script_name}' успішно додано до роутера '{router_name}'"
             
@@ -247,27 +226,13 @@ class AccessManager:
     def remove_script_from_router(self, router_name: str, script_name: str) -> Tuple[bool, str]:
         """Видаляє скрипт з роутера"""
         try:
-            # Отримуємо поточні дані через router_manager
-            routers = self.router_manager.get_routers()
-            
-            if router_name not in routers:
+            router = self.router_manager.get_router(router_name)
+            if not router:
                 return False, f"Роутер '{router_name}' не знайдено"
             
-            if 'scripts' not in routers[router_name]:
-                return False, f"У роутера '{router_name}' немає списку скриптів"
-            
-            if script_name not in routers[router_name]['scripts']:
+            if script_name not in router.scripts or not self.store.remove_item(router_name, 'scripts', script_name):
                 return False, f"Скрипт '{script_name}' не знайдено в роутері '{router_name}'"
             
-            # Видаляємо скрипт
-            routers[router_name]['scripts'].remove(script_name)
-            
-            # Зберігаємо зміни в файл
-            self._save_routers_to_file(routers)
-            
-            # Очищаємо кеш для оновлення даних
-            self.router_manager.clear_cache()
-            
             logging.info(f"Скрипт '{script_name}' видалено з роутера {router_name}")
             return True, f"Скрипт '{script_name}' успішно видалено з роутера '{router_name}'"
             
@@ -275,6 +240,58 @@ class AccessManager:
             logging.error(f"Помилка видалення скрипта '{script_name}' з роутера {router_name}: {e}")
             return False, f"Помилка видалення скрипта: {e}"
     
+    def apply_bulk_changes(self, rows: List[ProvisioningRow]) -> bool:
+        """
+        Застосовує рядки документа масових змін однією транзакцією.
+
+        Спочатку перевіряються всі рядки; якщо хоча б один некоректний,
+        нічого не змінюється. Інакше всі зміни вносяться одним оновленням
+        конфігурації (один запис на диск). Результат кожного рядка
+        записується в row.status та row.message.
+        """
+        models = self.store.get_snapshot().models
+        for row in rows:
+            if row.status == ROW_INVALID:
+                continue
+            if row.field == 'allowed_users' and not self.validate_user_id(row.value):
+                row.reject("некоректний ID користувача (має бути числом з 7-10 цифр)")
+            elif row.field == 'scripts' and not self.validate_script_name(row.value):
+                row.reject("некоректна назва скрипта")
+            elif row.router not in models:
+                row.reject(f"роутер '{row.router}' не знайдено")
+
+        if any(row.status == ROW_INVALID for row in rows):
+            return False
+
+        def apply(routers: Dict[str, Any]):
+            for row in rows:
+                router = routers.get(row.router)
+                if not isinstance(router, dict):
+                    # Роутер видалили після перевірки - скасовуємо всю транзакцію
+                    raise ValueError(f"роутер '{row.router}' не знайдено")
+                values = router.setdefault(row.field, [])
+                present = row.value in (str(value).strip() for value in values)
+                if row.action == 'add' and not present:
+                    values.append(row.value)
+                    row.status, row.message = ROW_APPLIED, "додано"
+                elif row.action == 'remove' and present:
+                    router[row.field] = [value for value in values if str(value).strip() != row.value]
+                    row.status, row.message = ROW_APPLIED, "видалено"
+                else:
+                    row.status, row.message = ROW_UNCHANGED, "вже є" if present else "немає"
+        
+        try:
+            self.store.update(apply)
+        except Exception as e:
+            logging.error(f"Помилка застосування масових змін доступу: {e}")
+            for row in rows:
+                row.reject(f"не збережено: {e}")
+            return False
+        
+        applied = sum(1 for row in rows if row.status == ROW_APPLIED)
+        logging.info(f"Масові зміни доступу: застосовано {applied} з {len(rows)} рядків")
+        return True
+    
     def get_router_scripts(self, router_name: str) -> Tuple[bool, List[str]]:
         """Отримує список скриптів для конкретного роутера через кеш"""
         try:
@@ -282,8 +299,7 @@ class AccessManager:
             if not router:
                 return False, []
             
-            scripts = router.get('scripts', [])
-            return True, scripts
+            return True, list(router.scripts)
             
         except Exception as e:
             logging.error(f"Помилка отримання скриптів роутера {router_name}: {e}")
@@ -309,15 +325,5 @@ class AccessManager:
             return False
     
     def clear_cache(self):
-        """Очищає кеш router_manager"""
-        self.router_manager.clear_cache()
-    
-    def _save_routers_to_file(self, routers: Dict[str, Any]):
-        """Зберігає дані роутерів у файл"""
-        try:
-            with open(self.config_file, 'w', encoding='utf-8') as file:
-                json.dump(routers, file, indent=2, ensure_ascii=False)
-            logging.info(f"Дані роутерів збережено у файл {self.config_file}")
-        except Exception as e:
-            logging.error(f"Помилка збереження даних роутерів: {e}")
-            raise 
\ No newline at end of file
+        """Перечитує routers.json у спільному сховищі"""
+        self.router_manager.clear_cache() 
\ No newline at end of file
@@ -58,6 +58,11 @@ class AdminNotifier:
         admin_message = format_admin_message(execution_time, username, router_name, script)
         self._send_to_all_admins(admin_message)
     
+    def send_schedule_digest(self, digest: str):
+        """Відправляє зведення запусків за розкладом"""
+        self._initialize_bots()
+        self._send_to_all_admins(digest)
+    
     def _send_to_all_admins(self, message: str):
         """Відправляє повідомлення всім активним адміністраторам"""
         sent_count = 0
@@ -0,0 +1,321 @@
+"""
+Навантажувальний тест шляху виконання скриптів на фейкових роутерах.
+
+Запуск з кореня проєкту:
+    python benchmarks/bench_execution.py --users 20 --routers 5 --runs 10
+    python benchmarks/bench_execution.py --mode handlers --latency 0.2 --output-size 200000
+    python benchmarks/bench_execution.py --no-pool   # порівняння з новим з'єднанням на кожен запуск
+    python benchmarks/bench_execution.py --backend api   # бінарний API RouterOS замість SSH
+
+Режим client навантажує RouterSSHClient напряму, режим handlers - повний шлях
+бота (черга, single-flight, доставка результату) з підміненим Telegram API.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.fake_router import FakeRouterOSServer, FAILURE_ERROR, FAILURE_DISCONNECT  # noqa: E402
+from benchmarks.fake_api_router import FakeRouterOSAPIServer  # noqa: E402
+
+BENCH_USERNAME = 'admin'
+BENCH_PASSWORD = 'admin'
+
+
+class RecordingTelegram:
+    """Замінник Telegram API: не відправляє нічого в мережу, лише видає ID повідомлень"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_message_id = 1
+        self.on_edit = None
+
+    def _new_message(self, chat_id: int):
+        with self._lock:
+            message_id = self._next_message_id
+            self._next_message_id += 1
+        return SimpleNamespace(chat=SimpleNamespace(id=chat_id), message_id=message_id)
+
+    def reply_to(self, message, text, **kwargs):
+        return self._new_message(message.chat.id)
+
+    def send_message(self, chat_id, text, **kwargs):
+        return self._new_message(chat_id)
+
+    def send_document(self, chat_id, document, **kwargs):
+        # Читаємо файл так само, як це зробила б відправка
+        while document.read(65536):
+            pass
+        return self._new_message(chat_id)
+
+    def edit_message_text(self, text, chat_id, message_id, **kwargs):
+        if self.on_edit is not None:
+            self.on_edit(text, message_id)
+
+    def edit_message_reply_markup(self, chat_id, message_id, **kwargs):
+        pass
+
+
+class SilentNotifier:
+    """Замінник AdminNotifier, що лише рахує сповіщення"""
+
+    def __init__(self):
+        self.sent = 0
+
+    def send_script_execution_notification(self, *args, **kwargs):
+        self.sent += 1
+
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    """Перцентиль методом найближчого рангу"""
+    if not sorted_values:
+        return 0.0
+    index = math.ceil(percent / 100 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(len(sorted_values) - 1, index))]
+
+
+def start_routers(args) -> list:
+    """Запускає фейкові роутери (SSH або API залежно від --backend)"""
+    server_class = FakeRouterOSAPIServer if args.backend == 'api' else FakeRouterOSServer
+    return [
+        server_class(
+            username=BENCH_USERNAME, password=BENCH_PASSWORD,
+            latency=args.latency, jitter=args.jitter, output_size=args.output_size,
+            failure_rate=args.failure_rate, failure_mode=args.failure_mode, seed=args.seed + index
+        ).start()
+        for index in range(args.routers)
+    ]
+
+
+def import_bot(workdir: str, routers: list, backend: str):
+    """Імпортує модуль бота в тимчасовому каталозі з routers.json для фейкових роутерів"""
+    os.makedirs(os.path.join(workdir, 'logs'), exist_ok=True)
+    routers_config = {
+        f"bench-{index + 1}": {
+            'ip': server.host,
+            'ssh_port': server.port,
+            'backend': backend,
+            'api_port': server.port,
+            'username': BENCH_USERNAME,
+            'ssh_password': BENCH_PASSWORD,
+            'allowed_users': [],
+            'scripts': []
+        }
+        for index, server in enumerate(routers)
+    }
+    with open(os.path.join(workdir, 'routers.json'), 'w', encoding='utf-8') as file:
+        json.dump(routers_config, file)
+
+    os.chdir(workdir)
+    import bot as bot_module
+    logging.getLogger().setLevel(logging.WARNING)
+    return bot_module
+
+
+def configure_engine(bot_module, args):
+    """Підставляє пул та рушій виконання з параметрами тесту"""
+    from ssh_pool import SSHConnectionPool
+    from execution_engine import ExecutionEngine
+    from circuit_breaker import CircuitBreaker
+
+    # Пул розміру 0 відкриває нове з'єднання на кожен запуск; час підключень враховується, як у боті
+    bot_module.ssh_pool = SSHConnectionPool(
+        max_size=0 if args.no_pool else args.pool_size,
+        on_connect=bot_module.latency_tracker.record_connect
+    )
+    bot_module.circuit_breaker = CircuitBreaker()
+    bot_module.execution_engine = ExecutionEngine(
+        max_workers=args.workers, per_router_limit=args.per_router_limit, queue_size=args.queue_size
+    )
+
+
+def run_client_mode(bot_module, args, router_names: List[str]) -> Dict[str, list]:
+    """Кожен користувач викликає RouterSSHClient.stream_script напряму"""
+    results = {'latencies': [], 'failures': 0}
+    lock = threading.Lock()
+    connections = {
+        name: bot_module.router_manager.get_router(name) for name in router_names
+    }
+
+    def user_loop(user_index: int):
+        for run in range(args.runs):
+            router_name = router_names[(user_index + run) % len(router_names)]
+            client = bot_module.create_router_client(connections[router_name])
+            started = time.perf_counter()
+            exit_status, _ = client.stream_script(script_name(args, user_index))
+            elapsed = time.perf_counter() - started
+            with lock:
+                results['latencies'].append(elapsed)
+                if not bot_module.is_successful_exit(exit_status):
+                    results['failures'] += 1
+
+    run_users(args.users, user_loop)
+    return results
+
+
+def run_handlers_mode(bot_module, args, router_names: List[str]) -> Dict[str, list]:
+    """Кожен користувач проходить повний шлях бота від постановки в чергу до доставки результату"""
+    telegram = RecordingTelegram()
+    notifier = SilentNotifier()
+    bot_module.bot = telegram
+    bot_module.admin_notifier = notifier
+
+    results = {'latencies': [], 'failures': 0}
+    lock = threading.Lock()
+    waiting: Dict[int, dict] = {}
+
+    def finish(message_id: int, success: bool):
+        with lock:
+            entry = waiting.pop(message_id, None)
+        if entry is not None:
+            entry['success'] = success
+            entry['done'].set()
+
+    original_deliver = bot_module.deliver_result
+
+    def recording_deliver(router_name, script, outcome, result_template, chat_id, message_id):
+        original_deliver(router_name, script, outcome, result_template, chat_id, message_id)
+        finish(message_id, bot_module.is_successful_exit(outcome[0]))
+
+    bot_module.deliver_result = recording_deliver
+    telegram.on_edit = lambda text, message_id: (
+        finish(message_id, False) if text == bot_module.MESSAGES['execution_queue_full'] else None
+    )
+
+    # Перехоплюємо ID повідомлення про хід виконання, щоб дочекатися саме його
+    original_reply_to = telegram.reply_to
+
+    def reply_to(message, text, **kwargs):
+        progress = original_reply_to(message, text, **kwargs)
+        entry = getattr(message, 'bench_entry', None)
+        if entry is not None:
+            with lock:
+                waiting[progress.message_id] = entry
+        return progress
+
+    telegram.reply_to = reply_to
+
+    def user_loop(user_index: int):
+        user_id = 100000 + user_index
+        for run in range(args.runs):
+            router_name = router_names[(user_index + run) % len(router_names)]
+            entry = {'done': threading.Event(), 'success': False}
+            message = SimpleNamespace(
+                chat=SimpleNamespace(id=user_id),
+                from_user=SimpleNamespace(id=user_id, username=f"bench_user_{user_index}"),
+                bench_entry=entry
+            )
+            started = time.perf_counter()
+            bot_module.submit_script_execution(
+                message, router_name, script_name(args, user_index),
+                bot_module.LOG_MESSAGES['script_executed'], bot_module.MESSAGES['script_result']
+            )
+            completed = entry['done'].wait(args.wait_timeout)
+            elapsed = time.perf_counter() - started
+            with lock:
+                results['latencies'].append(elapsed)
+                if not completed or not entry['success']:
+                    results['failures'] += 1
+
+    run_users(args.users, user_loop)
+    results['notifications'] = notifier.sent
+    return results
+
+
+def script_name(args, user_index: int) -> str:
+    """Назва скрипта: спільна для всіх (перевірка об'єднання виконань) або своя для кожного"""
+    return 'bench_shared' if args.shared_script else f"bench_{user_index}"
+
+
+def run_users(count: int, user_loop):
+    """Запускає користувачів паралельно та чекає на їх завершення"""
+    threads = [threading.Thread(target=user_loop, args=(index,), daemon=True) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def print_report(args, results: dict, wall_time: float, routers: list, bot_module):
+    """Виводить результати тесту"""
+    latencies = sorted(results['latencies'])
+    total = len(latencies)
+    handshakes = sum(server.get_stats()['connections'] for server in routers)
+    executions = sum(server.get_stats()['executions'] for server in routers)
+
+    print(f"Режим: {args.mode}, бекенд: {args.backend}, користувачів: {args.users}, роутерів: {args.routers}, "
+          f"запусків на користувача: {args.runs}, пул: {'вимкнено' if args.no_pool else args.pool_size}")
+    print(f"Запусків: {total}, невдалих: {results['failures']}, час: {wall_time:.2f} с, "
+          f"пропускна здатність: {total / wall_time if wall_time else 0:.1f} запусків/с")
+    print(f"Затримка p50: {percentile(latencies, 50) * 1000:.1f} мс, "
+          f"p95: {percentile(latencies, 95) * 1000:.1f} мс, "
+          f"p99: {percentile(latencies, 99) * 1000:.1f} мс")
+    print(f"Підключень до роутерів: {handshakes}, виконань на роутерах: {executions}")
+    if 'notifications' in results:
+        print(f"Сповіщень адміністраторам: {results['notifications']}")
+    print(f"Пул: {bot_module.ssh_pool.get_stats()}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Навантажувальний тест виконання скриптів на фейкових роутерах")
+    parser.add_argument('--mode', choices=['client', 'handlers'], default='client')
+    parser.add_argument('--backend', choices=['ssh', 'api'], default='ssh', help="Спосіб підключення до роутерів")
+    parser.add_argument('--users', type=int, default=10, help="Кількість одночасних користувачів")
+    parser.add_argument('--routers', type=int, default=3, help="Кількість фейкових роутерів")
+    parser.add_argument('--runs', type=int, default=10, help="Запусків на одного користувача")
+    parser.add_argument('--latency', type=float, default=0.05, help="Час виконання скрипта на роутері (с)")
+    parser.add_argument('--jitter', type=float, default=0.2, help="Відхилення затримки (частка)")
+    parser.add_argument('--output-size', type=int, default=2048, help="Розмір виводу скрипта (байти)")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Частка відмов (0..1)")
+    parser.add_argument('--failure-mode', choices=[FAILURE_ERROR, FAILURE_DISCONNECT], default=FAILURE_ERROR)
+    parser.add_argument('--shared-script', action='store_true', help="Усі користувачі запускають один скрипт")
+    parser.add_argument('--no-pool', action='store_true', help="Нове SSH-з'єднання на кожен запуск")
+    parser.add_argument('--pool-size', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--per-router-limit', type=int, default=2)
+    parser.add_argument('--queue-size', type=int, default=1000)
+    parser.add_argument('--wait-timeout', type=float, default=120.0, help="Скільки чекати на результат (с)")
+    parser.add_argument('--seed', type=int, default=1)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    routers = start_routers(args)
+    workdir = tempfile.mkdtemp(prefix='bench_execution_')
+    try:
+        bot_module = import_bot(workdir, routers, args.backend)
+        configure_engine(bot_module, args)
+        router_names = [f"bench-{index + 1}" for index in range(args.routers)]
+
+        started = time.perf_counter()
+        if args.mode == 'client':
+            results = run_client_mode(bot_module, args, router_names)
+        else:
+            results = run_handlers_mode(bot_module, args, router_names)
+        wall_time = time.perf_counter() - started
+
+        print_report(args, results, wall_time, routers, bot_module)
+
+        bot_module.execution_engine.stop()
+        bot_module.circuit_breaker.stop()
+        bot_module.ssh_pool.close_all()
+        bot_module.api_pool.close_all()
+    finally:
+        for server in routers:
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
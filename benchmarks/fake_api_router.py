@@ -0,0 +1,228 @@
+import logging
+import random
+import re
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from benchmarks.fake_router import FAILURE_ERROR, FAILURE_DISCONNECT, _build_output
+from routeros_api import encode_sentence
+
+# Скрипт, який запускає /execute
+EXECUTE_SCRIPT_PATTERN = re.compile(r'^/system script run (\S+)$')
+
+
+class FakeRouterOSAPIServer:
+    """
+    Вбудований сервер бінарного API RouterOS для тестування бекенду API без роутера.
+
+    Підтримує /login та /execute з =script=/system script run <назва>, відповідаючи
+    виводом заданого розміру в =ret= із заданою затримкою та часткою відмов.
+    Параметри ті самі, що й у FakeRouterOSServer.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 username: str = 'admin', password: str = 'admin',
+                 latency: float = 0.0, jitter: float = 0.0, output_size: int = 1024,
+                 failure_rate: float = 0.0, failure_mode: str = FAILURE_ERROR,
+                 seed: Optional[int] = None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_mode = failure_mode
+
+        self._output = _build_output(output_size).decode('utf-8')
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._socket: Optional[socket.socket] = None
+        self._accept_thread: Optional[threading.Thread] = None
+        self._clients: List[socket.socket] = []
+        self._stop_event = threading.Event()
+        self._stats = {'connections': 0, 'executions': 0, 'failures': 0}
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """Адреса, на якій сервер приймає підключення"""
+        return self.host, self.port
+
+    def start(self) -> 'FakeRouterOSAPIServer':
+        """Запускає сервер у фоновому потоці"""
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.host, self.port))
+        self._socket.listen(128)
+        self._socket.settimeout(0.5)
+        self.port = self._socket.getsockname()[1]
+
+        self._stop_event.clear()
+        self._accept_thread = threading.Thread(
+            target=self._accept_loop, name=f"fake-api-router-{self.port}", daemon=True
+        )
+        self._accept_thread.start()
+        return self
+
+    def stop(self):
+        """Зупиняє сервер та закриває всі з'єднання"""
+        self._stop_event.set()
+        if self._socket is not None:
+            self._socket.close()
+        if self._accept_thread is not None:
+            self._accept_thread.join(2)
+
+        with self._lock:
+            clients = list(self._clients)
+            self._clients.clear()
+        for client in clients:
+            try:
+                client.close()
+            except OSError:
+                pass
+
+    def __enter__(self) -> 'FakeRouterOSAPIServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def get_stats(self) -> dict:
+        """Отримує кількість підключень, виконань та відмов"""
+        with self._lock:
+            return dict(self._stats)
+
+    def _accept_loop(self):
+        """Приймає TCP-підключення"""
+        while not self._stop_event.is_set():
+            try:
+                client, _ = self._socket.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            with self._lock:
+                self._clients.append(client)
+                self._stats['connections'] += 1
+            threading.Thread(target=self._serve_client, args=(client,), daemon=True).start()
+
+    def _serve_client(self, client: socket.socket):
+        """Обслуговує одне з'єднання API до його закриття"""
+        logged_in = False
+        try:
+            while not self._stop_event.is_set():
+                sentence = self._read_sentence(client)
+                if sentence is None:
+                    return
+                if not sentence:
+                    continue
+
+                command, attributes = sentence[0], self._attributes(sentence)
+                if command == '/login':
+                    if attributes.get('name') == self.username and attributes.get('password') == self.password:
+                        logged_in = True
+                        client.sendall(encode_sentence(['!done']))
+                    else:
+                        client.sendall(encode_sentence(['!trap', '=message=invalid user name or password (6)']))
+                        client.sendall(encode_sentence(['!done']))
+                elif not logged_in:
+                    client.sendall(encode_sentence(['!fatal', 'not logged in']))
+                    return
+                elif command == '/execute':
+                    if not self._execute(client, attributes.get('script', '')):
+                        return
+                else:
+                    client.sendall(encode_sentence(['!trap', '=message=no such command']))
+                    client.sendall(encode_sentence(['!done']))
+        except OSError as e:
+            logging.debug(f"Фейковий API-роутер закрив з'єднання: {e}")
+        finally:
+            with self._lock:
+                if client in self._clients:
+                    self._clients.remove(client)
+            client.close()
+
+    def _execute(self, client: socket.socket, script: str) -> bool:
+        """Відповідає на /execute; повертає False, якщо з'єднання потрібно обірвати"""
+        if not EXECUTE_SCRIPT_PATTERN.match(script.strip()):
+            client.sendall(encode_sentence(['!trap', '=message=bad command name']))
+            client.sendall(encode_sentence(['!done']))
+            return True
+
+        with self._lock:
+            self._stats['executions'] += 1
+            failed = self._random.random() < self.failure_rate
+            delay = self.latency * (1 + self._random.uniform(-self.jitter, self.jitter))
+            if failed:
+                self._stats['failures'] += 1
+
+        if delay > 0:
+            time.sleep(delay)
+
+        if failed:
+            if self.failure_mode == FAILURE_DISCONNECT:
+                return False
+            client.sendall(encode_sentence(['!trap', '=message=failure: simulated script error']))
+            client.sendall(encode_sentence(['!done']))
+            return True
+
+        client.sendall(encode_sentence(['!done', f'=ret={self._output}']))
+        return True
+
+    @staticmethod
+    def _attributes(sentence: List[str]) -> Dict[str, str]:
+        """Атрибути =назва=значення з речення"""
+        attributes = {}
+        for word in sentence[1:]:
+            if word.startswith('='):
+                name, _, value = word[1:].partition('=')
+                attributes[name] = value
+        return attributes
+
+    def _read_sentence(self, client: socket.socket) -> Optional[List[str]]:
+        """Читає речення запиту; None - клієнт закрив з'єднання"""
+        words = []
+        while True:
+            length = self._read_length(client)
+            if length is None:
+                return None
+            if length == 0:
+                return words
+            data = self._read_exact(client, length)
+            if data is None:
+                return None
+            words.append(data.decode('utf-8', errors='replace'))
+
+    def _read_length(self, client: socket.socket) -> Optional[int]:
+        """Читає закодовану довжину слова"""
+        first = self._read_exact(client, 1)
+        if first is None:
+            return None
+        first = first[0]
+        if first & 0x80 == 0:
+            return first
+        if first & 0xC0 == 0x80:
+            extra, mask = 1, 0x3F
+        elif first & 0xE0 == 0xC0:
+            extra, mask = 2, 0x1F
+        elif first & 0xF0 == 0xE0:
+            extra, mask = 3, 0x0F
+        else:
+            extra, mask = 4, 0x00
+        rest = self._read_exact(client, extra)
+        if rest is None:
+            return None
+        return int.from_bytes(bytes([first & mask]) + rest, 'big')
+
+    @staticmethod
+    def _read_exact(client: socket.socket, size: int) -> Optional[bytes]:
+        """Читає рівно size байтів; None - клієнт закрив з'єднання"""
+        data = bytearray()
+        while len(data) < size:
+            chunk = client.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return bytes(data)
@@ -0,0 +1,233 @@
+import logging
+import random
+import re
+import socket
+import threading
+import time
+from typing import List, Optional, Tuple
+import paramiko
+from paramiko.ssh_exception import SSHException
+
+# Команда RouterOS, яку приймає сервер
+SCRIPT_RUN_PATTERN = re.compile(r'^/system script run (\S+)$')
+
+# Режими відмови
+FAILURE_ERROR = 'error'            # Скрипт завершується з ненульовим кодом
+FAILURE_DISCONNECT = 'disconnect'  # Сервер обриває SSH-з'єднання
+
+# Розмір блоку відправки виводу
+SEND_CHUNK_SIZE = 32768
+
+_host_key: Optional[paramiko.RSAKey] = None
+_host_key_lock = threading.Lock()
+
+
+def _get_host_key() -> paramiko.RSAKey:
+    """Генерує ключ сервера (тільки один раз на процес)"""
+    global _host_key
+    with _host_key_lock:
+        if _host_key is None:
+            _host_key = paramiko.RSAKey.generate(2048)
+        return _host_key
+
+
+def _build_output(size: int) -> bytes:
+    """Формує вивід заданого розміру, схожий на /export RouterOS"""
+    lines = []
+    length = 0
+    index = 0
+    while length < size:
+        line = f"/ip address add address=10.{index // 256 % 256}.{index % 256}.1/24 interface=ether{index % 24 + 1}\n"
+        lines.append(line)
+        length += len(line)
+        index += 1
+    return ''.join(lines).encode('utf-8')[:size]
+
+
+class _FakeRouterInterface(paramiko.ServerInterface):
+    """Обробник аутентифікації та запитів каналів для одного з'єднання"""
+
+    def __init__(self, server: 'FakeRouterOSServer'):
+        self.server = server
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_auth_password(self, username, password):
+        if username == self.server.username and password == self.server.password:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel, command):
+        threading.Thread(
+            target=self.server._handle_command,
+            args=(channel, command.decode('utf-8', errors='replace')),
+            daemon=True
+        ).start()
+        return True
+
+
+class FakeRouterOSServer:
+    """
+    Вбудований SSH-сервер, що імітує роутер RouterOS для навантажувального тестування.
+
+    Приймає тільки команду "/system script run <назва>" і відповідає на неї
+    виводом заданого розміру із заданою затримкою та часткою відмов.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 username: str = 'admin', password: str = 'admin',
+                 latency: float = 0.0, jitter: float = 0.0, output_size: int = 1024,
+                 failure_rate: float = 0.0, failure_mode: str = FAILURE_ERROR,
+                 seed: Optional[int] = None):
+        """
+        :param host: Адреса для прослуховування
+        :param port: Порт (0 - вибрати вільний автоматично)
+        :param username: Ім'я користувача SSH
+        :param password: Пароль SSH
+        :param latency: Час виконання скрипта (секунди)
+        :param jitter: Випадкове відхилення затримки (частка від latency)
+        :param output_size: Розмір виводу скрипта (байти)
+        :param failure_rate: Частка виконань, що завершуються відмовою (0..1)
+        :param failure_mode: FAILURE_ERROR або FAILURE_DISCONNECT
+        :param seed: Початкове значення генератора випадкових чисел
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_mode = failure_mode
+
+        self._output = _build_output(output_size)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._socket: Optional[socket.socket] = None
+        self._accept_thread: Optional[threading.Thread] = None
+        self._transports: List[paramiko.Transport] = []
+        self._stop_event = threading.Event()
+        self._stats = {'connections': 0, 'executions': 0, 'failures': 0}
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """Адреса, на якій сервер приймає підключення"""
+        return self.host, self.port
+
+    def start(self) -> 'FakeRouterOSServer':
+        """Запускає сервер у фоновому потоці"""
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.host, self.port))
+        self._socket.listen(128)
+        self._socket.settimeout(0.5)
+        self.port = self._socket.getsockname()[1]
+
+        _get_host_key()
+        self._stop_event.clear()
+        self._accept_thread = threading.Thread(
+            target=self._accept_loop, name=f"fake-router-{self.port}", daemon=True
+        )
+        self._accept_thread.start()
+        return self
+
+    def stop(self):
+        """Зупиняє сервер та закриває всі з'єднання"""
+        self._stop_event.set()
+        if self._socket is not None:
+            self._socket.close()
+        if self._accept_thread is not None:
+            self._accept_thread.join(2)
+
+        with self._lock:
+            transports = list(self._transports)
+            self._transports.clear()
+        for transport in transports:
+            transport.close()
+
+    def __enter__(self) -> 'FakeRouterOSServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def get_stats(self) -> dict:
+        """Отримує кількість SSH-підключень, виконань та відмов"""
+        with self._lock:
+            return dict(self._stats)
+
+    def _accept_loop(self):
+        """Приймає TCP-підключення"""
+        while not self._stop_event.is_set():
+            try:
+                sock, _ = self._socket.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            threading.Thread(target=self._serve_connection, args=(sock,), daemon=True).start()
+
+    def _serve_connection(self, sock: socket.socket):
+        """Виконує SSH-рукостискання та обслуговує з'єднання до його закриття"""
+        transport = paramiko.Transport(sock)
+        transport.add_server_key(_get_host_key())
+        try:
+            transport.start_server(server=_FakeRouterInterface(self))
+        except (SSHException, EOFError) as e:
+            logging.debug(f"Невдале SSH-рукостискання з фейковим роутером: {e}")
+            transport.close()
+            return
+
+        with self._lock:
+            self._transports.append(transport)
+            self._stats['connections'] += 1
+
+        # Команди обробляються в check_channel_exec_request, тут лише
+        # забираємо прийняті канали, щоб черга транспорту не росла
+        while transport.is_active() and not self._stop_event.is_set():
+            transport.accept(1)
+
+        with self._lock:
+            if transport in self._transports:
+                self._transports.remove(transport)
+
+    def _handle_command(self, channel: paramiko.Channel, command: str):
+        """Відповідає на команду виконання скрипта"""
+        try:
+            if not SCRIPT_RUN_PATTERN.match(command.strip()):
+                channel.sendall(b'bad command name\n')
+                channel.send_exit_status(1)
+                return
+
+            with self._lock:
+                self._stats['executions'] += 1
+                failed = self._random.random() < self.failure_rate
+                delay = self.latency * (1 + self._random.uniform(-self.jitter, self.jitter))
+                if failed:
+                    self._stats['failures'] += 1
+
+            if delay > 0:
+                time.sleep(delay)
+
+            if failed:
+                if self.failure_mode == FAILURE_DISCONNECT:
+                    channel.get_transport().close()
+                    return
+                channel.sendall(b'failure: simulated script error\n')
+                channel.send_exit_status(1)
+                return
+
+            for offset in range(0, len(self._output), SEND_CHUNK_SIZE):
+                channel.sendall(self._output[offset:offset + SEND_CHUNK_SIZE])
+            channel.send_exit_status(0)
+        except (SSHException, EOFError, OSError) as e:
+            logging.debug(f"Фейковий роутер не зміг відповісти: {e}")
+        finally:
+            channel.close()
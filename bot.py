@@ -1,18 +1,46 @@
+import codecs
 import logging
+import socket
+import threading
+import time
 import telebot
 from datetime import datetime
+from typing import Callable, Optional, Tuple
 from telebot.types import InlineKeyboardButton, InlineKeyboardMarkup
-from config import BOT_TOKEN, SCRIPT_PASSWORD_MODE
-from fabric import Connection
+from config import (
+    BOT_TOKEN, SCRIPT_PASSWORD_MODE, SCRIPT_STREAMING_MODE, STREAM_POLL_INTERVAL, STREAM_READ_SIZE, EXIT_STATUS_POLL_INTERVAL,
+    SSH_CONNECT_TIMEOUT, SCRIPT_RUN_TIMEOUT, BULK_UPLOAD_MAX_BYTES
+)
 from paramiko.ssh_exception import SSHException, AuthenticationException, NoValidConnectionsError
 
 # Імпорт нових модулів
-from constants import MESSAGES, USER_STATES, LOG_MESSAGES, ACCESS_ACTIONS, get_user_info, get_current_time, is_positive_confirmation, is_negative_confirmation
+from constants import MESSAGES, USER_STATES, CALLBACK_PREFIXES, LOG_MESSAGES, ACCESS_ACTIONS, get_user_info, get_current_time, is_positive_confirmation, is_negative_confirmation
+from config_store import ConfigStore
+from config_backends import create_config_backend
+from config_diff import RouterChange
+from credential_vault import CredentialVault
 from router_manager import RouterManager
+from router_model import Router
 from user_state_manager import UserStateManager
 from admin_notifier import AdminNotifier
-from keyboard_utils import create_router_keyboard, create_script_keyboard
+from keyboard_utils import (
+    create_router_keyboard, create_script_keyboard, create_multi_router_keyboard, create_multi_script_keyboard,
+    create_cancel_keyboard, create_schedule_keyboard, KeyboardCache
+)
 from access_manager import AccessManager
+from ssh_pool import SSHConnectionPool
+from execution_engine import ExecutionEngine, ExecutionJob, ExecutionCancelled, ExecutionTimeout
+from fanout import FanOutRun
+from message_stream import ThrottledMessageEditor, fit_message
+from circuit_breaker import CircuitBreaker, CIRCUIT_CLOSED, CIRCUIT_OPEN
+from result_cache import ScriptResultCache
+from single_flight import SingleFlight
+from output_delivery import ScriptOutput, split_message
+from routeros_api import RouterOSAPIPool, RouterAPIClient
+from health_monitor import HealthMonitor
+from latency_tracker import LatencyTracker, LATENCY_CONNECT, LATENCY_RUN
+from script_scheduler import ScheduleStore, ScriptScheduler, ScheduledBatch
+from bulk_provisioning import parse_document, render_report
 
 # Налаштуємо логування з ротацією
 from logging.handlers import RotatingFileHandler
@@ -65,14 +93,59 @@ def log_access_attempt(user_id, username, action, result, details=""):
 bot = telebot.TeleBot(BOT_TOKEN)
 
 # Ініціалізація менеджерів
-router_manager = RouterManager()
+# Одне сховище routers.json на процес: бот і керування доступом бачать ту саму версію
+config_store = ConfigStore(create_config_backend())
+# Паролі роутерів розшифровуються на вимогу та тримаються в пам'яті обмежений час
+credential_vault = CredentialVault()
+router_manager = RouterManager(config_store, credential_vault)
 user_state_manager = UserStateManager()
 admin_notifier = AdminNotifier()
-access_manager = AccessManager('routers.json')
+keyboard_cache = KeyboardCache()
+access_manager = AccessManager(config_store, keyboard_cache)
+latency_tracker = LatencyTracker()
+ssh_pool = SSHConnectionPool(on_connect=latency_tracker.record_connect)
+api_pool = RouterOSAPIPool(on_connect=latency_tracker.record_connect)
+execution_engine = ExecutionEngine()
+circuit_breaker = CircuitBreaker()
+result_cache = ScriptResultCache()
+single_flight = SingleFlight()
+health_monitor = HealthMonitor(router_manager, ssh_pool)
+schedule_store = ScheduleStore()
+script_scheduler = ScriptScheduler(
+    schedule_store,
+    lambda batch, entry: submit_scheduled_run(batch, entry),
+    admin_notifier.send_schedule_digest
+)
+
+def on_router_changed(change: RouterChange):
+    """
+    Застосовує зміну налаштувань роутера (з бота чи редагуванням файлу) до похідних даних.
+
+    Збережені результати скидаються лише тоді, коли зміна може на них вплинути
+    (зміна самих лише користувачів чи тегів їх не чіпає), а з'єднання
+    закриваються лише після зміни адреси чи облікових даних роутера. Збережені
+    клавіатури роутера (вони показують кількість користувачів і скриптів)
+    будуються заново після будь-якої його зміни.
+    """
+    keyboard_cache.invalidate_router(change.name)
+    if change.affects_results():
+        result_cache.invalidate_router(change.name)
+
+    old = change.old_router
+    if change.connection_changed and old is not None:
+        if old.backend == 'api':
+            api_pool.close_router(old.ip, old.api_port, old.username)
+        else:
+            ssh_pool.close_router(old.ip, old.ssh_port, old.username)
+
+config_store.add_change_listener(on_router_changed)
 
 # Клас для роботи з SSH через Fabric
 class RouterSSHClient:
-    def __init__(self, ip: str, username: str, ssh_password: str, ssh_port: int = 22):
+    def __init__(self, ip: str, username: str, ssh_password: str, ssh_port: int = 22, pool: SSHConnectionPool = None,
+                 breaker: CircuitBreaker = None, connect_timeout: float = SSH_CONNECT_TIMEOUT,
+                 run_timeout: float = SCRIPT_RUN_TIMEOUT, max_channels: Optional[int] = None,
+                 latency: LatencyTracker = None):
         """
         Ініціалізація клієнта SSH.
         
@@ -80,11 +153,23 @@ class RouterSSHClient:
         :param username: Ім'я користувача для підключення по SSH
         :param ssh_password: Пароль для підключення по SSH
         :param ssh_port: Порт для підключення по SSH (за замовчуванням 22)
+        :param pool: Пул з'єднань (за замовчуванням спільний пул бота)
+        :param breaker: Запобіжник доступності (за замовчуванням спільний запобіжник бота)
+        :param connect_timeout: Таймаут SSH-підключення (секунди)
+        :param run_timeout: Максимальний час виконання скрипта (секунди)
+        :param max_channels: Максимум одночасних каналів через одне з'єднання (за замовчуванням з налаштувань пулу)
+        :param latency: Облік затримок для адаптивних таймаутів (за замовчуванням спільний облік бота)
         """
         self.ip = ip
         self.username = username
         self.ssh_password = ssh_password
         self.ssh_port = ssh_port  # Враховуємо порт для SSH
+        self.pool = pool or ssh_pool
+        self.breaker = breaker or circuit_breaker
+        self.connect_timeout = connect_timeout
+        self.run_timeout = run_timeout
+        self.max_channels = max_channels
+        self.latency = latency or latency_tracker
 
     def execute_script(self, script: str) -> str:
         """
@@ -93,29 +178,180 @@ class RouterSSHClient:
         :param script: Назва скрипта, який потрібно виконати
         :return: Результат виконання скрипта
         """
+        _, output = self.execute_script_with_status(script)
+        return output
+
+    def execute_script_with_status(self, script: str, cancel_event: Optional[threading.Event] = None) -> Tuple[bool, str]:
+        """
+        Виконання скрипта з ознакою успіху.
+        
+        :param script: Назва скрипта, який потрібно виконати
+        :param cancel_event: Подія, встановлення якої перериває виконання
+        :return: Кортеж (успіх, результат або текст помилки)
+        """
+        exit_status, output = self.stream_script(script, cancel_event=cancel_event)
+        return is_successful_exit(exit_status), output.getvalue()
+
+    def stream_script(self, script: str, on_output: Optional[Callable[[str], None]] = None,
+                      on_idle: Optional[Callable[[], None]] = None,
+                      cancel_event: Optional[threading.Event] = None) -> Tuple[Optional[int], ScriptOutput]:
+        """
+        Потокове виконання скрипта: вивід передається в on_output по мірі надходження.
+        
+        Виконання переривається, якщо минув run_timeout або встановлено cancel_event;
+        канал при цьому закривається, а з'єднання лишається в пулі.
+        
+        :param script: Назва скрипта, який потрібно виконати
+        :param on_output: Викликається з кожним новим фрагментом виводу
+        :param on_idle: Викликається, коли нових даних немає довше STREAM_POLL_INTERVAL
+        :param cancel_event: Подія, встановлення якої перериває виконання
+        :return: Кортеж (код завершення або None у разі помилки, повний результат або текст помилки)
+        """
+        # Недоступний роутер відхиляємо одразу, не чекаючи таймауту підключення
+        if not self.breaker.allow(self.ip, self.ssh_port):
+            return None, ScriptOutput.from_text(self._circuit_open_message())
+        
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        output = ScriptOutput()
+        
+        def emit(text: str):
+            if text:
+                output.write(text)
+                if on_output:
+                    on_output(text)
+        
         try:
-            # Створюємо підключення через Fabric
-            conn = Connection(
-                host=self.ip, 
-                user=self.username, 
-                connect_kwargs={"password": self.ssh_password},  # Використовуємо ssh_password для SSH-підключення
-                port=self.ssh_port  # Вказуємо порт для підключення
-            )
-            # Виконання скрипта на маршрутизаторі
-            result = conn.run(f"/system script run {script}", hide=True)
-            return result.stdout
-        except AuthenticationException as e:
-            logging.error(f"Помилка аутентифікації: {e}")
+            # Виконання скрипта через з'єднання з пулу (без повторного SSH-рукостискання)
+            with self.pool.session(self.ip, self.username, self.ssh_password, self.ssh_port,
+                                   connect_timeout=self.connect_timeout,
+                                   max_channels=self.max_channels) as channel:
+                started = time.monotonic()
+                deadline = started + self.run_timeout
+                channel.set_combine_stderr(True)
+                channel.settimeout(STREAM_POLL_INTERVAL)
+                channel.exec_command(f"/system script run {script}")
+                
+                output_finished = False
+                while True:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise ExecutionCancelled()
+                    if time.monotonic() > deadline:
+                        raise ExecutionTimeout()
+                    
+                    # Після кінця виводу чекаємо на код завершення в межах того ж таймауту:
+                    # роутер, що його не надсилає, не блокує робочий потік назавжди
+                    if output_finished:
+                        if channel.exit_status_ready():
+                            break
+                        time.sleep(EXIT_STATUS_POLL_INTERVAL)
+                        continue
+                    
+                    try:
+                        data = channel.recv(STREAM_READ_SIZE)
+                    except socket.timeout:
+                        if on_idle:
+                            on_idle()
+                        continue
+                    
+                    # Порожній блок означає кінець виводу
+                    if not data:
+                        output_finished = True
+                        emit(decoder.decode(b'', final=True))
+                        continue
+                    
+                    emit(decoder.decode(data))
+                
+                exit_status = channel.recv_exit_status()
+                self.latency.record_run(self.ip, self.ssh_port, time.monotonic() - started)
+            output.close()
+            self.breaker.record_success(self.ip, self.ssh_port)
+            return exit_status, output
+        except Exception as e:
+            return None, ScriptOutput.from_text(self._handle_error(e))
+
+    def _circuit_open_message(self) -> str:
+        """Формує повідомлення про тимчасово недоступний роутер"""
+        status = self.breaker.get_status(self.ip, self.ssh_port)
+        return MESSAGES['circuit_open'].format(self.ip, status['consecutive_failures'], status['retry_in'])
+
+    def _handle_error(self, error: Exception) -> str:
+        """Фіксує помилку в запобіжнику та повертає її опис для користувача"""
+        if isinstance(error, ExecutionCancelled):
+            logging.info(f"Виконання скрипта на {self.ip} скасовано")
+            return MESSAGES['execution_cancelled']
+        if isinstance(error, ExecutionTimeout):
+            # Таймаут теж враховуємо, щоб для повільного роутера таймаут зростав
+            self.latency.record_run(self.ip, self.ssh_port, self.run_timeout)
+            logging.warning(f"Скрипт на {self.ip} перевищив час виконання {self.run_timeout} с")
+            return MESSAGES['execution_timeout'].format(self.run_timeout)
+        
+        description = self._describe_error(error)
+        
+        # Помилка аутентифікації означає, що роутер відповідає - це не проблема доступності
+        if isinstance(error, OSError) or (isinstance(error, (SSHException, EOFError)) and
+                                          not isinstance(error, AuthenticationException)):
+            self.breaker.record_failure(self.ip, self.ssh_port, str(error))
+        else:
+            self.breaker.record_success(self.ip, self.ssh_port)
+        
+        return description
+
+    def _describe_error(self, error: Exception) -> str:
+        """Логує помилку виконання та повертає її опис для користувача"""
+        if isinstance(error, AuthenticationException):
+            logging.error(f"Помилка аутентифікації: {error}")
             return "Помилка аутентифікації. Перевірте правильність пароля SSH."
-        except NoValidConnectionsError as e:
-            logging.error(f"Помилка з'єднання: {e}")
+        if isinstance(error, NoValidConnectionsError):
+            logging.error(f"Помилка з'єднання: {error}")
             return f"Помилка з'єднання. Перевірте доступність маршрутизатора по IP-адресі {self.ip} та порту {self.ssh_port}."
-        except SSHException as e:
-            logging.error(f"Помилка SSH: {e}")
-            return f"Помилка SSH: {e}"
-        except Exception as e:
-            logging.error(f"Невідома помилка при виконанні скрипта: {e}")
-            return f"Невідома помилка при виконанні скрипта: {e}"
+        if isinstance(error, socket.timeout):
+            logging.error(f"Таймаут підключення: {error}")
+            return f"Маршрутизатор {self.ip} не відповів за {self.connect_timeout} с. Перевірте його доступність."
+        if isinstance(error, SSHException):
+            logging.error(f"Помилка SSH: {error}")
+            return f"Помилка SSH: {error}"
+        logging.error(f"Невідома помилка при виконанні скрипта: {error}")
+        return f"Невідома помилка при виконанні скрипта: {error}"
+
+def is_successful_exit(exit_status: Optional[int]) -> bool:
+    """Перевіряє код завершення (-1 означає, що роутер не повідомив код)"""
+    return exit_status in (0, -1)
+
+def get_effective_timeouts(router: Router) -> Tuple[float, float]:
+    """Таймаути (підключення, виконання) роутера: адаптивні за історією затримок або з налаштувань"""
+    if not router.adaptive_timeouts:
+        return router.connect_timeout, router.run_timeout
+    return latency_tracker.get_timeouts(
+        router.ip, router.port,
+        router.connect_timeout, router.run_timeout
+    )
+
+def create_router_client(router: Router):
+    """Створює клієнт виконання скриптів (SSH або RouterOS API) з параметрами підключення роутера"""
+    connect_timeout, run_timeout = get_effective_timeouts(router)
+    if router.backend == 'api':
+        return RouterAPIClient(
+            router.ip,
+            router.username,
+            router_manager.get_secret(router, 'ssh_password'),
+            api_pool,
+            circuit_breaker,
+            api_port=router.api_port,
+            use_ssl=router.api_ssl,
+            connect_timeout=connect_timeout,
+            run_timeout=run_timeout,
+            latency=latency_tracker
+        )
+    
+    return RouterSSHClient(
+        router.ip, 
+        router.username, 
+        router_manager.get_secret(router, 'ssh_password'), 
+        router.ssh_port,
+        connect_timeout=connect_timeout,
+        run_timeout=run_timeout,
+        max_channels=router.max_channels
+    )
 
 # Стан для зберігання даних користувача (замінено на user_state_manager)
 
@@ -214,7 +450,8 @@ def send_router_selection(message):
     )
     
     # Створюємо клавіатуру для вибору роутера
-    keyboard = create_router_keyboard(user_routers)
+    keyboard = create_router_keyboard(user_routers, include_multi=True,
+                                      unreachable=get_unreachable_routers(user_routers))
     
     # Відправляємо повідомлення з кнопками вибору маршрутизаторів
     bot.reply_to(message, MESSAGES['select_router'], reply_markup=keyboard)
@@ -257,11 +494,11 @@ def handle_router_selection(call):
     # Зберігаємо вибраний маршрутизатор
     user_state_manager.set_waiting_for_script(call.from_user.id, router_name)
 
-    # Отримуємо скрипти для роутера з кешу
-    scripts = router_manager.get_router_scripts(router_name)
-    
-    # Створюємо клавіатуру для вибору скрипта
-    keyboard = create_script_keyboard(router_name, scripts)
+    # Клавіатура вибору скрипта будується один раз і скидається при зміні скриптів роутера
+    keyboard = keyboard_cache.get(
+        router_name, 'scripts',
+        lambda: create_script_keyboard(router_name, router_manager.get_router_scripts(router_name))
+    )
 
     # Відправляємо повідомлення з кнопками вибору скрипта
     bot.send_message(call.message.chat.id, MESSAGES['select_script'].format(router_name), reply_markup=keyboard)
@@ -299,35 +536,226 @@ def verify_password_and_execute(message):
 
 def execute_script_successfully(message, router_name: str, script: str):
     """Виконує скрипт успішно"""
+    submit_script_execution(message, router_name, script, LOG_MESSAGES['script_executed'], MESSAGES['script_result'])
+
+def submit_script_execution(message, router_name: str, script: str, log_template: str, result_template: str):
+    """Ставить виконання скрипта в чергу, не блокуючи потік обробки оновлень"""
     # Отримуємо інформацію для підключення з кешу
-    connection_info = router_manager.get_router_connection_info(router_name)
+    connection_info = router_manager.get_router(router_name)
     if not connection_info:
         bot.reply_to(message, MESSAGES['error_router_not_found'])
         user_state_manager.clear_user_state(message.from_user.id)
         return
     
-    # Виконуємо скрипт
-    ssh_client = RouterSSHClient(
-        connection_info['ip'], 
-        connection_info['username'], 
-        connection_info['ssh_password'], 
-        connection_info['ssh_port']
+    # Очищаємо стан одразу, щоб повторне повідомлення не запустило скрипт ще раз
+    user_state_manager.clear_user_state(message.from_user.id)
+    health_monitor.record_usage(router_name)
+    
+    # Свіжий результат скрипта лише для читання віддаємо з кешу без SSH-сесії
+    cached = get_cached_result(router_name, script)
+    if cached is not None:
+        output, age = cached
+        logging.info(LOG_MESSAGES['script_result_from_cache'].format(script, router_name, int(age)))
+        parts = split_message(MESSAGES['script_cached_result'].format(script, int(age), output))
+        reply = bot.reply_to(message, parts[0])
+        send_message_parts(reply.chat.id, parts[1:])
+        return
+    
+    # Це повідомлення згодом показуватиме хід виконання
+    progress_message = bot.reply_to(message, MESSAGES['script_queued'].format(script, router_name))
+    chat_id, message_id = progress_message.chat.id, progress_message.message_id
+    
+    # Той самий скрипт на цьому роутері вже виконується - чекаємо на його результат замість другої SSH-сесії.
+    # Кожен учасник (зокрема той, хто запустив) отримує результат у своє повідомлення з ходом виконання
+    flight_key = (router_name, script)
+    joined = single_flight.join(
+        flight_key,
+        lambda outcome: deliver_result(router_name, script, outcome, result_template, chat_id, message_id),
+        participant=(chat_id, message_id),
+        owner_id=message.from_user.id
     )
-    result = ssh_client.execute_script(script)
+    if joined:
+        logging.info(LOG_MESSAGES['script_execution_joined'].format(message.from_user.username, script, router_name))
+        job_id = single_flight.get_handle(flight_key)
+        if job_id is not None:
+            add_cancel_keyboard(chat_id, message_id, job_id)
+        return
+    
+    job = execution_engine.submit(
+        router_name, run_script_job,
+        args=(message, router_name, script, connection_info, log_template, result_template, chat_id, message_id),
+        owner_id=message.from_user.id,
+        on_discard=lambda discarded_job: finish_discarded_job(flight_key)
+    )
+    if job is None:
+        single_flight.complete(flight_key, (None, ScriptOutput.from_text(MESSAGES['execution_queue_full'])))
+        return
+    
+    # Кнопка скасування доступна кожному учаснику, поки скрипт у черзі або виконується
+    for participant_chat_id, participant_message_id in single_flight.set_handle(flight_key, job.id):
+        add_cancel_keyboard(participant_chat_id, participant_message_id, job.id)
 
-    # Логування
-    execution_time = get_current_time()
-    log_message = LOG_MESSAGES['script_executed'].format(script, router_name, execution_time)
-    logging.info(log_message)
+def add_cancel_keyboard(chat_id: int, message_id: int, job_id: int):
+    """Додає кнопку скасування до повідомлення з ходом виконання"""
+    try:
+        bot.edit_message_reply_markup(chat_id, message_id, reply_markup=create_cancel_keyboard(job_id))
+    except Exception as e:
+        logging.warning(f"Не вдалося додати кнопку скасування: {e}")
+
+def run_script_job(job: ExecutionJob, message, router_name: str, script: str, connection_info: Router,
+                   log_template: str, result_template: str, chat_id: int, message_id: int):
+    """Виконує скрипт у робочому потоці та відповідає користувачу"""
+    exit_status, result = None, ScriptOutput.from_text(MESSAGES['execution_failed'])
+    editor = None
+    try:
+        try:
+            ssh_client = create_router_client(connection_info)
+            
+            if SCRIPT_STREAMING_MODE:
+                cancel_keyboard = create_cancel_keyboard(job.id)
+                
+                def show_progress(text: str):
+                    # Той, хто запустив скрипт, міг вийти з виконання - його повідомлення вже не оновлюємо
+                    if single_flight.is_participant((chat_id, message_id)):
+                        bot.edit_message_text(text, chat_id, message_id, reply_markup=cancel_keyboard)
+                
+                editor = ThrottledMessageEditor(show_progress, MESSAGES['script_running'].format(script, router_name))
+                exit_status, result = ssh_client.stream_script(script, editor.append, editor.tick, cancel_event=job.cancel_event)
+            else:
+                exit_status, result = ssh_client.stream_script(script, cancel_event=job.cancel_event)
+        except Exception as e:
+            logging.error(f"Помилка виконання скрипта {script} на роутері {router_name}: {e}")
+            exit_status, result = None, ScriptOutput.from_text(MESSAGES['execution_error'].format(e))
+        
+        # Успішний результат скрипта лише для читання зберігаємо в кеш (крім завеликих)
+        cache_ttl = router_manager.get_script_cache_ttl(router_name, script)
+        if cache_ttl and is_successful_exit(exit_status) and not result.is_spooled:
+            result_cache.put(router_name, script, result.getvalue(), cache_ttl)
 
-    # Повідомлення адміністраторів через оптимізований клас
-    admin_notifier.send_script_execution_notification(execution_time, message.from_user.username, router_name, script)
+        # Логування
+        execution_time = get_current_time()
+        log_message = log_template.format(script, router_name, execution_time)
+        logging.info(log_message)
 
-    # Відповідь користувачу
-    bot.reply_to(message, MESSAGES['script_result'].format(script, result))
+        # Повідомлення адміністраторів через оптимізований клас (одне на спільне виконання)
+        admin_notifier.send_script_execution_notification(execution_time, message.from_user.username, router_name, script)
+    finally:
+        if editor is not None:
+            # Після цього проміжні оновлення вже не перезапишуть фінальний результат
+            editor.finish(MESSAGES['script_running'].format(script, router_name))
+        # Результат замінює повідомлення про хід виконання (і прибирає кнопку скасування) в усіх
+        # учасників, що не вийшли з виконання, навіть якщо до самого виконання не дійшло
+        single_flight.complete((router_name, script), (exit_status, result))
+
+def format_result_header(router_name: str, script: str, exit_status: int) -> str:
+    """Формує заголовок фінального повідомлення з кодом завершення"""
+    status_text = exit_status if exit_status >= 0 else 'невідомо'
+    header_key = 'script_finished' if is_successful_exit(exit_status) else 'script_finished_with_error'
+    return MESSAGES[header_key].format(script, router_name, status_text)
+
+def deliver_result(router_name: str, script: str, outcome: Tuple[Optional[int], ScriptOutput],
+                   result_template: str, chat_id: int, message_id: int):
+    """
+    Надсилає результат скрипта з урахуванням ліміту Telegram.
     
-    # Очищаємо стан користувача після успішного виконання
-    user_state_manager.clear_user_state(message.from_user.id)
+    Невеликий результат замінює повідомлення про хід виконання, середній
+    ділиться по рядках на кілька повідомлень, а завеликий надсилається
+    стисненим файлом, тоді як у повідомленні лишається його кінець.
+    """
+    exit_status, output = outcome
+    if SCRIPT_STREAMING_MODE and exit_status is not None:
+        header = format_result_header(router_name, script, exit_status)
+    else:
+        header = result_template.format(script, '')
+    
+    if not output.is_spooled:
+        parts = split_message(header + output.getvalue())
+        safe_edit_message_text(bot, parts[0], chat_id, message_id)
+        send_message_parts(chat_id, parts[1:])
+        return
+    
+    header += MESSAGES['output_sent_as_document'].format(len(output))
+    safe_edit_message_text(bot, fit_message(header, output.tail), chat_id, message_id)
+    try:
+        with output.compressed_file() as document:
+            bot.send_document(
+                chat_id, document,
+                reply_to_message_id=message_id,
+                caption=MESSAGES['output_document_caption'].format(script, router_name),
+                visible_file_name=f"{router_name}_{script}.txt.gz"
+            )
+    except Exception as e:
+        logging.error(f"Помилка відправки результату скрипта {script} файлом: {e}")
+
+def send_message_parts(chat_id: int, parts: list):
+    """Надсилає продовження довгого результату окремими повідомленнями"""
+    for part in parts:
+        try:
+            bot.send_message(chat_id, part)
+        except Exception as e:
+            logging.error(f"Помилка відправки частини результату: {e}")
+            return
+
+def finish_discarded_job(flight_key: Tuple[str, str]):
+    """Завершує виконання, скасоване ще в черзі"""
+    single_flight.complete(flight_key, (None, ScriptOutput.from_text(MESSAGES['execution_cancelled'])))
+
+def get_cached_result(router_name: str, script: str) -> Optional[Tuple[str, float]]:
+    """Отримує збережений результат, якщо скрипт позначено як кешований"""
+    if not router_manager.get_script_cache_ttl(router_name, script):
+        return None
+    return result_cache.get(router_name, script)
+
+# Обробка кнопки скасування виконання
+@bot.callback_query_handler(func=lambda call: call.data.startswith(CALLBACK_PREFIXES['cancel']))
+def handle_execution_cancel(call):
+    try:
+        job_id = int(call.data[len(CALLBACK_PREFIXES['cancel']):])
+    except ValueError:
+        bot.answer_callback_query(call.id, MESSAGES['execution_already_finished'])
+        return
+    
+    job = execution_engine.get_job(job_id)
+    participant = (call.message.chat.id, call.message.message_id)
+    participating, owner_id = single_flight.get_owner(participant)
+    if job is None or not participating:
+        bot.answer_callback_query(call.id, MESSAGES['execution_already_finished'])
+        return
+    
+    # Скасувати може лише той, хто запросив це виконання, або адміністратор
+    if owner_id != call.from_user.id and not access_manager.is_admin(call.from_user.id):
+        log_access_attempt(
+            call.from_user.id, 
+            call.from_user.username, 
+            f"cancel_script_{job.router_name}", 
+            "BLOCKED", 
+            f"Спроба скасувати чуже виконання #{job_id}"
+        )
+        bot.answer_callback_query(call.id, MESSAGES['execution_cancel_forbidden'])
+        return
+    
+    # Користувач виходить зі спільного виконання; саме виконання скасовується, лише коли в ньому нікого не лишилось
+    left = single_flight.leave(participant)
+    if left is None:
+        bot.answer_callback_query(call.id, MESSAGES['execution_already_finished'])
+        return
+    _, handle, remaining = left
+    safe_edit_message_text(bot, MESSAGES['execution_cancelled'], *participant)
+    
+    if remaining:
+        details = f"Вихід зі спільного виконання #{job_id} на роутері {job.router_name} (лишилось учасників: {remaining})"
+    else:
+        state = execution_engine.cancel(handle if handle is not None else job_id)
+        details = f"Скасування виконання #{job_id} на роутері {job.router_name} ({state or 'вже завершено'})"
+    
+    log_access_attempt(
+        call.from_user.id, 
+        call.from_user.username, 
+        f"cancel_script_{job.router_name}", 
+        "SUCCESS", 
+        details
+    )
+    bot.answer_callback_query(call.id, MESSAGES['execution_cancel_requested'])
 
 def handle_wrong_password(message, script: str):
     """Обробляє невірний пароль"""
@@ -356,43 +784,222 @@ def handle_confirmation_and_execute(message):
 
 def execute_script_with_confirmation(message, router_name: str, script: str):
     """Виконує скрипт в режимі підтвердження"""
-    # Отримуємо інформацію для підключення з кешу
-    connection_info = router_manager.get_router_connection_info(router_name)
-    if not connection_info:
+    submit_script_execution(message, router_name, script, LOG_MESSAGES['script_executed_confirmation'], MESSAGES['script_success'])
+
+def handle_script_cancellation(message, router_name: str, script: str):
+    """Обробляє скасування виконання скрипта"""
+    bot.reply_to(message, MESSAGES['script_cancelled'])
+    logging.info(LOG_MESSAGES['script_cancelled_by_user'].format(message.from_user.username, script, router_name))
+    
+    # Очищаємо стан користувача
+    user_state_manager.clear_user_state(message.from_user.id)
+
+# Обробка вибору кількох роутерів для групового запуску
+@bot.callback_query_handler(func=lambda call: call.data.startswith(CALLBACK_PREFIXES['multi']))
+def handle_multi_router_selection(call):
+    user_id = call.from_user.id
+    action = call.data[len(CALLBACK_PREFIXES['multi']):]
+    
+    user_routers = router_manager.get_user_routers(user_id)
+    if not user_routers:
+        log_access_attempt(
+            user_id, 
+            call.from_user.username, 
+            "run_multi", 
+            "BLOCKED", 
+            "Немає доступу до жодного роутера"
+        )
+        bot.send_message(call.message.chat.id, MESSAGES['no_access'])
+        return
+    
+    groups = router_manager.get_user_router_groups(user_id)
+    selected = [name for name in user_state_manager.get_selected_routers(user_id) if name in user_routers]
+    
+    if action == 'start':
+        selected = []
+    elif action.startswith('toggle_'):
+        router_name = action[len('toggle_'):]
+        if router_name in selected:
+            selected.remove(router_name)
+        elif router_name in user_routers:
+            selected.append(router_name)
+    elif action.startswith('group_'):
+        group_routers = groups.get(action[len('group_'):], [])
+        if group_routers and all(name in selected for name in group_routers):
+            # Повторне натискання знімає вибір групи
+            selected = [name for name in selected if name not in group_routers]
+        else:
+            selected += [name for name in group_routers if name not in selected]
+    elif action == 'all':
+        selected = [] if len(selected) == len(user_routers) else list(user_routers)
+    elif action == 'done':
+        if not selected:
+            bot.answer_callback_query(call.id, MESSAGES['multi_no_selection'])
+            return
+        
+        scripts = router_manager.get_common_scripts(selected)
+        if not scripts:
+            bot.send_message(call.message.chat.id, MESSAGES['multi_no_common_scripts'])
+            return
+        
+        user_state_manager.set_waiting_for_multi_script(user_id, selected)
+        keyboard = create_multi_script_keyboard(scripts)
+        bot.send_message(call.message.chat.id, MESSAGES['multi_select_script'].format(len(selected)), reply_markup=keyboard)
+        return
+    elif action.startswith('script_'):
+        script = action[len('script_'):]
+        if not selected or script not in router_manager.get_common_scripts(selected):
+            bot.send_message(call.message.chat.id, MESSAGES['router_not_found'])
+            return
+        
+        if SCRIPT_PASSWORD_MODE:
+            bot.send_message(call.message.chat.id, MESSAGES['multi_password_prompt'].format(script, len(selected)))
+            user_state_manager.set_waiting_for_multi_password(user_id, script)
+        else:
+            bot.send_message(call.message.chat.id, MESSAGES['multi_confirmation_prompt'].format(script, ', '.join(selected)))
+            user_state_manager.set_waiting_for_multi_confirmation(user_id, script)
+        return
+    
+    user_state_manager.set_selecting_routers(user_id, selected)
+    keyboard = create_multi_router_keyboard(user_routers, selected, sorted(groups),
+                                            unreachable=get_unreachable_routers(user_routers))
+    safe_edit_message_text(bot, MESSAGES['multi_select_routers'], call.message.chat.id, call.message.message_id, reply_markup=keyboard)
+
+# Перевірка пароля та груповий запуск скрипта
+@bot.message_handler(func=lambda message: user_state_manager.is_in_state(message.from_user.id, USER_STATES['waiting_for_multi_password']))
+def verify_password_and_execute_multi(message):
+    router_names = user_state_manager.get_selected_routers(message.from_user.id)
+    script = user_state_manager.get_script_name(message.from_user.id)
+    
+    if not router_names or not script:
         bot.reply_to(message, MESSAGES['error_router_not_found'])
         user_state_manager.clear_user_state(message.from_user.id)
         return
     
-    # Виконуємо скрипт без перевірки пароля
-    ssh_client = RouterSSHClient(
-        connection_info['ip'], 
-        connection_info['username'], 
-        connection_info['ssh_password'], 
-        connection_info['ssh_port']
-    )
-    result = ssh_client.execute_script(script)
-
-    # Логування
-    execution_time = get_current_time()
-    log_message = LOG_MESSAGES['script_executed_confirmation'].format(script, router_name, execution_time)
-    logging.info(log_message)
-
-    # Повідомлення адміністраторів через оптимізований клас
-    admin_notifier.send_script_execution_notification(execution_time, message.from_user.username, router_name, script)
+    # Пароль скрипта задається окремо для кожного роутера
+    accepted = [name for name in router_names if router_manager.validate_script_password(name, message.text)]
+    if not accepted:
+        handle_wrong_password(message, script)
+        return
+    
+    skipped = {name: MESSAGES['multi_wrong_password_skipped'] for name in router_names if name not in accepted}
+    start_multi_execution(message, accepted, script, skipped)
 
-    # Відповідь користувачу
-    bot.reply_to(message, MESSAGES['script_success'].format(script, result))
+# Обробка підтвердження групового запуску (режим без пароля)
+@bot.message_handler(func=lambda message: user_state_manager.is_in_state(message.from_user.id, USER_STATES['waiting_for_multi_confirmation']))
+def handle_confirmation_and_execute_multi(message):
+    router_names = user_state_manager.get_selected_routers(message.from_user.id)
+    script = user_state_manager.get_script_name(message.from_user.id)
     
-    # Очищаємо стан користувача
+    if not router_names or not script:
+        bot.reply_to(message, MESSAGES['error_router_not_found'])
+        user_state_manager.clear_user_state(message.from_user.id)
+        return
+    
+    if is_positive_confirmation(message.text):
+        start_multi_execution(message, router_names, script)
+    elif is_negative_confirmation(message.text):
+        handle_script_cancellation(message, ', '.join(router_names), script)
+    else:
+        bot.reply_to(message, MESSAGES['invalid_response'])
+
+def start_multi_execution(message, router_names: list, script: str, skipped: dict = None):
+    """Запускає скрипт на кількох роутерах паралельно з одним підсумковим повідомленням"""
     user_state_manager.clear_user_state(message.from_user.id)
+    
+    # Повторно перевіряємо доступ: вибір міг застаріти, поки користувач вводив пароль
+    allowed = [name for name in router_names if router_manager.user_has_access(message.from_user.id, name)]
+    if not allowed:
+        bot.reply_to(message, MESSAGES['router_not_found'])
+        return
+    
+    log_access_attempt(
+        message.from_user.id, 
+        message.from_user.username, 
+        "run_multi", 
+        "SUCCESS", 
+        f"Груповий запуск скрипта {script} на роутерах: {', '.join(allowed)}"
+    )
+    
+    fanout = FanOutRun(script, allowed, skipped)
+    summary_message = bot.reply_to(message, fanout.render())
+    chat_id, message_id = summary_message.chat.id, summary_message.message_id
+    username = message.from_user.username
+    
+    fanout.start(lambda router_name: submit_fanout_router(
+        fanout, router_name, chat_id, message_id, username, message.from_user.id
+    ))
+    
+    # Усі роутери могли не потрапити в чергу - тоді показуємо підсумок одразу
+    if fanout.claim_finish():
+        fanout.publish(lambda text: safe_edit_message_text(bot, text, chat_id, message_id), final=True)
 
-def handle_script_cancellation(message, router_name: str, script: str):
-    """Обробляє скасування виконання скрипта"""
-    bot.reply_to(message, MESSAGES['script_cancelled'])
-    logging.info(LOG_MESSAGES['script_cancelled_by_user'].format(message.from_user.username, script, router_name))
+def submit_fanout_router(fanout: FanOutRun, router_name: str, chat_id: int, message_id: int,
+                         username: str, owner_id: int) -> bool:
+    """Ставить в чергу виконання групового запуску на одному роутері або приєднує до вже запущеного"""
+    flight_key = (router_name, fanout.script)
+    fanout.mark_running(router_name)
+    health_monitor.record_usage(router_name)
+    
+    participant = object()
+    joined = single_flight.join(
+        flight_key,
+        lambda outcome: complete_fanout_router(
+            fanout, router_name, is_successful_exit(outcome[0]), outcome[1].preview, chat_id, message_id, username
+        ),
+        participant=participant
+    )
+    if joined:
+        logging.info(LOG_MESSAGES['script_execution_joined'].format(username, fanout.script, router_name))
+        return True
     
-    # Очищаємо стан користувача
-    user_state_manager.clear_user_state(message.from_user.id)
+    job = execution_engine.submit(
+        router_name, run_fanout_job, args=(fanout, router_name),
+        owner_id=owner_id
+    )
+    if job is None:
+        # Переповнену чергу груповий запуск фіксує сам (submit повертає False) - решті учасників передаємо помилку
+        single_flight.leave(participant)
+        single_flight.complete(flight_key, (None, ScriptOutput.from_text(MESSAGES['execution_queue_full'])))
+        return False
+    return True
+
+def run_fanout_job(job: ExecutionJob, fanout: FanOutRun, router_name: str):
+    """Виконує скрипт групового запуску на одному роутері"""
+    exit_status, output = None, ScriptOutput.from_text(MESSAGES['execution_failed'])
+    try:
+        connection_info = router_manager.get_router(router_name)
+        cached = get_cached_result(router_name, fanout.script)
+        if not connection_info:
+            output = ScriptOutput.from_text(MESSAGES['error_router_not_found'])
+        elif cached is not None:
+            exit_status = 0
+            output = ScriptOutput.from_text(MESSAGES['fanout_cached_result'].format(int(cached[1]), cached[0]))
+        else:
+            ssh_client = create_router_client(connection_info)
+            exit_status, output = ssh_client.stream_script(fanout.script, cancel_event=job.cancel_event)
+            
+            cache_ttl = router_manager.get_script_cache_ttl(router_name, fanout.script)
+            if cache_ttl and is_successful_exit(exit_status) and not output.is_spooled:
+                result_cache.put(router_name, fanout.script, output.getvalue(), cache_ttl)
+            
+            execution_time = get_current_time()
+            logging.info(LOG_MESSAGES['script_executed_multi'].format(fanout.script, router_name, execution_time))
+    finally:
+        # Результат роутера фіксується через учасника, доданого в submit_fanout_router
+        single_flight.complete((router_name, fanout.script), (exit_status, output))
+
+def complete_fanout_router(fanout: FanOutRun, router_name: str, success: bool, output: str,
+                           chat_id: int, message_id: int, username: str):
+    """Фіксує результат роутера в груповому запуску та оновлює підсумок"""
+    finished = fanout.complete(router_name, success, output)
+    fanout.publish(lambda text: safe_edit_message_text(bot, text, chat_id, message_id), final=finished)
+    
+    if finished:
+        # Одне повідомлення адміністраторам на весь груповий запуск
+        admin_notifier.send_script_execution_notification(
+            get_current_time(), username, ', '.join(fanout.router_names), fanout.script
+        )
 
 # Обробка callback-запитів для управління доступом
 @bot.callback_query_handler(func=lambda call: call.data.startswith('access_'))
@@ -470,13 +1077,13 @@ def handle_access_management(call):
             router_name = parts[2]
             
             # Отримуємо детальну інформацію про роутер
-            routers_info = access_manager.get_all_routers_info()
-            if router_name in routers_info:
-                info = routers_info[router_name]
+            info = access_manager.get_router_info(router_name)
+            if info:
                 header_text = f"🔐 **Управління роутером {router_name}**\n\n"
                 header_text += f"🌐 **IP:** `{info['ip']}`\n"
                 header_text += f"👥 **Користувачів:** {info['users_count']}\n"
-                header_text += f"🖥️ **Скрипти:** {', '.join(info['scripts'])}\n\n"
+                header_text += f"🖥️ **Скрипти:** {', '.join(info['scripts'])}\n"
+                header_text += f"🛡 **З'єднання:** {format_circuit_status(router_name)}\n\n"
                 header_text += f"📋 **Виберіть дію:**"
             else:
                 header_text = f"🔐 **Управління роутером {router_name}**\n\n📋 **Виберіть дію:**"
@@ -508,8 +1115,8 @@ def handle_access_management(call):
             info_text = MESSAGES['access_router_info'].format("")
             for router_name, info in routers_info.items():
                 info_text += f"**{router_name}**\n"
-                info_text += f"IP: {info['ip']}\n"
-                info_text += f"Скрипти: {', '.join(info['scripts'])}\n"
+                info_text += f"IP: {info['ip'] or '—'}\n"
+                info_text += f"Скрипти: {format_router_scripts(info)}\n"
                 info_text += f"Користувачів: {info['users_count']}\n\n"
             
             safe_edit_message_text(bot, info_text, call.message.chat.id, call.message.message_id, parse_mode='Markdown')
@@ -522,8 +1129,8 @@ def handle_access_management(call):
             info_text = "🌐 **Інформація про всі роутери:**\n\n"
             for router_name, info in routers_info.items():
                 info_text += f"**{router_name}**\n"
-                info_text += f"IP: `{info['ip']}`\n"
-                info_text += f"Скрипти: {', '.join(info['scripts'])}\n"
+                info_text += f"IP: `{info['ip'] or '—'}`\n"
+                info_text += f"Скрипти: {format_router_scripts(info)}\n"
                 info_text += f"Користувачів: {info['users_count']}\n\n"
             
             safe_edit_message_text(bot, info_text, call.message.chat.id, call.message.message_id, parse_mode='Markdown')
@@ -535,7 +1142,8 @@ def handle_access_management(call):
         if routers_info:
             total_routers = len(routers_info)
             total_users = sum(info['users_count'] for info in routers_info.values())
-            total_scripts = sum(len(info['scripts']) for info in routers_info.values())
+            # Для routers.d враховуються лише роутери з уже завантаженою моделлю
+            total_scripts = sum(len(info['scripts']) for info in routers_info.values() if info['scripts'] is not None)
             
             stats_text = f"📊 **Статистика системи:**\n\n"
             stats_text += f"🌐 **Роутерів:** {total_routers}\n"
@@ -545,7 +1153,8 @@ def handle_access_management(call):
             # Детальна статистика по роутерах
             stats_text += "📋 **Деталі по роутерах:**\n"
             for router_name, info in routers_info.items():
-                stats_text += f"• **{router_name}**: {info['users_count']} користувачів, {len(info['scripts'])} скриптів\n"
+                scripts_count = len(info['scripts']) if info['scripts'] is not None else "?"
+                stats_text += f"• **{router_name}**: {info['users_count']} користувачів, {scripts_count} скриптів\n"
             
             keyboard = access_manager.create_management_keyboard()
             safe_edit_message_text(bot, stats_text, call.message.chat.id, call.message.message_id, reply_markup=keyboard, parse_mode='Markdown')
@@ -553,7 +1162,7 @@ def handle_access_management(call):
             safe_edit_message_text(bot, "❌ Помилка отримання статистики", call.message.chat.id, call.message.message_id)
     
     elif action == 'refresh':
-        # Очищаємо кеш та отримуємо свіжі дані
+        # Перечитуємо налаштування: результати скидаються лише для змінених роутерів (on_router_changed)
         access_manager.clear_cache()
         routers_info = access_manager.get_all_routers_info()
         
@@ -596,15 +1205,16 @@ def handle_access_management(call):
         parts = call.data.split('_', 3)
         if len(parts) >= 4:
             router_name = parts[3]
-            routers_info = access_manager.get_all_routers_info()
+            info = access_manager.get_router_info(router_name)
             
-            if router_name in routers_info:
-                info = routers_info[router_name]
+            if info:
                 message_text = f"📊 **Деталі роутера {router_name}**:\n\n"
                 message_text += f"🌐 **IP:** `{info['ip']}`\n"
                 message_text += f"🖥️ **Скрипти:** {', '.join(info['scripts'])}\n"
                 message_text += f"👥 **Користувачів:** {info['users_count']}\n"
-                message_text += f"📋 **Користувачі:** {', '.join(info['allowed_users']) if info['allowed_users'] else 'немає'}"
+                message_text += f"📋 **Користувачі:** {', '.join(info['allowed_users']) if info['allowed_users'] else 'немає'}\n"
+                message_text += f"🛡 **З'єднання:** {format_circuit_status(router_name)}\n"
+                message_text += f"⏱ **Затримки:**\n{format_latency_stats(router_name)}"
             else:
                 message_text = f"❌ **Роутер {router_name} не знайдено**"
             
@@ -621,10 +1231,10 @@ def handle_access_management(call):
             
             # Очищаємо кеш та отримуємо свіжі дані
             access_manager.clear_cache()
-            routers_info = access_manager.get_all_routers_info()
+            result_cache.invalidate_router(router_name)
+            info = access_manager.get_router_info(router_name)
             
-            if router_name in routers_info:
-                info = routers_info[router_name]
+            if info:
                 
                 # Формуємо оновлений заголовок
                 header_text = f"🔄 **Дані роутера {router_name} оновлено!**\n\n"
@@ -792,6 +1402,53 @@ def handle_access_management(call):
         else:
             bot.answer_callback_query(call.id, "❌ Помилка: не вдалося отримати назву роутера")
     
+    elif action == 'schedules':
+        # Формат: access_schedules_{router_name}
+        parts = call.data.split('_', 2)
+        if len(parts) >= 3:
+            show_router_schedules(call.message.chat.id, call.message.message_id, parts[2])
+        else:
+            bot.answer_callback_query(call.id, "❌ Помилка: не вдалося отримати назву роутера")
+    
+    elif action == 'addschedule':
+        # Формат: access_addschedule_{router_name}
+        parts = call.data.split('_', 2)
+        if len(parts) >= 3:
+            router_name = parts[2]
+            _, scripts = access_manager.get_router_scripts(router_name)
+            user_state_manager.set_state(call.from_user.id, USER_STATES['waiting_for_schedule_add'], router_name=router_name)
+            safe_edit_message_text(
+                bot,
+                MESSAGES['schedule_add_prompt'].format(router_name, ', '.join(scripts) or '—'),
+                call.message.chat.id,
+                call.message.message_id
+            )
+        else:
+            bot.answer_callback_query(call.id, "❌ Помилка: не вдалося отримати назву роутера")
+    
+    elif action == 'unschedule':
+        # Формат: access_unschedule_{schedule_id}
+        parts = call.data.split('_', 2)
+        if len(parts) >= 3 and parts[2].isdigit():
+            success, message_text, removed = schedule_store.remove_schedule(int(parts[2]))
+            log_access_attempt(
+                call.from_user.id,
+                call.from_user.username,
+                "remove_schedule",
+                "SUCCESS" if success else "FAILED",
+                message_text
+            )
+            bot.answer_callback_query(call.id, message_text)
+            if removed:
+                show_router_schedules(call.message.chat.id, call.message.message_id, removed['router'])
+        else:
+            bot.answer_callback_query(call.id, "❌ Помилка: некоректний розклад")
+    
+    elif action == 'bulk':
+        # Формат: access_bulk - очікуємо документ зі змінами доступу
+        user_state_manager.set_state(call.from_user.id, USER_STATES['waiting_for_bulk_document'])
+        safe_edit_message_text(bot, MESSAGES['bulk_prompt'], call.message.chat.id, call.message.message_id)
+    
     elif action == 'separator':
         # Ігноруємо розділювач
         bot.answer_callback_query(call.id, "")
@@ -943,6 +1600,189 @@ def handle_script_name_input(message):
     # Очищаємо стан користувача
     user_state_manager.clear_user_state(message.from_user.id)
 
+# Обробка введення нового розкладу запуску
+@bot.message_handler(func=lambda message: user_state_manager.is_in_state(message.from_user.id, USER_STATES['waiting_for_schedule_add']))
+def handle_schedule_input(message):
+    router_name = user_state_manager.get_user_data(message.from_user.id, 'router_name')
+    if not router_name or not access_manager.is_admin(message.from_user.id):
+        bot.reply_to(message, "❌ Помилка: не вдалося отримати назву роутера")
+        user_state_manager.clear_user_state(message.from_user.id)
+        return
+    
+    script, _, cron = message.text.strip().partition(' ')
+    _, scripts = access_manager.get_router_scripts(router_name)
+    if script not in scripts:
+        # Стан не скидаємо, щоб можна було одразу ввести правильний скрипт
+        bot.reply_to(message, MESSAGES['schedule_unknown_script'].format(script, router_name))
+        return
+    
+    success, message_text = schedule_store.add_schedule(router_name, script, cron, str(message.from_user.username or message.from_user.id))
+    log_access_attempt(
+        message.from_user.id,
+        message.from_user.username,
+        f"add_schedule_{router_name}",
+        "SUCCESS" if success else "FAILED",
+        message_text
+    )
+    if not success:
+        bot.reply_to(message, f"❌ {message_text}")
+        return
+    
+    user_state_manager.clear_user_state(message.from_user.id)
+    schedules = schedule_store.get_schedules(router_name)
+    bot.reply_to(message, f"✅ {message_text}", reply_markup=create_schedule_keyboard(router_name, schedules))
+
+# Обробка документа з масовими змінами доступу
+@bot.message_handler(content_types=['document', 'text'],
+                     func=lambda message: user_state_manager.is_in_state(message.from_user.id, USER_STATES['waiting_for_bulk_document']))
+def handle_bulk_document(message):
+    user_state_manager.clear_user_state(message.from_user.id)
+    if not access_manager.is_admin(message.from_user.id):
+        bot.reply_to(message, MESSAGES['access_no_permission'])
+        return
+    
+    if message.content_type != 'document':
+        bot.reply_to(message, MESSAGES['bulk_not_document'])
+        return
+    
+    document = message.document
+    if document.file_size and document.file_size > BULK_UPLOAD_MAX_BYTES:
+        bot.reply_to(message, MESSAGES['bulk_too_large'].format(BULK_UPLOAD_MAX_BYTES // 1024))
+        return
+    
+    try:
+        file_info = bot.get_file(document.file_id)
+        data = bot.download_file(file_info.file_path)
+        if len(data) > BULK_UPLOAD_MAX_BYTES:
+            bot.reply_to(message, MESSAGES['bulk_too_large'].format(BULK_UPLOAD_MAX_BYTES // 1024))
+            return
+        rows = parse_document(document.file_name or '', data)
+    except ValueError as e:
+        bot.reply_to(message, MESSAGES['bulk_parse_error'].format(e))
+        return
+    except Exception as e:
+        logging.error(f"Помилка завантаження документа з масовими змінами доступу: {e}")
+        bot.reply_to(message, MESSAGES['bulk_parse_error'].format(e))
+        return
+    
+    applied = access_manager.apply_bulk_changes(rows)
+    log_access_attempt(
+        message.from_user.id,
+        message.from_user.username,
+        "bulk_access",
+        "SUCCESS" if applied else "FAILED",
+        f"Документ {document.file_name}: {len(rows)} рядків"
+    )
+    
+    parts = split_message(render_report(rows, applied))
+    for index, part in enumerate(parts):
+        keyboard = access_manager.create_management_keyboard() if applied and index == len(parts) - 1 else None
+        if index == 0:
+            bot.reply_to(message, part, reply_markup=keyboard)
+        else:
+            bot.send_message(message.chat.id, part, reply_markup=keyboard)
+
+def show_router_schedules(chat_id: int, message_id: int, router_name: str):
+    """Показує розклади запусків роутера з кнопками керування"""
+    schedules = schedule_store.get_schedules(router_name)
+    text = MESSAGES['schedule_list_header'].format(router_name)
+    if not schedules:
+        text += "\n\n" + MESSAGES['schedule_list_empty']
+    safe_edit_message_text(bot, text, chat_id, message_id, reply_markup=create_schedule_keyboard(router_name, schedules))
+
+def submit_scheduled_run(batch: ScheduledBatch, entry: dict) -> bool:
+    """Ставить запуск за розкладом у чергу фонового виконання"""
+    job = execution_engine.submit(
+        entry['router'], run_scheduled_job, args=(batch, entry),
+        on_discard=lambda discarded: batch.complete(entry, False, MESSAGES['execution_cancelled'])
+    )
+    return job is not None
+
+def run_scheduled_job(job: ExecutionJob, batch: ScheduledBatch, entry: dict):
+    """Виконує скрипт за розкладом у робочому потоці"""
+    router_name, script = entry['router'], entry['script']
+    success, output = False, MESSAGES['execution_failed']
+    try:
+        connection_info = router_manager.get_router(router_name)
+        if not connection_info:
+            output = MESSAGES['error_router_not_found']
+            return
+        
+        # Скрипт могли прибрати з роутера після створення розкладу
+        if script not in router_manager.get_router_scripts(router_name):
+            output = MESSAGES['schedule_unknown_script'].format(script, router_name)
+            return
+        
+        exit_status, result = create_router_client(connection_info).stream_script(script, cancel_event=job.cancel_event)
+        success, output = is_successful_exit(exit_status), result.preview
+        logging.info(LOG_MESSAGES['script_executed_scheduled'].format(script, router_name, get_current_time()))
+    finally:
+        batch.complete(entry, success, output)
+
+def get_unreachable_routers(router_names: list) -> set:
+    """Роутери, які фонова перевірка або запобіжник вважають недоступними"""
+    unreachable = set()
+    for router_name in router_names:
+        if health_monitor.is_unreachable(router_name):
+            unreachable.add(router_name)
+            continue
+        
+        router = router_manager.get_router(router_name)
+        if router:
+            if not circuit_breaker.allow(router.ip, router.port):
+                unreachable.add(router_name)
+    return unreachable
+
+def format_router_scripts(info: dict) -> str:
+    """Формує перелік скриптів з get_all_routers_info (routers.d: модель може бути ще не завантажена)"""
+    if info['scripts'] is None:
+        return "не завантажено"
+    return ', '.join(info['scripts'])
+
+def format_circuit_status(router_name: str) -> str:
+    """Формує опис стану запобіжника роутера для адміністративних екранів"""
+    router = router_manager.get_router(router_name)
+    if not router:
+        return "невідомо"
+    
+    status = circuit_breaker.get_status(router.ip, router.port)
+    health = health_monitor.get_health(router_name)
+    if status['state'] == CIRCUIT_CLOSED and health is not None and not health.reachable:
+        return f"⚫ не відповідає на перевірку: {health.error}"
+    if status['state'] == CIRCUIT_CLOSED:
+        text = "🟢 доступний"
+        if health is not None and health.rtt is not None:
+            text += f", відповідь {health.rtt * 1000:.0f} мс"
+        if status['consecutive_failures']:
+            text += f" (невдалих спроб поспіль: {status['consecutive_failures']})"
+        return text
+    if status['state'] == CIRCUIT_OPEN:
+        return f"🔴 недоступний, повторна перевірка через {status['retry_in']} с"
+    return "🟡 перевіряється"
+
+def format_latency_stats(router_name: str) -> str:
+    """Формує статистику затримок та діючі таймаути роутера для адміністративних екранів"""
+    router = router_manager.get_router(router_name)
+    if not router:
+        return "невідомо"
+    
+    stats = latency_tracker.get_stats(router.ip, router.port)
+    connect_timeout, run_timeout = get_effective_timeouts(router)
+    mode = "адаптивний" if router.adaptive_timeouts else "фіксований"
+    
+    lines = []
+    for kind, title, timeout in ((LATENCY_CONNECT, "підключення", connect_timeout),
+                                 (LATENCY_RUN, "виконання", run_timeout)):
+        kind_stats = stats[kind]
+        if kind_stats is None:
+            lines.append(f"• {title}: вимірів немає, таймаут {timeout:g} с ({mode})")
+        else:
+            lines.append(
+                f"• {title}: середнє {kind_stats['ewma']:.2f} с, p50 ≤{kind_stats['p50']:.2f} с, "
+                f"p99 ≤{kind_stats['p99']:.2f} с ({kind_stats['samples']} вим.), таймаут {timeout:g} с ({mode})"
+            )
+    return "\n".join(lines)
+
 def safe_edit_message_text(bot, text, chat_id, message_id, reply_markup=None, parse_mode=None):
     """Безпечно редагує повідомлення з обробкою помилки 'message is not modified'"""
     try:
@@ -982,6 +1822,11 @@ if __name__ == "__main__":
         'з паролем' if SCRIPT_PASSWORD_MODE else 'з підтвердженням'
     ))
     
+    # Попереднє підключення до роутерів та перевірка їх доступності у фоні
+    health_monitor.start()
+    script_scheduler.start()
+    config_store.start_watching()
+    
     try:
         bot.polling(none_stop=True)
     except KeyboardInterrupt:
@@ -990,3 +1835,13 @@ if __name__ == "__main__":
     except Exception as e:
         logging.error(f"Помилка в роботі бота: {e}")
         admin_notifier.cleanup()
+    finally:
+        # Спершу зупиняємо все, що запускає скрипти, і чекаємо на поточні виконання
+        script_scheduler.stop()
+        health_monitor.stop()
+        execution_engine.stop()
+        circuit_breaker.stop()
+        ssh_pool.close_all()
+        api_pool.close_all()
+        # Сховище налаштувань закривається останнім: завдання читають його до самого завершення
+        config_store.close()
@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+from typing import Any, List, Optional
+from config import BULK_UPLOAD_MAX_ROWS
+from constants import MESSAGES
+
+# Дії над рядком документа
+BULK_ACTIONS = ('add', 'remove')
+
+# Стани рядка після обробки
+ROW_PENDING = 'pending'
+ROW_APPLIED = 'applied'
+ROW_UNCHANGED = 'unchanged'
+ROW_INVALID = 'invalid'
+
+# Поле роутера в routers.json для кожної колонки документа
+ROW_FIELDS = {'user_id': 'allowed_users', 'script': 'scripts'}
+
+
+class ProvisioningRow:
+    """Один рядок документа масових змін: дія над користувачем або скриптом роутера"""
+
+    __slots__ = ('line', 'router', 'field', 'value', 'action', 'status', 'message')
+
+    def __init__(self, line: int, router: str, field: Optional[str], value: str, action: str,
+                 error: Optional[str] = None):
+        self.line = line
+        self.router = router
+        self.field = field
+        self.value = value
+        self.action = action
+        self.status = ROW_INVALID if error else ROW_PENDING
+        self.message = error or ''
+
+    def reject(self, error: str):
+        """Позначає рядок як некоректний"""
+        self.status = ROW_INVALID
+        self.message = error
+
+    def describe(self) -> str:
+        """Короткий опис зміни для звіту"""
+        sign = '+' if self.action == 'add' else '−' if self.action == 'remove' else '?'
+        kind = 'скрипт' if self.field == 'scripts' else 'користувач'
+        return f"{sign} {kind} {self.value or '—'} → {self.router or '—'}"
+
+
+def _cell(record: dict, key: str) -> str:
+    value = record.get(key)
+    return '' if value is None else str(value).strip()
+
+
+def _make_row(line: int, record: Any) -> ProvisioningRow:
+    """Створює рядок із запису CSV або JSON (перевіряється лише структура)"""
+    if not isinstance(record, dict):
+        return ProvisioningRow(line, '', None, '', '', "очікується об'єкт з полями router, user_id/script, action")
+
+    router = _cell(record, 'router')
+    action = _cell(record, 'action').lower() or 'add'
+    values = [(column, _cell(record, column)) for column in ROW_FIELDS if _cell(record, column)]
+    if len(values) != 1:
+        return ProvisioningRow(line, router, None, '', action, "потрібно вказати або user_id, або script")
+
+    column, value = values[0]
+    row = ProvisioningRow(line, router, ROW_FIELDS[column], value, action)
+    if not router:
+        row.reject("не вказано router")
+    elif action not in BULK_ACTIONS:
+        row.reject(f"невідома дія '{action}' (можливі: {', '.join(BULK_ACTIONS)})")
+    return row
+
+
+def parse_document(file_name: str, data: bytes) -> List[ProvisioningRow]:
+    """
+    Розбирає документ зі змінами доступу.
+
+    CSV: рядок заголовка з колонками router, user_id та/або script, action
+    (роздільник кома або крапка з комою). JSON: список об'єктів з тими самими
+    полями або {"rows": [...]}. Дія за замовчуванням - add.
+
+    :raises ValueError: Якщо документ не вдалося прочитати
+    """
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise ValueError("документ має бути в кодуванні UTF-8")
+
+    if file_name.lower().endswith('.json') or text.lstrip()[:1] in ('[', '{'):
+        try:
+            records = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"некоректний JSON: {e}")
+        if isinstance(records, dict):
+            records = records.get('rows')
+        if not isinstance(records, list):
+            raise ValueError("JSON має бути списком рядків або об'єктом з полем rows")
+        numbered = enumerate(records, start=1)
+    else:
+        delimiter = ';' if text.split('\n', 1)[0].count(';') > text.split('\n', 1)[0].count(',') else ','
+        reader = csv.DictReader(io.StringIO(text), delimiter=delimiter)
+        columns = {name.strip().lower() for name in reader.fieldnames or ()}
+        if 'router' not in columns or not columns & set(ROW_FIELDS):
+            raise ValueError("перший рядок CSV має бути заголовком: router,user_id,action або router,script,action")
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+        # Номер рядка у файлі з урахуванням заголовка
+        numbered = ((reader.line_num, record) for record in reader if any(record.values()))
+
+    rows = []
+    for line, record in numbered:
+        if len(rows) >= BULK_UPLOAD_MAX_ROWS:
+            raise ValueError(f"забагато рядків (максимум {BULK_UPLOAD_MAX_ROWS})")
+        rows.append(_make_row(line, record))
+    if not rows:
+        raise ValueError("документ не містить жодного рядка")
+    return rows
+
+
+def render_report(rows: List[ProvisioningRow], applied: bool) -> str:
+    """Формує звіт по рядках документа"""
+    counts = {status: sum(1 for row in rows if row.status == status)
+              for status in (ROW_APPLIED, ROW_UNCHANGED, ROW_INVALID)}
+    if applied:
+        lines = [MESSAGES['bulk_report_header'].format(counts[ROW_APPLIED], counts[ROW_UNCHANGED], len(rows))]
+    else:
+        lines = [MESSAGES['bulk_report_rejected'].format(counts[ROW_INVALID], len(rows))]
+
+    marks = {ROW_APPLIED: '✅', ROW_UNCHANGED: '➖', ROW_INVALID: '❌', ROW_PENDING: '⏸'}
+    for row in rows:
+        # Якщо зміни відхилено, коректні рядки не застосовувались - показуємо лише помилки
+        if not applied and row.status != ROW_INVALID:
+            continue
+        line = f"{marks[row.status]} рядок {row.line}: {row.describe()}"
+        if row.message:
+            line += f" — {row.message}"
+        lines.append(line)
+    return "\n".join(lines)
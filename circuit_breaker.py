@@ -0,0 +1,167 @@
+import logging
+import socket
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+from config import (
+    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_WINDOW, CIRCUIT_FAILURE_RATE,
+    CIRCUIT_RECOVERY_TIMEOUT, CIRCUIT_PROBE_INTERVAL, CIRCUIT_PROBE_TIMEOUT
+)
+
+# Стани запобіжника
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half_open'
+
+# Ключ запобіжника: (ip, порт)
+Endpoint = Tuple[str, int]
+
+
+class _Circuit:
+    """Стан запобіжника одного роутера"""
+
+    def __init__(self, window: int):
+        self.state = CIRCUIT_CLOSED
+        self.consecutive_failures = 0
+        self.recent = deque(maxlen=window)
+        self.opened_at = 0.0
+        self.last_error = ''
+        self.last_checked = 0.0
+
+
+class CircuitBreaker:
+    """Клас для відстеження доступності роутерів і швидкої відмови для недоступних"""
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 window: int = CIRCUIT_WINDOW,
+                 failure_rate: float = CIRCUIT_FAILURE_RATE,
+                 recovery_timeout: int = CIRCUIT_RECOVERY_TIMEOUT,
+                 probe_interval: int = CIRCUIT_PROBE_INTERVAL,
+                 probe_timeout: int = CIRCUIT_PROBE_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.failure_rate = failure_rate
+        self.recovery_timeout = recovery_timeout
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+
+        self._circuits: Dict[Endpoint, _Circuit] = {}
+        self._lock = threading.Lock()
+        self._probe_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def _get_circuit(self, endpoint: Endpoint) -> _Circuit:
+        """Отримує або створює запобіжник (викликається під self._lock)"""
+        circuit = self._circuits.get(endpoint)
+        if circuit is None:
+            circuit = _Circuit(self.window)
+            self._circuits[endpoint] = circuit
+        return circuit
+
+    def allow(self, ip: str, port: int) -> bool:
+        """Перевіряє, чи можна підключатися до роутера"""
+        with self._lock:
+            circuit = self._circuits.get((ip, port))
+            return circuit is None or circuit.state == CIRCUIT_CLOSED
+
+    def record_success(self, ip: str, port: int):
+        """Фіксує успішне підключення"""
+        with self._lock:
+            circuit = self._get_circuit((ip, port))
+            circuit.recent.append(True)
+            circuit.consecutive_failures = 0
+            circuit.last_checked = time.time()
+            if circuit.state != CIRCUIT_CLOSED:
+                # Старі невдачі більше не показові для відновленого роутера
+                circuit.state = CIRCUIT_CLOSED
+                circuit.recent.clear()
+                circuit.recent.append(True)
+                logging.info(f"Запобіжник для {ip}:{port} закрито - роутер знову доступний")
+
+    def record_failure(self, ip: str, port: int, error: str):
+        """Фіксує невдале підключення та відкриває запобіжник, якщо невдач забагато"""
+        with self._lock:
+            circuit = self._get_circuit((ip, port))
+            circuit.recent.append(False)
+            circuit.consecutive_failures += 1
+            circuit.last_error = error
+            circuit.last_checked = time.time()
+
+            failures = circuit.recent.count(False)
+            too_many_in_row = circuit.consecutive_failures >= self.failure_threshold
+            too_many_in_window = (len(circuit.recent) == self.window and
+                                  failures / self.window >= self.failure_rate)
+
+            if circuit.state == CIRCUIT_CLOSED and (too_many_in_row or too_many_in_window):
+                circuit.state = CIRCUIT_OPEN
+                circuit.opened_at = time.time()
+                logging.warning(f"Запобіжник для {ip}:{port} відкрито після {circuit.consecutive_failures} невдалих спроб: {error}")
+                self._start_probing()
+
+    def get_status(self, ip: str, port: int) -> dict:
+        """Отримує стан запобіжника для відображення"""
+        with self._lock:
+            circuit = self._circuits.get((ip, port))
+            if circuit is None:
+                return {
+                    'state': CIRCUIT_CLOSED,
+                    'consecutive_failures': 0,
+                    'last_error': '',
+                    'retry_in': 0
+                }
+
+            retry_in = 0
+            if circuit.state == CIRCUIT_OPEN:
+                retry_in = max(0, int(circuit.opened_at + self.recovery_timeout - time.time()))
+
+            return {
+                'state': circuit.state,
+                'consecutive_failures': circuit.consecutive_failures,
+                'last_error': circuit.last_error,
+                'retry_in': retry_in
+            }
+
+    def _start_probing(self):
+        """Запускає фоновий потік перевірки відкритих запобіжників (тільки один раз)"""
+        if self._probe_thread is not None and self._probe_thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._probe_thread = threading.Thread(target=self._probe_loop, name="circuit-probe", daemon=True)
+        self._probe_thread.start()
+
+    def _probe_loop(self):
+        """Періодично перевіряє відкриті запобіжники, чий час очікування минув"""
+        while not self._stop_event.wait(self.probe_interval):
+            now = time.time()
+            with self._lock:
+                due = []
+                for endpoint, circuit in self._circuits.items():
+                    if circuit.state == CIRCUIT_OPEN and now - circuit.opened_at >= self.recovery_timeout:
+                        circuit.state = CIRCUIT_HALF_OPEN
+                        due.append(endpoint)
+
+            for ip, port in due:
+                self._probe(ip, port)
+
+    def _probe(self, ip: str, port: int):
+        """Напіввідкритий стан: пробне TCP-підключення вирішує, закрити запобіжник чи ні"""
+        try:
+            with socket.create_connection((ip, port), timeout=self.probe_timeout):
+                pass
+        except OSError as e:
+            with self._lock:
+                circuit = self._get_circuit((ip, port))
+                circuit.state = CIRCUIT_OPEN
+                circuit.opened_at = time.time()
+                circuit.last_error = str(e)
+                circuit.last_checked = time.time()
+            logging.info(f"Роутер {ip}:{port} досі недоступний: {e}")
+            return
+
+        self.record_success(ip, port)
+
+    def stop(self):
+        """Зупиняє фонову перевірку"""
+        self._stop_event.set()
@@ -11,4 +11,122 @@ ADMIN_2_NOTIFICATIONS_ENABLED = False
 # Режим запуску скриптів
 # True - запитувати пароль для виконання скрипта
 # False - запитувати тільки підтвердження користувача
-SCRIPT_PASSWORD_MODE =  True 
\ No newline at end of file
+SCRIPT_PASSWORD_MODE =  True 
+
+# Перевірка змін routers.json: файл перечитується лише тоді, коли змінились його
+# mtime, розмір або inode; на Linux зміни підхоплюються одразу через inotify
+ROUTERS_REVALIDATE_INTERVAL = 2   # Як часто перевіряти ознаки файлу (секунди)
+ROUTERS_WATCH_INOTIFY = True      # Стежити за файлом через inotify (лише Linux)
+
+# Сховище налаштувань роутерів
+# 'json' - routers.json (файл переписується при кожній зміні)
+# 'sqlite' - база ROUTERS_DB_FILE (користувачі та скрипти зберігаються окремими рядками)
+# 'sharded' - каталог ROUTERS_DIR: index.json (назви, теги, користувачі) та файл на кожен
+#             роутер, що читається під час першого звернення
+# перенести дані: python migrate_config.py import routers.json routers.db (або routers.d)
+CONFIG_BACKEND = 'json'
+ROUTERS_DB_FILE = 'routers.db'
+ROUTERS_DIR = 'routers.d'
+ROUTERS_DETAIL_CACHE_SIZE = 128   # Скільки роутерів routers.d тримати в пам'яті (LRU)
+
+# Зашифроване сховище паролів роутерів (ssh_password, script_password)
+# Ключ - парольна фраза зі змінної оточення VAULT_KEY_ENV; паролі з routers.json
+# переносяться командою: python manage_vault.py import
+VAULT_FILE = 'vault.json'
+VAULT_KEY_ENV = 'ROUTER_VAULT_KEY'
+VAULT_KDF_ITERATIONS = 390000     # Ітерації PBKDF2 для виведення ключа з парольної фрази
+SECRET_CACHE_TTL = 300            # Скільки секунд тримати розшифрований пароль у пам'яті
+SECRET_CACHE_MAX_SIZE = 64        # Максимальна кількість розшифрованих паролів у пам'яті
+# Зміни routers.json протягом цього часу (секунди) об'єднуються в один атомарний
+# запис файлу; 0 - записувати кожну зміну одразу
+CONFIG_WRITE_DELAY = 0.5
+
+# Масове надання доступу документом CSV/JSON (кнопка в /manage_access)
+BULK_UPLOAD_MAX_BYTES = 262144    # Максимальний розмір документа (байти)
+BULK_UPLOAD_MAX_ROWS = 1000       # Максимальна кількість рядків у документі
+
+# Налаштування пулу SSH-з'єднань
+SSH_POOL_MAX_SIZE = 20          # Максимальна кількість відкритих з'єднань
+SSH_POOL_IDLE_TIMEOUT = 600     # Через скільки секунд простою з'єднання закривається
+SSH_KEEPALIVE_INTERVAL = 30     # Інтервал keepalive-пакетів (секунди)
+# Скільки скриптів одночасно виконуються через одне з'єднання з роутером (окремими каналами).
+# RouterOS обмежує кількість одночасних SSH-сесій; можна перевизначити для роутера в
+# routers.json: "max_channels"
+SSH_MAX_CHANNELS_PER_ROUTER = 2
+
+# Бінарний API RouterOS як альтернатива SSH (вмикається для роутера в routers.json:
+# "backend": "api", порт - "api_port", шифрування - "api_ssl": true)
+ROUTEROS_API_PORT = 8728          # Порт API за замовчуванням
+ROUTEROS_API_SSL_PORT = 8729      # Порт API-SSL за замовчуванням
+
+# Фонова перевірка доступності роутерів та попереднє підключення
+HEALTH_PROBE_INTERVAL = 60        # Інтервал TCP-перевірки всіх роутерів (секунди, 0 - вимкнено)
+HEALTH_PROBE_SPREAD = 0.5         # Частка інтервалу, на яку розподіляються підключення перевірки (0 - усі одразу)
+HEALTH_PROBE_TIMEOUT = 3          # Таймаут TCP-перевірки (секунди)
+HEALTH_PROBE_PARALLEL = 8         # Скільки роутерів перевіряються одночасно
+PREWARM_INTERVAL = 240            # Інтервал підтримки попередньо відкритих з'єднань (менше за SSH_POOL_IDLE_TIMEOUT)
+PREWARM_TOP_ROUTERS = 5           # Зі скількома найуживанішими роутерами тримати з'єднання відкритими
+USAGE_HISTORY_SIZE = 500          # Скільки останніх запусків враховується при виборі роутерів
+
+# Налаштування фонового виконання скриптів
+EXECUTION_MAX_WORKERS = 8         # Загальна кількість робочих потоків
+EXECUTION_PER_ROUTER_LIMIT = 2    # Максимум одночасних виконань на одному роутері
+EXECUTION_QUEUE_SIZE = 100        # Максимальна кількість завдань у черзі
+
+# Налаштування виконання скрипта на кількох роутерах
+FANOUT_MAX_PARALLEL = 5           # Скільки роутерів одного запуску обробляються одночасно
+FANOUT_EDIT_INTERVAL = 1.0        # Мінімальний інтервал між оновленнями підсумкового повідомлення (секунди)
+
+# Потокове відображення результату скрипта
+# True - результат з'являється в повідомленні під час виконання
+# False - результат надсилається після завершення скрипта
+SCRIPT_STREAMING_MODE = True
+STREAM_EDIT_INTERVAL = 1.0        # Мінімальний інтервал між редагуваннями повідомлення (секунди)
+STREAM_POLL_INTERVAL = 0.5        # Як часто перевіряти канал на нові дані (секунди)
+STREAM_READ_SIZE = 4096           # Розмір блоку читання з каналу (байти)
+EXIT_STATUS_POLL_INTERVAL = 0.05  # Як часто після кінця виводу перевіряти, чи надійшов код завершення (секунди)
+
+# Запобіжник (circuit breaker) для недоступних роутерів
+CIRCUIT_FAILURE_THRESHOLD = 3     # Скільки невдалих підключень поспіль відкривають запобіжник
+CIRCUIT_WINDOW = 10               # Кількість останніх спроб для оцінки частки невдач
+CIRCUIT_FAILURE_RATE = 0.5        # Частка невдач у вікні, що відкриває запобіжник
+CIRCUIT_RECOVERY_TIMEOUT = 30     # Через скільки секунд перевіряти, чи роутер відновився
+CIRCUIT_PROBE_INTERVAL = 10       # Інтервал фонової перевірки відкритих запобіжників (секунди)
+CIRCUIT_PROBE_TIMEOUT = 3         # Таймаут TCP-перевірки доступності (секунди)
+
+# Таймаути виконання скриптів (можна перевизначити для роутера в routers.json:
+# "connect_timeout" та "run_timeout")
+SSH_CONNECT_TIMEOUT = 10          # Таймаут SSH-підключення (секунди)
+SCRIPT_RUN_TIMEOUT = 300          # Максимальний час виконання скрипта (секунди)
+
+# Адаптивні таймаути за історією затримок роутера: p99 × TIMEOUT_P99_FACTOR в межах
+# [FLOOR, CEILING]; поки вимірів менше LATENCY_MIN_SAMPLES, діють таймаути вище.
+# Таймаут виконання роутера - нижня межа: адаптивний лише подовжує його
+# (вимкнути для роутера в routers.json: "adaptive_timeouts": false)
+ADAPTIVE_TIMEOUTS = True
+LATENCY_WINDOW = 200              # Кількість останніх вимірів у гістограмі
+LATENCY_MIN_SAMPLES = 20          # Мінімум вимірів для адаптивного таймауту
+LATENCY_EWMA_ALPHA = 0.2          # Вага нового виміру в ковзному середньому
+TIMEOUT_P99_FACTOR = 3            # Множник p99 затримки
+CONNECT_TIMEOUT_FLOOR = 2         # Мінімальний таймаут підключення (секунди)
+CONNECT_TIMEOUT_CEILING = 30      # Максимальний таймаут підключення (секунди)
+RUN_TIMEOUT_FLOOR = 30            # Мінімальний час виконання скрипта (секунди)
+RUN_TIMEOUT_CEILING = 900         # Максимальний час виконання скрипта (секунди)
+
+# Кеш результатів скриптів лише для читання
+# (TTL задається для роутера в routers.json: "cacheable_scripts": {"назва_скрипта": секунди})
+RESULT_CACHE_MAX_SIZE = 256       # Максимальна кількість збережених результатів
+
+# Кеш готових клавіатур роутерів (вибір скрипта, управління роутером); клавіатури
+# роутера скидаються, коли змінюються його налаштування
+KEYBOARD_CACHE_SIZE = 256         # Максимальна кількість збережених клавіатур (LRU)
+
+# Доставка великих результатів скриптів
+# Результат до ліміту Telegram надсилається одним повідомленням, до OUTPUT_INLINE_MAX_MESSAGES
+# повідомлень - частинами по рядках, а більший - стисненим gzip файлом
+OUTPUT_INLINE_MAX_MESSAGES = 4    # Максимальна кількість повідомлень для одного результату
+OUTPUT_SPOOL_MEMORY_LIMIT = 1048576  # Скільки стиснених байтів тримати в пам'яті до запису на диск
+
+# Запуск скриптів за розкладом (розклади зберігаються поруч з routers.json)
+SCHEDULES_FILE = 'schedules.json'
+SCHEDULE_JITTER = 60              # Запуски однієї хвилини розподіляються випадково в межах стількох секунд
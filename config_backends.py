@@ -0,0 +1,590 @@
+import json
+import logging
+import os
+import itertools
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Hashable, List, Optional
+from config import CONFIG_BACKEND, ROUTERS_DB_FILE, ROUTERS_DIR, CONFIG_WRITE_DELAY
+
+# Секція зі списком адміністраторів (не роутер)
+ADMINS_SECTION = 'admins'
+
+# Поля роутера, що зберігаються окремими рядками в SQLite
+ITEM_TABLES = {'allowed_users': ('users', 'user_id'), 'scripts': ('scripts', 'script')}
+
+# Поля роутера, що зберігаються в індексі routers.d (решта - у файлі роутера)
+INDEX_FIELDS = ('tags', 'allowed_users')
+# Службове поле запису індексу: лічильник змін файлу роутера
+REVISION_FIELD = 'revision'
+
+
+def file_stat(path: str) -> Optional[Hashable]:
+    """Ознака версії файлу (час зміни, розмір, inode); None - файлу немає"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def change_item(router: Dict[str, Any], field: str, value: str, added: bool) -> Dict[str, Any]:
+    """Повертає змінну копію запису роутера з доданим або видаленим значенням списку field"""
+    updated = {key: list(item) if isinstance(item, (list, tuple)) else item for key, item in router.items()}
+    values = updated.get(field, [])
+    if added:
+        updated[field] = values + [value]
+    else:
+        updated[field] = [item for item in values if str(item).strip() != value]
+    return updated
+
+
+def write_json_atomic(path: str, data: Any):
+    """
+    Записує JSON атомарно: у тимчасовий файл поруч, fsync, потім os.replace.
+
+    Збій посеред запису залишає попередню версію файлу цілою.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(data, file, indent=2, ensure_ascii=False)
+            file.flush()
+            os.fsync(file.fileno())
+        try:
+            # Зберігаємо права доступу наявного файлу (mkstemp створює 0600)
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    # Фіксуємо на диску і сам запис каталогу про заміну файлу
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+class JSONConfigBackend:
+    """
+    Зберігання налаштувань роутерів у routers.json (файл переписується цілком).
+
+    Запис відкладений: зміни протягом write_delay секунд від першої з них
+    об'єднуються в один атомарний запис файлу. ConfigStore публікує нову
+    версію одразу, тож читання не чекає на диск; поки запис не виконано,
+    load() повертає дані, що очікують запису.
+    """
+
+    # Дані завантажуються повністю (див. ShardedConfigBackend)
+    lazy = False
+
+    def __init__(self, config_file: str = 'routers.json', write_delay: float = CONFIG_WRITE_DELAY):
+        """
+        :param config_file: Шлях до routers.json
+        :param write_delay: Вікно об'єднання записів (секунди); 0 - записувати одразу
+        """
+        self.config_file = config_file
+        self.write_delay = write_delay
+        self._lock = threading.Lock()
+        self._pending: Optional[Dict[str, Any]] = None
+        self._timer: Optional[threading.Timer] = None
+        # Ознака версії, видана для власного запису, та stat файлу після нього:
+        # власний запис на диск не повинен виглядати як зовнішня зміна
+        self._tokens = itertools.count(1)
+        self._own_signature: Optional[Hashable] = None
+        self._own_stat: Optional[Hashable] = None
+
+    @property
+    def watch_path(self) -> Optional[str]:
+        """Файл, за яким можна стежити через inotify"""
+        return self.config_file
+
+    def _stat(self) -> Optional[Hashable]:
+        try:
+            stat = os.stat(self.config_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def signature(self) -> Optional[Hashable]:
+        """Ознака версії файлу: (mtime у наносекундах, розмір, inode); None - файлу немає"""
+        with self._lock:
+            if self._pending is not None:
+                return self._own_signature
+            stat = self._stat()
+            if stat is not None and stat == self._own_stat:
+                return self._own_signature
+            return stat
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Завантажує роутери з файлу (None - файл пошкоджений або недоступний)"""
+        with self._lock:
+            if self._pending is not None:
+                return json.loads(json.dumps(self._pending))
+        try:
+            with open(self.config_file, 'r', encoding='utf-8') as file:
+                routers = json.load(file)
+                return routers
+        except FileNotFoundError:
+            logging.error(f"Файл {self.config_file} не знайдено")
+            return {}
+        except json.JSONDecodeError as e:
+            logging.error(f"Помилка парсингу JSON у файлі {self.config_file}: {e}")
+            return None
+        except Exception as e:
+            logging.error(f"Невідома помилка при завантаженні {self.config_file}: {e}")
+            return None
+
+    def save(self, routers: Dict[str, Any]):
+        """Ставить дані роутерів у чергу запису (або записує одразу, якщо write_delay = 0)"""
+        with self._lock:
+            self._pending = routers
+            self._own_signature = ('write', next(self._tokens))
+            if self.write_delay <= 0:
+                self._flush_locked()
+                return
+            if self._timer is None:
+                self._timer = threading.Timer(self.write_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def save_item(self, routers: Dict[str, Any], router_name: str, field: str, value: str, added: bool) -> Dict[str, Any]:
+        """Зберігає додавання/видалення одного значення (для JSON - весь файл); повертає новий запис роутера"""
+        updated = change_item(routers[router_name], field, value, added)
+        self.save({**routers, router_name: updated})
+        return updated
+
+    def flush(self):
+        """Записує зміни, що очікують, на диск"""
+        with self._lock:
+            self._timer = None
+            try:
+                self._flush_locked()
+            except Exception:
+                # Дані лишаються в черзі - повторюємо спробу через write_delay
+                if self._pending is not None and self.write_delay > 0:
+                    self._timer = threading.Timer(self.write_delay, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+    def _flush_locked(self):
+        """Атомарно записує self._pending (викликається під self._lock)"""
+        if self._pending is None:
+            return
+        try:
+            write_json_atomic(self.config_file, self._pending)
+        except Exception as e:
+            logging.error(f"Помилка збереження даних роутерів: {e}")
+            raise
+        self._pending = None
+        self._own_stat = self._stat()
+        logging.info(f"Дані роутерів збережено у файл {self.config_file}")
+
+    def close(self):
+        """Скасовує відкладений запис і записує зміни, що очікують"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._flush_locked()
+
+
+class SQLiteConfigBackend:
+    """
+    Зберігання налаштувань роутерів у SQLite (режим WAL).
+
+    Користувачі та скрипти зберігаються окремими рядками з індексами для
+    перевірки доступу, тому додавання чи видалення одного значення - це
+    одна транзакція з одним рядком, а не перезапис усієї конфігурації.
+    Решта полів роутера зберігається JSON-об'єктом у routers.settings.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS routers (
+            name TEXT PRIMARY KEY,
+            settings TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS users (
+            router TEXT NOT NULL REFERENCES routers(name) ON DELETE CASCADE,
+            user_id TEXT NOT NULL,
+            PRIMARY KEY (router, user_id)
+        );
+        CREATE INDEX IF NOT EXISTS users_by_user_id ON users(user_id, router);
+        CREATE TABLE IF NOT EXISTS scripts (
+            router TEXT NOT NULL REFERENCES routers(name) ON DELETE CASCADE,
+            script TEXT NOT NULL,
+            PRIMARY KEY (router, script)
+        );
+        CREATE TABLE IF NOT EXISTS admins (
+            user_id TEXT PRIMARY KEY
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+    """
+
+    lazy = False
+
+    def __init__(self, db_file: str = ROUTERS_DB_FILE):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(self.SCHEMA)
+
+    @property
+    def watch_path(self) -> Optional[str]:
+        """Зміни бази перевіряються за лічильником версії, без inotify"""
+        return None
+
+    def signature(self) -> Optional[Hashable]:
+        """Лічильник версії, що збільшується кожною транзакцією запису (у тому числі з інших процесів)"""
+        with self._lock:
+            return self._db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Збирає дані у форматі routers.json (None - помилка читання)"""
+        try:
+            with self._lock:
+                admins = [row[0] for row in self._db.execute("SELECT user_id FROM admins ORDER BY rowid")]
+                rows = self._db.execute("SELECT name, settings FROM routers ORDER BY rowid").fetchall()
+                users = self._db.execute("SELECT router, user_id FROM users ORDER BY rowid").fetchall()
+                scripts = self._db.execute("SELECT router, script FROM scripts ORDER BY rowid").fetchall()
+        except sqlite3.Error as e:
+            logging.error(f"Помилка читання бази {self.db_file}: {e}")
+            return None
+
+        # Порожній список адміністраторів теж зберігається, інакше діяв би адміністратор за замовчуванням
+        routers: Dict[str, Any] = {ADMINS_SECTION: admins}
+        for name, settings in rows:
+            router = json.loads(settings)
+            router['allowed_users'] = []
+            router['scripts'] = []
+            routers[name] = router
+        for router_name, user_id in users:
+            routers[router_name]['allowed_users'].append(user_id)
+        for router_name, script in scripts:
+            routers[router_name]['scripts'].append(script)
+
+        return routers
+
+    def save(self, routers: Dict[str, Any]):
+        """Замінює всі дані однією транзакцією (для масових змін та імпорту)"""
+        with self._lock, self._transaction():
+            self._db.execute("DELETE FROM admins")
+            self._db.execute("DELETE FROM routers")
+            self._db.executemany("INSERT OR IGNORE INTO admins (user_id) VALUES (?)",
+                                 [(str(user_id),) for user_id in routers.get(ADMINS_SECTION, [])])
+            for name, router in routers.items():
+                if name == ADMINS_SECTION:
+                    continue
+                if not isinstance(router, dict):
+                    logging.warning(f"Секцію '{name}' не збережено: очікується об'єкт роутера")
+                    continue
+                settings = {key: value for key, value in router.items() if key not in ITEM_TABLES}
+                self._db.execute("INSERT INTO routers (name, settings) VALUES (?, ?)",
+                                 (name, json.dumps(settings, ensure_ascii=False)))
+                for field, (table, column) in ITEM_TABLES.items():
+                    self._db.executemany(f"INSERT OR IGNORE INTO {table} (router, {column}) VALUES (?, ?)",
+                                         [(name, str(value)) for value in router.get(field, [])])
+        logging.info(f"Дані роутерів збережено в базу {self.db_file}")
+
+    def save_item(self, routers: Dict[str, Any], router_name: str, field: str, value: str, added: bool) -> Dict[str, Any]:
+        """Додає або видаляє один рядок користувача чи скрипта; повертає новий запис роутера"""
+        table, column = ITEM_TABLES[field]
+        with self._lock, self._transaction():
+            if added:
+                self._db.execute(f"INSERT OR IGNORE INTO {table} (router, {column}) VALUES (?, ?)", (router_name, value))
+            else:
+                self._db.execute(f"DELETE FROM {table} WHERE router = ? AND {column} = ?", (router_name, value))
+        return change_item(routers[router_name], field, value, added)
+
+    @contextmanager
+    def _transaction(self):
+        """Транзакція запису, що збільшує лічильник версії (викликається під self._lock)"""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+            self._db.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def close(self):
+        """Закриває з'єднання з базою"""
+        with self._lock:
+            self._db.close()
+
+
+class ShardedConfigBackend:
+    """
+    Зберігання налаштувань у каталозі routers.d: index.json з назвами роутерів,
+    тегами та користувачами і окремий файл <назва>.json з рештою полів роутера
+    (адреса, облікові дані, скрипти).
+
+    load() читає лише індекс, а файл роутера читає load_router() під час
+    першого звернення до роутера. Перевірка змін (signature) робить stat
+    індексу та лише файлів завантажених роутерів, тож її вартість не
+    залежить від розміру парку. Зміна такого файлу (чи його перезапис через
+    save) збільшує лічильник revision у записі індексу роутера і помічається
+    як зміна лише цього роутера. Файл роутера, що ще не завантажувався (або
+    вже вивільнений через release_router), читається заново під час
+    наступного звернення.
+    """
+
+    # Деталі роутерів завантажуються на вимогу (ConfigStore використовує RouterDetailCache)
+    lazy = True
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, directory: str = ROUTERS_DIR):
+        self.directory = directory
+        self.index_file = os.path.join(directory, self.INDEX_FILE)
+        self._lock = threading.Lock()
+        # Ознаки файлів завантажених роутерів на момент читання (лише їх перевіряє signature)
+        self._loaded: Dict[str, Optional[Hashable]] = {}
+        # Лічильники змін файлів роутерів (поле revision) та їх сума
+        self._revisions: Dict[str, int] = {}
+        self._generation = 0
+
+    @property
+    def watch_path(self) -> Optional[str]:
+        """Через inotify відстежується індекс; зміни файлів роутерів - періодичною перевіркою"""
+        return self.index_file
+
+    @staticmethod
+    def valid_name(name: str) -> bool:
+        """Чи може назва роутера бути назвою його файлу"""
+        return (bool(name) and not name.startswith('.') and '/' not in name and '\\' not in name
+                and f"{name}.json" != ShardedConfigBackend.INDEX_FILE)
+
+    def router_file(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.json")
+
+    def _router_names(self) -> List[str]:
+        """Назви роутерів за файлами каталогу (лише для save - прибирання файлів видалених роутерів)"""
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            return []
+        return [entry.name[:-len('.json')] for entry in entries
+                if entry.name.endswith('.json') and entry.name != self.INDEX_FILE and not entry.name.startswith('.')]
+
+    def _bump_revision(self, name: str):
+        """Позначає зміну файлу роутера (викликається під self._lock)"""
+        self._revisions[name] = self._revisions.get(name, 0) + 1
+        self._generation += 1
+
+    def _check_loaded(self):
+        """Перевіряє (stat) файли завантажених роутерів і позначає змінені"""
+        with self._lock:
+            loaded = dict(self._loaded)
+        current = {name: file_stat(self.router_file(name)) for name in loaded}
+        with self._lock:
+            for name, stat in current.items():
+                # Роутер, перечитаний чи вивільнений тим часом, не чіпаємо
+                if stat != loaded[name] and self._loaded.get(name) == loaded[name]:
+                    self._loaded[name] = stat
+                    self._bump_revision(name)
+
+    def signature(self) -> Optional[Hashable]:
+        """Ознака версії індексу та файлів завантажених роутерів; None - індексу немає"""
+        index_stat = file_stat(self.index_file)
+        if index_stat is None:
+            return None
+        self._check_loaded()
+        return index_stat, self._generation
+
+    def _read(self, path: str) -> Any:
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def _load_index(self) -> Optional[Dict[str, Any]]:
+        """Читає index.json ({} - індексу немає, None - індекс пошкоджений)"""
+        try:
+            index = self._read(self.index_file)
+        except FileNotFoundError:
+            logging.error(f"Файл {self.index_file} не знайдено")
+            return {}
+        except json.JSONDecodeError as e:
+            logging.error(f"Помилка парсингу JSON у файлі {self.index_file}: {e}")
+            return None
+        except Exception as e:
+            logging.error(f"Невідома помилка при завантаженні {self.index_file}: {e}")
+            return None
+        if not isinstance(index, dict) or not isinstance(index.get('routers', {}), dict):
+            logging.error(f"Файл {self.index_file} має містити об'єкт з полем routers")
+            return None
+        return index
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Завантажує індекс у форматі routers.json (лише поля індексу та revision)"""
+        index = self._load_index()
+        if index is None:
+            return None
+
+        with self._lock:
+            revisions = dict(self._revisions)
+        # Порожній список адміністраторів теж зберігається, інакше діяв би адміністратор за замовчуванням
+        routers: Dict[str, Any] = {ADMINS_SECTION: index[ADMINS_SECTION]} if ADMINS_SECTION in index else {}
+        for name, entry in index.get('routers', {}).items():
+            if not isinstance(entry, dict):
+                routers[name] = entry
+                continue
+            routers[name] = {field: entry[field] for field in INDEX_FIELDS if field in entry}
+            routers[name][REVISION_FIELD] = revisions.get(name, 0)
+
+        return routers
+
+    def load_router(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Читає файл роутера для кешу моделей (None - файлу немає або він пошкоджений).
+
+        Після читання файл перевіряється signature(), доки роутер не
+        вивільнено через release_router().
+        """
+        # Ознака береться до читання: зміна під час читання буде помічена наступною перевіркою
+        stat = file_stat(self.router_file(name))
+        detail = self._read_router(name)
+        if detail is not None:
+            with self._lock:
+                self._loaded[name] = stat
+        return detail
+
+    def release_router(self, name: str):
+        """Припиняє перевіряти файл роутера (модель витіснено з кешу)"""
+        with self._lock:
+            self._loaded.pop(name, None)
+
+    def _read_router(self, name: str) -> Optional[Dict[str, Any]]:
+        """Читає файл роутера (None - файлу немає або він пошкоджений)"""
+        if not self.valid_name(name):
+            logging.error(f"Назва роутера '{name}' не може бути назвою файлу в {self.directory}")
+            return None
+        try:
+            detail = self._read(self.router_file(name))
+        except FileNotFoundError:
+            logging.error(f"Файл роутера {self.router_file(name)} не знайдено")
+            return None
+        except Exception as e:
+            logging.error(f"Помилка завантаження {self.router_file(name)}: {e}")
+            return None
+        if not isinstance(detail, dict):
+            logging.error(f"Файл {self.router_file(name)} має містити об'єкт роутера")
+            return None
+        return detail
+
+    def load_full(self) -> Optional[Dict[str, Any]]:
+        """Збирає повні дані у форматі routers.json (читає всі файли роутерів - для змін та експорту)"""
+        index = self._load_index()
+        if index is None:
+            return None
+
+        routers: Dict[str, Any] = {ADMINS_SECTION: index[ADMINS_SECTION]} if ADMINS_SECTION in index else {}
+        for name, entry in index.get('routers', {}).items():
+            if not isinstance(entry, dict):
+                routers[name] = entry
+                continue
+            detail = self._read_router(name) or {}
+            routers[name] = {**detail, **{field: entry[field] for field in INDEX_FIELDS if field in entry}}
+        return routers
+
+    @staticmethod
+    def _index_data(routers: Dict[str, Any]) -> Dict[str, Any]:
+        """Формує вміст index.json з даних у форматі routers.json"""
+        index_routers = {}
+        for name, router in routers.items():
+            if name == ADMINS_SECTION or not isinstance(router, dict):
+                continue
+            index_routers[name] = {field: router[field] for field in INDEX_FIELDS if field in router}
+        return {ADMINS_SECTION: list(routers.get(ADMINS_SECTION, [])), 'routers': index_routers}
+
+    def save(self, routers: Dict[str, Any]):
+        """
+        Зберігає повні дані у форматі routers.json: переписуються лише змінені
+        файли роутерів, потім індекс; файли видалених роутерів прибираються.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        saved = {}
+        for name, router in routers.items():
+            if name == ADMINS_SECTION:
+                continue
+            if not isinstance(router, dict) or not self.valid_name(name):
+                logging.warning(f"Роутер '{name}' не збережено в {self.directory}: некоректна назва або запис")
+                continue
+            detail = {key: value for key, value in router.items() if key not in INDEX_FIELDS and key != REVISION_FIELD}
+            try:
+                unchanged = self._read(self.router_file(name)) == json.loads(json.dumps(detail))
+            except Exception:
+                unchanged = False
+            if not unchanged:
+                write_json_atomic(self.router_file(name), detail)
+                self._written(name)
+            saved[name] = router
+
+        # Індекс пишеться після файлів роутерів, щоб у ньому не з'явився роутер без файлу
+        write_json_atomic(self.index_file, self._index_data({**saved, ADMINS_SECTION: routers.get(ADMINS_SECTION, [])}))
+        for name in self._router_names():
+            if name not in saved:
+                os.unlink(self.router_file(name))
+                self.release_router(name)
+        logging.info(f"Дані роутерів збережено в каталог {self.directory}")
+
+    def save_item(self, routers: Dict[str, Any], router_name: str, field: str, value: str, added: bool) -> Dict[str, Any]:
+        """
+        Зберігає додавання/видалення одного значення: користувачі змінюються
+        в індексі, скрипти - у файлі роутера. Повертає новий запис індексу.
+        """
+        entry = routers[router_name]
+        if field in INDEX_FIELDS:
+            updated = change_item(entry, field, value, added)
+            write_json_atomic(self.index_file, self._index_data({**routers, router_name: updated}))
+            return updated
+
+        detail = self._read_router(router_name)
+        if detail is None:
+            raise ValueError(f"не вдалося прочитати файл роутера {router_name}")
+        write_json_atomic(self.router_file(router_name), change_item(detail, field, value, added))
+        return {**entry, REVISION_FIELD: self._written(router_name)}
+
+    def _written(self, name: str) -> int:
+        """Позначає перезапис файлу роутера цим процесом; повертає нове значення revision"""
+        stat = file_stat(self.router_file(name))
+        with self._lock:
+            if name in self._loaded:
+                self._loaded[name] = stat
+            self._bump_revision(name)
+            return self._revisions[name]
+
+    def close(self):
+        """Файли не тримаються відкритими - закривати нічого"""
+
+
+def create_config_backend(backend: str = CONFIG_BACKEND):
+    """Створює сховище налаштувань роутерів за CONFIG_BACKEND ('json', 'sqlite' або 'sharded')"""
+    if backend == 'sqlite':
+        return SQLiteConfigBackend()
+    if backend == 'sharded':
+        return ShardedConfigBackend()
+    if backend != 'json':
+        logging.warning(f"Невідоме сховище налаштувань '{backend}', використовується routers.json")
+    return JSONConfigBackend()
@@ -0,0 +1,132 @@
+from typing import Any, FrozenSet, List, Mapping, Optional
+from config_backends import ADMINS_SECTION, REVISION_FIELD
+from router_model import Router
+
+# Види змін роутера
+ROUTER_ADDED = 'added'
+ROUTER_REMOVED = 'removed'
+ROUTER_CHANGED = 'changed'
+
+# Поля, зміна яких робить недійсними відкриті з'єднання з роутером
+CONNECTION_FIELDS = frozenset({
+    'ip', 'username', 'ssh_password', 'ssh_port', 'backend', 'api_port', 'api_ssl', REVISION_FIELD
+})
+
+# Скільки роутерів перелічувати в підсумку зміни (решта - лише кількістю)
+SUMMARY_MAX_ROUTERS = 10
+
+
+def _values(entry: Optional[Mapping[str, Any]], field: str) -> FrozenSet[str]:
+    if not isinstance(entry, Mapping):
+        return frozenset()
+    return frozenset(str(value).strip() for value in entry.get(field, ()))
+
+
+class RouterChange:
+    """Зміна налаштувань одного роутера між двома версіями конфігурації"""
+
+    __slots__ = ('name', 'kind', 'users_added', 'users_removed', 'scripts_added', 'scripts_removed',
+                 'fields_changed', 'old_router')
+
+    def __init__(self, name: str, old: Optional[Mapping[str, Any]], new: Optional[Mapping[str, Any]],
+                 old_router: Optional[Router] = None):
+        """
+        :param old: Попередній запис роутера (None - роутер додано)
+        :param new: Новий запис роутера (None - роутер видалено)
+        :param old_router: Попередня модель роутера, якщо вона була завантажена
+        """
+        self.name = name
+        self.kind = ROUTER_ADDED if old is None else ROUTER_REMOVED if new is None else ROUTER_CHANGED
+        old_users, new_users = _values(old, 'allowed_users'), _values(new, 'allowed_users')
+        old_scripts, new_scripts = _values(old, 'scripts'), _values(new, 'scripts')
+        self.users_added = new_users - old_users
+        self.users_removed = old_users - new_users
+        self.scripts_added = new_scripts - old_scripts
+        self.scripts_removed = old_scripts - new_scripts
+        old, new = old or {}, new or {}
+        # Лише назви полів - значення (паролі) не потрапляють у підсумок
+        self.fields_changed = frozenset(
+            field for field in set(old) | set(new)
+            if field not in ('allowed_users', 'scripts') and old.get(field) != new.get(field)
+        )
+        self.old_router = old_router
+
+    @property
+    def scripts_changed(self) -> bool:
+        return bool(self.scripts_added or self.scripts_removed)
+
+    @property
+    def connection_changed(self) -> bool:
+        """Чи змінились адреса чи облікові дані (для routers.d - будь-яка зміна файлу роутера)"""
+        return self.kind != ROUTER_CHANGED or bool(self.fields_changed & CONNECTION_FIELDS)
+
+    def affects_results(self) -> bool:
+        """Чи можуть збережені результати скриптів роутера стати неактуальними"""
+        return self.kind != ROUTER_CHANGED or self.scripts_changed or bool(self.fields_changed - {'tags'})
+
+    def describe(self) -> str:
+        """Короткий опис зміни для логу"""
+        if self.kind == ROUTER_ADDED:
+            return f"+{self.name}"
+        if self.kind == ROUTER_REMOVED:
+            return f"−{self.name}"
+
+        details = []
+        if self.users_added or self.users_removed:
+            details.append(f"користувачі +{len(self.users_added)}/−{len(self.users_removed)}")
+        if self.scripts_changed:
+            details.append(f"скрипти +{len(self.scripts_added)}/−{len(self.scripts_removed)}")
+        fields = sorted(self.fields_changed - {REVISION_FIELD})
+        if fields:
+            details.append(f"поля: {', '.join(fields)}")
+        if REVISION_FIELD in self.fields_changed:
+            details.append("файл роутера")
+        return f"~{self.name} ({'; '.join(details)})" if details else f"~{self.name}"
+
+
+class ConfigDiff:
+    """Структурна різниця між двома версіями конфігурації"""
+
+    __slots__ = ('changes', 'admins_changed')
+
+    def __init__(self, changes: List[RouterChange], admins_changed: bool):
+        self.changes = changes
+        self.admins_changed = admins_changed
+
+    @classmethod
+    def between(cls, old_routers: Mapping[str, Any], new_routers: Mapping[str, Any], changed: set,
+                old_models: Optional[Mapping[str, Router]] = None) -> 'ConfigDiff':
+        """
+        Різниця для назв changed (перелічуються лише змінені записи).
+
+        old_models - попередні моделі, з яких береться стара модель роутера.
+        """
+        changes = []
+        for name in sorted(changed):
+            if name == ADMINS_SECTION:
+                continue
+            old, new = old_routers.get(name), new_routers.get(name)
+            old = old if isinstance(old, Mapping) else None
+            new = new if isinstance(new, Mapping) else None
+            if old is None and new is None:
+                continue
+            old_router = old_models.get(name) if old_models is not None and old is not None else None
+            changes.append(RouterChange(name, old, new, old_router))
+        return cls(changes, ADMINS_SECTION in changed)
+
+    def __bool__(self) -> bool:
+        return bool(self.changes) or self.admins_changed
+
+    def summary(self) -> str:
+        """Один рядок з переліком змін для логу"""
+        counts = {kind: sum(1 for change in self.changes if change.kind == kind)
+                  for kind in (ROUTER_ADDED, ROUTER_REMOVED, ROUTER_CHANGED)}
+        parts = [f"додано {counts[ROUTER_ADDED]}, видалено {counts[ROUTER_REMOVED]}, змінено {counts[ROUTER_CHANGED]}"]
+        described = [change.describe() for change in self.changes[:SUMMARY_MAX_ROUTERS]]
+        if len(self.changes) > SUMMARY_MAX_ROUTERS:
+            described.append(f"та ще {len(self.changes) - SUMMARY_MAX_ROUTERS}")
+        if described:
+            parts.append(", ".join(described))
+        if self.admins_changed:
+            parts.append("змінено список адміністраторів")
+        return "; ".join(parts)
@@ -0,0 +1,428 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Iterator, List, Mapping, Optional, Tuple
+from config import ROUTERS_REVALIDATE_INTERVAL, ROUTERS_WATCH_INOTIFY, ROUTERS_DETAIL_CACHE_SIZE
+from access_index import AccessIndex, normalize_user_id
+from config_backends import JSONConfigBackend, INDEX_FIELDS
+from config_diff import ConfigDiff, RouterChange
+from constants import LOG_MESSAGES
+from router_model import Router, RouterConfigError
+from file_watcher import FileWatcher
+
+
+class FrozenDict(dict):
+    """Словник лише для читання (залишається dict для isinstance та json.dump)"""
+
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("конфігурація лише для читання - змінюйте її через ConfigStore.update")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+def freeze(value: Any) -> Any:
+    """Рекурсивно перетворює словники на FrozenDict, а списки на кортежі"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Робить змінну копію знімка (зворотне до freeze)"""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+
+def build_models(routers: Dict[str, Any], previous: Optional[Dict[str, Router]] = None,
+                 changed: Optional[set] = None) -> Dict[str, Router]:
+    """
+    Створює моделі роутерів у порядку routers.json.
+
+    Моделі незмінених роутерів беруться з previous. Некоректні записи
+    пропускаються з помилкою в лозі, щоб решта роутерів працювала.
+    """
+    models = {}
+    for router_name, router_data in routers.items():
+        # Пропускаємо секцію адміністраторів та інші не-роутери
+        if not isinstance(router_data, dict):
+            continue
+        if previous is not None and router_name not in changed and router_name in previous:
+            models[router_name] = previous[router_name]
+            continue
+        try:
+            models[router_name] = Router.from_config(router_name, router_data)
+        except RouterConfigError as e:
+            logging.error(f"Роутер '{router_name}' у routers.json пропущено: {e}")
+    return models
+
+
+class RouterDetailCache:
+    """
+    LRU-кеш моделей роутерів для сховищ з завантаженням на вимогу (routers.d).
+
+    Файл роутера читається під час першого звернення; модель створюється
+    заново лише після зміни запису індексу (у тому числі лічильника змін
+    файлу). Витіснений роутер вивільняється в backend, і його файл більше не
+    перевіряється.
+    """
+
+    def __init__(self, backend, max_size: int = ROUTERS_DETAIL_CACHE_SIZE):
+        self.backend = backend
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._items: 'OrderedDict[str, Tuple[Mapping[str, Any], Optional[Router]]]' = OrderedDict()
+
+    def get(self, router_name: str, entry: Mapping[str, Any]) -> Optional[Router]:
+        """Модель роутера для запису індексу entry (None - файл відсутній або некоректний)"""
+        with self._lock:
+            cached = self._items.get(router_name)
+            if cached is not None and cached[0] == entry:
+                self._items.move_to_end(router_name)
+                return cached[1]
+
+        # Файл читається поза блокуванням, щоб не затримувати інші роутери
+        router = None
+        detail = self.backend.load_router(router_name)
+        if detail is not None:
+            data = {**detail, **{field: entry[field] for field in INDEX_FIELDS if field in entry}}
+            try:
+                router = Router.from_config(router_name, data)
+            except RouterConfigError as e:
+                logging.error(f"Роутер '{router_name}' пропущено: {e}")
+
+        with self._lock:
+            self._items[router_name] = (entry, router)
+            self._items.move_to_end(router_name)
+            evicted = []
+            while len(self._items) > self.max_size:
+                evicted.append(self._items.popitem(last=False)[0])
+        for name in evicted:
+            self.backend.release_router(name)
+        return router
+
+    def peek(self, router_name: str, entry: Mapping[str, Any]) -> Optional[Router]:
+        """Модель з кешу для запису entry без читання файлу (None - не завантажувалась)"""
+        with self._lock:
+            cached = self._items.get(router_name)
+        return cached[1] if cached is not None and cached[0] == entry else None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class LazyRouterModels(Mapping):
+    """
+    Моделі роутерів знімка routers.d: назви та користувачі відомі з індексу,
+    а повна модель завантажується через RouterDetailCache під час звернення.
+    """
+
+    def __init__(self, routers: Mapping[str, Any], details: RouterDetailCache,
+                 previous: Optional['LazyRouterModels'] = None, changed: Optional[set] = None):
+        self._entries = {name: entry for name, entry in routers.items() if isinstance(entry, dict)}
+        self._details = details
+        # Користувачі кожного роутера для індексу доступу (незмінені беруться з previous)
+        self.users: Dict[str, FrozenSet[str]] = {}
+        for router_name, entry in self._entries.items():
+            if previous is not None and router_name not in changed and router_name in previous.users:
+                self.users[router_name] = previous.users[router_name]
+            else:
+                self.users[router_name] = frozenset(normalize_user_id(user_id)
+                                                    for user_id in entry.get('allowed_users', ()))
+
+    def __getitem__(self, router_name: str) -> Router:
+        router = self._details.get(router_name, self._entries[router_name])
+        if router is None:
+            raise KeyError(router_name)
+        return router
+
+    def peek(self, router_name: str) -> Optional[Router]:
+        """Модель роутера, якщо вона вже є в кеші (файл роутера не читається)"""
+        entry = self._entries.get(router_name)
+        return self._details.peek(router_name, entry) if entry is not None else None
+
+    def __contains__(self, router_name: object) -> bool:
+        return router_name in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def items(self):
+        """Пари (назва, модель); роутери з некоректними файлами пропускаються"""
+        for router_name in self._entries:
+            router = self.get(router_name)
+            if router is not None:
+                yield router_name, router
+
+    def values(self):
+        for _, router in self.items():
+            yield router
+
+
+def router_users(models: Mapping[str, Router]) -> Dict[str, FrozenSet[str]]:
+    """Користувачі кожного роутера для індексу доступу"""
+    if isinstance(models, LazyRouterModels):
+        return models.users
+    return {router_name: router.allowed_users for router_name, router in models.items()}
+
+
+def peek_router(models: Mapping[str, Router], router_name: str) -> Optional[Router]:
+    """Модель роутера без читання файлу routers.d (None - немає або ще не завантажена)"""
+    if isinstance(models, LazyRouterModels):
+        return models.peek(router_name)
+    return models.get(router_name)
+
+
+class ConfigSnapshot:
+    """Незмінна версія routers.json: сирі дані, моделі роутерів та індекс доступу"""
+
+    __slots__ = ('version', 'routers', 'signature', 'models', 'access')
+
+    def __init__(self, version: int, routers: FrozenDict, signature: Optional[Hashable],
+                 models: Mapping[str, Router], access: AccessIndex):
+        self.version = version
+        self.routers = routers
+        self.signature = signature
+        self.models = models
+        self.access = access
+
+
+class ConfigStore:
+    """
+    Єдине на процес сховище налаштувань роутерів з версіонованими незмінними знімками.
+
+    Читачі отримують поточний знімок без блокувань (заміна посилання на
+    знімок атомарна). Записувачі через update(), add_item() та remove_item()
+    зберігають зміну в backend і публікують нову версію під блокуванням
+    запису. Дані перечитуються лише після зміни ознаки версії backend
+    (перевірка не частіше за revalidate_interval, для routers.json на
+    Linux - одразу через inotify).
+    """
+
+    def __init__(self, backend=None, revalidate_interval: float = ROUTERS_REVALIDATE_INTERVAL):
+        """
+        :param backend: JSONConfigBackend (за замовчуванням, routers.json) або SQLiteConfigBackend
+        :param revalidate_interval: Як часто (секунди) перевіряти, чи змінились дані
+        """
+        self.backend = backend or JSONConfigBackend()
+        self.revalidate_interval = revalidate_interval
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._checked_at = 0.0
+        # Встановлюється спостерігачем inotify, щоб перевірити файл одразу
+        self._changed = threading.Event()
+        self._write_lock = threading.RLock()
+        self._listeners: List[Callable[[RouterChange], None]] = []
+        self._watcher: Optional[FileWatcher] = None
+        self._details = RouterDetailCache(self.backend) if self.backend.lazy else None
+
+    def add_change_listener(self, listener: Callable[[RouterChange], None]):
+        """
+        Реєструє функцію, що викликається з RouterChange для кожного доданого,
+        видаленого чи зміненого роутера після публікації нової версії.
+        """
+        self._listeners.append(listener)
+
+    def get_snapshot(self) -> ConfigSnapshot:
+        """
+        Отримує поточний знімок.
+
+        Поки не минув revalidate_interval, знімок видається без блокувань.
+        Якщо файл перевіряє інший потік, видається попередній знімок.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.reload()
+
+        if not self._changed.is_set() and time.monotonic() - self._checked_at < self.revalidate_interval:
+            return snapshot
+
+        if not self._write_lock.acquire(blocking=False):
+            return snapshot
+        try:
+            self._changed.clear()
+            self._checked_at = time.monotonic()
+            if self.backend.signature() != self._snapshot.signature:
+                self._reload_locked()
+            return self._snapshot
+        finally:
+            self._write_lock.release()
+
+    def reload(self) -> ConfigSnapshot:
+        """Примусово перечитує файл та публікує нову версію"""
+        with self._write_lock:
+            self._reload_locked()
+            return self._snapshot
+
+    def _reload_locked(self):
+        """Перечитує файл (викликається під self._write_lock)"""
+        # Ознаку беремо до читання: зміна під час читання буде помічена наступною перевіркою
+        signature = self.backend.signature()
+        routers = self.backend.load()
+        self._checked_at = time.monotonic()
+
+        if routers is not None:
+            self._publish(routers, signature)
+        elif self._snapshot is None:
+            self._publish({}, signature)
+        else:
+            # Файл, можливо, ще дописується - лишаємо попередню версію до наступної зміни
+            logging.warning("Використовується попередня версія налаштувань роутерів")
+            previous = self._snapshot
+            self._snapshot = ConfigSnapshot(previous.version, previous.routers, signature,
+                                            previous.models, previous.access)
+
+    def update(self, mutator: Callable[[Dict[str, Any]], Any]) -> Any:
+        """
+        Змінює конфігурацію атомарно.
+
+        mutator отримує змінну копію повних даних (у форматі routers.json) і
+        змінює її на місці; якщо дані змінились, вони зберігаються цілком і
+        публікуються як нова версія. Повертає результат mutator.
+        """
+        with self._write_lock:
+            current = self.get_snapshot()
+            if self.backend.lazy:
+                # У знімку лише індекс - для зміни потрібні повні дані всіх роутерів
+                original = self.backend.load_full()
+                if original is None:
+                    raise ValueError("не вдалося прочитати налаштування роутерів")
+                original = freeze(original)
+            else:
+                original = current.routers
+            routers = thaw(original)
+            result = mutator(routers)
+            if freeze(routers) != original:
+                self.backend.save(routers)
+                if self.backend.lazy:
+                    self._reload_locked()
+                else:
+                    self._publish(routers, self.backend.signature())
+            return result
+
+    def add_item(self, router_name: str, field: str, value: str) -> bool:
+        """
+        Додає значення до списку роутера ('allowed_users' або 'scripts').
+
+        Зберігається лише ця зміна (у SQLite - один рядок), а нова версія
+        перераховує тільки цей роутер. Повертає False, якщо роутера немає
+        або значення вже є.
+        """
+        return self._change_item(router_name, field, value, added=True)
+
+    def remove_item(self, router_name: str, field: str, value: str) -> bool:
+        """Видаляє значення зі списку роутера; False - роутера або значення немає"""
+        return self._change_item(router_name, field, value, added=False)
+
+    def _change_item(self, router_name: str, field: str, value: str, added: bool) -> bool:
+        with self._write_lock:
+            current = self.get_snapshot()
+            router = current.models.get(router_name)
+            if router is None or (value in getattr(router, field)) == added:
+                return False
+
+            updated = self.backend.save_item(current.routers, router_name, field, value, added)
+            routers = dict(current.routers)
+            routers[router_name] = updated
+            self._publish(routers, self.backend.signature(), changed={router_name})
+            return True
+
+    def _publish(self, routers: Dict[str, Any], signature: Optional[Hashable], changed: Optional[set] = None):
+        """
+        Публікує нову версію та сповіщає про змінені роутери (під self._write_lock).
+
+        Якщо changed відомий, заморожуються та порівнюються лише ці роутери.
+        Моделі, індекс доступу та слухачі оновлюються лише для змінених
+        роутерів, а в лог пишеться один рядок з підсумком змін.
+        """
+        previous = self._snapshot
+        if previous is None:
+            frozen = freeze(routers)
+            models = self._build_models(frozen)
+            self._snapshot = ConfigSnapshot(1, frozen, signature, models, AccessIndex.build(router_users(models)))
+            logging.info(LOG_MESSAGES['routers_loaded'].format(len(models)))
+            return
+
+        if changed is None:
+            frozen = freeze(routers)
+            changed = {name for name in set(previous.routers) | set(frozen)
+                       if previous.routers.get(name) != frozen.get(name)}
+        else:
+            frozen = FrozenDict((name, freeze(value) if name in changed else value)
+                                for name, value in routers.items())
+        if not changed:
+            # Файл перезаписано без змін - лишаємо поточну версію з новою ознакою
+            self._snapshot = ConfigSnapshot(previous.version, previous.routers, signature,
+                                            previous.models, previous.access)
+            return
+
+        diff = ConfigDiff.between(previous.routers, frozen, changed, self._previous_models(previous, changed))
+        models = self._build_models(frozen, previous.models, changed)
+        access = previous.access.updated(router_users(models), changed)
+        self._snapshot = ConfigSnapshot(previous.version + 1, frozen, signature, models, access)
+        logging.info(LOG_MESSAGES['routers_changed'].format(self._snapshot.version, diff.summary()))
+        for change in diff.changes:
+            self._notify_router_changed(change)
+
+    def _previous_models(self, previous: ConfigSnapshot, changed: set) -> Dict[str, Router]:
+        """Попередні моделі змінених роутерів (для routers.d - лише вже завантажені, без читання файлів)"""
+        models = {}
+        for router_name in changed:
+            if self._details is not None:
+                entry = previous.routers.get(router_name)
+                router = self._details.peek(router_name, entry) if isinstance(entry, dict) else None
+            else:
+                router = previous.models.get(router_name)
+            if router is not None:
+                models[router_name] = router
+        return models
+
+    def _build_models(self, routers: FrozenDict, previous: Optional[Mapping[str, Router]] = None,
+                      changed: Optional[set] = None) -> Mapping[str, Router]:
+        """Моделі роутерів знімка: усі одразу або, для routers.d, на вимогу"""
+        if self._details is not None:
+            return LazyRouterModels(routers, self._details, previous, changed)
+        return build_models(routers, previous, changed)
+
+    def _notify_router_changed(self, change: RouterChange):
+        """Сповіщає слухачів про зміну налаштувань роутера"""
+        router_name = change.name
+        for listener in self._listeners:
+            try:
+                listener(change)
+            except Exception as e:
+                logging.error(f"Помилка обробки зміни роутера {router_name}: {e}")
+
+    def start_watching(self, use_inotify: bool = ROUTERS_WATCH_INOTIFY) -> bool:
+        """
+        Вмикає стеження за routers.json через inotify (Linux), щоб зміни
+        підхоплювались одразу. Повертає False, якщо лишається лише періодична перевірка.
+        """
+        if not use_inotify or self.backend.watch_path is None:
+            return False
+        if self._watcher is None:
+            self._watcher = FileWatcher(self.backend.watch_path, self._changed.set)
+        return self._watcher.start()
+
+    def stop_watching(self):
+        """Зупиняє стеження за routers.json"""
+        if self._watcher is not None:
+            self._watcher.stop()
+
+    def close(self):
+        """Зупиняє стеження та закриває backend (з'єднання з SQLite)"""
+        self.stop_watching()
+        self.backend.close()
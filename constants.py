@@ -14,6 +14,46 @@ MESSAGES = {
     'script_result': 'Результат виконання скрипта \'{}\':\n{}',
     'script_success': 'Скрипт \'{}\' виконано успішно!\n\nРезультат:\n{}',
     'script_cancelled': 'Виконання скрипта скасувано користувачем.',
+    'script_queued': '⏳ Скрипт \'{}\' поставлено в чергу на маршрутизаторі {}.',
+    'script_running': '⏳ Виконується скрипт \'{}\' на маршрутизаторі {}...\n\n',
+    'script_finished': '✅ Скрипт \'{}\' на маршрутизаторі {} завершено (код завершення: {})\n\n',
+    'script_finished_with_error': '❌ Скрипт \'{}\' на маршрутизаторі {} завершився з помилкою (код завершення: {})\n\n',
+    'schedule_digest_header': '🗓 Запуск за розкладом {}: успішно {} з {}',
+    'schedule_list_header': '🗓 Розклад запусків на роутері {}:',
+    'schedule_list_empty': 'Для цього роутера ще немає розкладів.',
+    'schedule_add_prompt': ('📝 Введіть розклад для роутера {} у форматі:\n'
+                            '<скрипт> <хвилина> <година> <день> <місяць> <день_тижня>\n\n'
+                            'Наприклад: backup 0 3 * * * - щодня о 03:00\n'
+                            'Доступні скрипти: {}'),
+    'schedule_unknown_script': '❌ Скрипт \'{}\' не додано до роутера {}.',
+    'bulk_prompt': ('📥 Надішліть документ CSV або JSON зі змінами доступу.\n\n'
+                    'CSV - перший рядок заголовок, потім рядки змін:\n'
+                    'router,user_id,action\n'
+                    'office,123456789,add\n'
+                    'office,987654321,remove\n\n'
+                    'Для скриптів - колонка script замість user_id. JSON - список об\'єктів '
+                    'з тими самими полями. Дія за замовчуванням - add.\n'
+                    'Усі рядки перевіряються перед застосуванням: якщо є помилка, нічого не змінюється.'),
+    'bulk_not_document': '❌ Очікувався документ CSV або JSON. Масові зміни скасовано.',
+    'bulk_too_large': '❌ Документ завеликий (максимум {} КБ).',
+    'bulk_parse_error': '❌ Не вдалося прочитати документ: {}',
+    'bulk_report_header': '📥 Масові зміни доступу застосовано: змінено {}, без змін {}, усього рядків {}',
+    'bulk_report_rejected': '❌ Зміни не застосовано: некоректних рядків {} з {}. Виправте їх і надішліть документ ще раз.',
+    'api_connection_error': 'Помилка з\'єднання з RouterOS API. Перевірте доступність маршрутизатора по IP-адресі {} та порту API {}.',
+    'api_error': 'Помилка RouterOS API: {}',
+    'circuit_open': '⛔ Маршрутизатор {} тимчасово недоступний (невдалих спроб поспіль: {}). Повторна перевірка через {} с.',
+    'script_cached_result': '📦 Результат скрипта \'{}\' з кешу (отримано {} с тому):\n{}',
+    'output_sent_as_document': '📎 Результат завеликий ({} символів) - повністю надіслано файлом. Кінець результату:\n',
+    'output_document_caption': 'Результат скрипта \'{}\' на маршрутизаторі \'{}\'',
+    'fanout_cached_result': '📦 з кешу ({} с тому) {}',
+    'execution_failed': '❌ Не вдалося виконати скрипт.',
+    'execution_error': '❌ Не вдалося виконати скрипт: {}',
+    'execution_cancelled': '🚫 Виконання скрипта скасовано.',
+    'execution_timeout': '⏱ Скрипт не завершився за {} с і був перерваний.',
+    'execution_cancel_requested': 'Скасовую виконання...',
+    'execution_cancel_forbidden': '❌ Скасувати виконання може лише той, хто його запросив',
+    'execution_already_finished': 'Виконання вже завершено',
+    'execution_queue_full': '⚠️ Зараз виконується забагато скриптів. Спробуйте пізніше.',
     'invalid_response': 'Будь ласка, відповідайте \'так\' для підтвердження або \'ні\' для скасування.',
     'error_loading_routers': 'Помилка при завантаженні даних про маршрутизатори.',
     'error_router_not_found': 'Помилка: маршрутизатор не знайдено.',
@@ -35,7 +75,15 @@ MESSAGES = {
     'access_stats': '📊 Статистика доступу:\n\n{}',
     'access_router_management': '🔐 Управління роутером {}:',
     'access_general_info': '📋 Загальна інформація про систему:',
-    'access_select_router_manage': '🌐 Виберіть роутер для управління:'
+    'access_select_router_manage': '🌐 Виберіть роутер для управління:',
+    'multi_select_routers': '📡 Виберіть роутери для одночасного запуску скрипта:',
+    'multi_no_selection': 'Виберіть хоча б один роутер',
+    'multi_no_common_scripts': '❌ У вибраних роутерів немає спільних скриптів.',
+    'multi_select_script': 'Виберіть скрипт для запуску на {} роутерах:',
+    'multi_password_prompt': 'Введіть пароль для виконання скрипта \'{}\' на {} роутерах:',
+    'multi_confirmation_prompt': 'Ви дійсно хочете виконати скрипт \'{}\' на роутерах: {}?\n\nВідправте \'так\' для підтвердження або \'ні\' для скасування.',
+    'multi_wrong_password_skipped': 'невірний пароль',
+    'multi_summary_header': '📡 Скрипт \'{}\': виконано {} з {}\n'
 }
 
 # Константи для станів користувача
@@ -45,14 +93,22 @@ USER_STATES = {
     'waiting_for_password': 'waiting_for_password',
     'waiting_for_confirmation': 'waiting_for_confirmation',
     'waiting_for_user_id_add': 'waiting_for_user_id_add',
-    'waiting_for_user_id_remove': 'waiting_for_user_id_remove'
+    'waiting_for_user_id_remove': 'waiting_for_user_id_remove',
+    'waiting_for_multi_routers': 'waiting_for_multi_routers',
+    'waiting_for_multi_script': 'waiting_for_multi_script',
+    'waiting_for_multi_password': 'waiting_for_multi_password',
+    'waiting_for_multi_confirmation': 'waiting_for_multi_confirmation',
+    'waiting_for_schedule_add': 'waiting_for_schedule_add',
+    'waiting_for_bulk_document': 'waiting_for_bulk_document'
 }
 
 # Константи для callback_data
 CALLBACK_PREFIXES = {
     'router': 'router_',
     'script': 'script_',
-    'access': 'access_'
+    'access': 'access_',
+    'multi': 'multi_',
+    'cancel': 'cancel_'
 }
 
 # Константи для підтвердження
@@ -74,11 +130,16 @@ LOG_MESSAGES = {
     'bot_started': 'Бот запущено.',
     'user_started': 'Користувач {} почав взаємодію з ботом.',
     'user_selected_command': 'Користувач {} вибрав команду /run_script.',
-    'routers_loaded': 'Завантажені роутери: {}',
+    'routers_loaded': 'Завантажено налаштування роутерів: {}',
+    'routers_changed': 'Налаштування роутерів, версія {}: {}',
     'user_selected_router': 'Користувач {} вибрав маршрутизатор: {}',
     'user_no_access': 'Користувач {} не має доступу до роутерів.',
     'script_executed': 'Скрипт \'{}\' був виконаний на маршрутизаторі \'{}\' в {}.',
     'script_executed_confirmation': 'Скрипт \'{}\' був виконаний на маршрутизаторі \'{}\' в {} (режим підтвердження).',
+    'script_result_from_cache': 'Результат скрипта \'{}\' на маршрутизаторі \'{}\' видано з кешу (вік {} с).',
+    'script_execution_joined': 'Користувач {} приєднався до виконання скрипта \'{}\' на маршрутизаторі \'{}\', що вже триває.',
+    'script_executed_scheduled': 'Скрипт \'{}\' виконано за розкладом на маршрутизаторі \'{}\' о {}.',
+    'script_executed_multi': 'Скрипт \'{}\' був виконаний на маршрутизаторі \'{}\' в {} (груповий запуск).',
     'wrong_password_attempt': 'Користувач {} ввів невірний пароль для скрипта {}.',
     'script_cancelled_by_user': 'Користувач {} скасував виконання скрипта {} на маршрутизаторі {}',
     'notifications_status': 'Повідомлення для ADMIN_{}: {}',
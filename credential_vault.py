@@ -0,0 +1,192 @@
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from config import (
+    VAULT_FILE, VAULT_KEY_ENV, VAULT_KDF_ITERATIONS, SECRET_CACHE_TTL, SECRET_CACHE_MAX_SIZE,
+    ROUTERS_REVALIDATE_INTERVAL
+)
+from config_backends import write_json_atomic
+
+# Поля роутера, що можуть зберігатися в сховищі
+VAULT_FIELDS = ('ssh_password', 'script_password')
+
+
+class VaultError(Exception):
+    """Сховище недоступне: немає ключа або файл пошкоджений"""
+
+
+class CredentialVault:
+    """
+    Зашифроване сховище паролів роутерів (vault.json).
+
+    З парольної фрази (змінна оточення VAULT_KEY_ENV) один раз виводиться
+    головний ключ (PBKDF2), а з нього - окремий ключ кожного роутера (HKDF),
+    тож зашифрований пароль одного роутера не розшифрується для іншого.
+    Розшифровані паролі тримаються в пам'яті не довше за cache_ttl секунд
+    в обмеженому LRU-кеші, тож виконання скрипта не платить за розшифрування.
+    """
+
+    def __init__(self, vault_file: str = VAULT_FILE, passphrase: Optional[str] = None,
+                 cache_ttl: float = SECRET_CACHE_TTL, cache_size: int = SECRET_CACHE_MAX_SIZE):
+        """
+        :param vault_file: Шлях до файлу сховища
+        :param passphrase: Парольна фраза (за замовчуванням - зі змінної оточення VAULT_KEY_ENV)
+        :param cache_ttl: Скільки секунд тримати розшифрований пароль у пам'яті
+        :param cache_size: Максимальна кількість розшифрованих паролів у пам'яті
+        """
+        self.vault_file = vault_file
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._passphrase = passphrase if passphrase is not None else os.environ.get(VAULT_KEY_ENV)
+        self._lock = threading.Lock()
+        self._master_key: Optional[bytes] = None
+        self._data: Dict = {}
+        self._signature: Optional[Hashable] = None
+        self._checked_at: Optional[float] = None
+        self._cache: 'OrderedDict[Tuple[str, str], Tuple[float, str]]' = OrderedDict()
+        self._key_warning_logged = False
+
+    def _stat(self) -> Optional[Hashable]:
+        try:
+            stat = os.stat(self.vault_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _revalidate(self, now: float):
+        """Перечитує файл сховища, якщо він змінився (викликається під self._lock)"""
+        if self._checked_at is not None and now - self._checked_at < ROUTERS_REVALIDATE_INTERVAL:
+            return
+        self._checked_at = now
+        signature = self._stat()
+        if signature == self._signature:
+            return
+
+        self._signature = signature
+        self._cache.clear()
+        if signature is None:
+            self._data = {}
+            return
+        try:
+            with open(self.vault_file, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            if not isinstance(data, dict) or not isinstance(data.get('routers', {}), dict):
+                raise ValueError("очікується об'єкт з полем routers")
+        except Exception as e:
+            logging.error(f"Помилка завантаження сховища паролів {self.vault_file}: {e}")
+            return
+        if (self._data.get('kdf'), self._data.get('check')) != (data.get('kdf'), data.get('check')):
+            self._master_key = None
+        self._data = data
+        logging.info(f"Сховище паролів завантажено: роутерів {len(data.get('routers', {}))}")
+
+    def _router_fernet(self, router_name: str) -> Fernet:
+        """Шифр роутера; головний ключ виводиться з парольної фрази один раз (під self._lock)"""
+        if self._master_key is None:
+            if not self._passphrase:
+                raise VaultError(f"не задано ключ сховища (змінна оточення {VAULT_KEY_ENV})")
+            kdf = self._data.get('kdf')
+            if not kdf:
+                kdf = {'salt': base64.b64encode(os.urandom(16)).decode(), 'iterations': VAULT_KDF_ITERATIONS}
+                self._data = {**self._data, 'kdf': kdf}
+            master_key = PBKDF2HMAC(
+                algorithm=hashes.SHA256(), length=32,
+                salt=base64.b64decode(kdf['salt']), iterations=kdf['iterations']
+            ).derive(self._passphrase.encode())
+
+            # Контрольне значення відрізняє невірну парольну фразу від пошкоджених даних
+            check = self._derive_fernet(master_key, 'check')
+            if 'check' in self._data:
+                try:
+                    check.decrypt(self._data['check'].encode())
+                except InvalidToken:
+                    raise VaultError("невірна парольна фраза сховища")
+            else:
+                self._data = {**self._data, 'check': check.encrypt(b'vault').decode()}
+            self._master_key = master_key
+
+        return self._derive_fernet(self._master_key, f"router:{router_name}")
+
+    @staticmethod
+    def _derive_fernet(master_key: bytes, purpose: str) -> Fernet:
+        """Шифр з ключем, виведеним з головного для конкретного призначення (HKDF)"""
+        key = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=purpose.encode()).derive(master_key)
+        return Fernet(base64.urlsafe_b64encode(key))
+
+    def get_secret(self, router_name: str, field: str) -> Optional[str]:
+        """Розшифрований пароль роутера (None - у сховищі його немає або він недоступний)"""
+        now = time.monotonic()
+        key = (router_name, field)
+        with self._lock:
+            self._revalidate(now)
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > now:
+                self._cache.move_to_end(key)
+                return cached[1]
+            self._cache.pop(key, None)
+
+            token = self._data.get('routers', {}).get(router_name, {}).get(field)
+            if token is None:
+                return None
+            try:
+                secret = self._router_fernet(router_name).decrypt(token.encode()).decode()
+            except VaultError as e:
+                if not self._key_warning_logged:
+                    logging.error(f"Паролі зі сховища недоступні: {e}")
+                    self._key_warning_logged = True
+                return None
+            except InvalidToken:
+                logging.error(f"Не вдалося розшифрувати {field} роутера {router_name}: невірний ключ або дані")
+                return None
+
+            self._cache[key] = (now + self.cache_ttl, secret)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return secret
+
+    def set_secret(self, router_name: str, field: str, secret: str):
+        """Шифрує та зберігає пароль роутера"""
+        if field not in VAULT_FIELDS:
+            raise ValueError(f"поле {field} не зберігається в сховищі (можливі: {', '.join(VAULT_FIELDS)})")
+        with self._lock:
+            self._checked_at = None
+            self._revalidate(time.monotonic())
+            token = self._router_fernet(router_name).encrypt(secret.encode()).decode()
+            routers = {name: dict(fields) for name, fields in self._data.get('routers', {}).items()}
+            routers.setdefault(router_name, {})[field] = token
+            self._write({**self._data, 'routers': routers})
+            self._cache.pop((router_name, field), None)
+
+    def remove_router(self, router_name: str) -> bool:
+        """Видаляє всі паролі роутера; False - їх не було"""
+        with self._lock:
+            self._checked_at = None
+            self._revalidate(time.monotonic())
+            routers = dict(self._data.get('routers', {}))
+            if routers.pop(router_name, None) is None:
+                return False
+            self._write({**self._data, 'routers': routers})
+            for field in VAULT_FIELDS:
+                self._cache.pop((router_name, field), None)
+            return True
+
+    def _write(self, data: Dict):
+        """Атомарно записує сховище (викликається під self._lock)"""
+        write_json_atomic(self.vault_file, data)
+        os.chmod(self.vault_file, 0o600)
+        self._data = data
+        self._signature = self._stat()
+
+    def clear_cache(self):
+        """Забуває всі розшифровані паролі"""
+        with self._lock:
+            self._cache.clear()
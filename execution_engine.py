@@ -0,0 +1,213 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Callable, Deque, Dict, List, Optional
+from config import EXECUTION_MAX_WORKERS, EXECUTION_PER_ROUTER_LIMIT, EXECUTION_QUEUE_SIZE
+
+# Стани завдання
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+
+
+class ExecutionCancelled(Exception):
+    """Виконання скасовано користувачем"""
+
+
+class ExecutionTimeout(Exception):
+    """Виконання перевищило дозволений час"""
+
+
+class ExecutionJob:
+    """Завдання на виконання у фоновому потоці"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, router_name: str, func: Callable, args: tuple, owner_id: Optional[int] = None,
+                 on_discard: Optional[Callable[['ExecutionJob'], None]] = None):
+        self.id = next(self._ids)
+        self.router_name = router_name
+        self.func = func
+        self.args = args
+        self.owner_id = owner_id
+        self.on_discard = on_discard
+        self.state = JOB_QUEUED
+        self.cancel_event = threading.Event()
+        self.submitted_at = time.time()
+
+    @property
+    def is_cancelled(self) -> bool:
+        """Перевіряє, чи було запитано скасування"""
+        return self.cancel_event.is_set()
+
+
+class ExecutionEngine:
+    """Клас для фонового виконання скриптів пулом робочих потоків"""
+
+    def __init__(self, max_workers: int = EXECUTION_MAX_WORKERS,
+                 per_router_limit: int = EXECUTION_PER_ROUTER_LIMIT,
+                 queue_size: int = EXECUTION_QUEUE_SIZE):
+        self.max_workers = max_workers
+        self.per_router_limit = per_router_limit
+        self.queue_size = queue_size
+
+        self._queue: "queue.Queue[Optional[ExecutionJob]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers: List[threading.Thread] = []
+        self._running: Dict[str, int] = defaultdict(int)
+        self._deferred: Dict[str, Deque[ExecutionJob]] = defaultdict(deque)
+        self._jobs: Dict[int, ExecutionJob] = {}
+        self._pending_count = 0
+        self._started = False
+
+    def _start_workers(self):
+        """Запускає робочі потоки (тільки один раз)"""
+        with self._lock:
+            if self._started:
+                return
+
+            for index in range(self.max_workers):
+                worker = threading.Thread(
+                    target=self._worker_loop,
+                    name=f"execution-worker-{index + 1}",
+                    daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+
+            self._started = True
+            logging.info(f"Запущено {self.max_workers} робочих потоків виконання скриптів")
+
+    def submit(self, router_name: str, func: Callable, args: tuple = (),
+               owner_id: Optional[int] = None,
+               on_discard: Optional[Callable[[ExecutionJob], None]] = None) -> Optional[ExecutionJob]:
+        """
+        Ставить завдання в чергу на виконання.
+
+        :param router_name: Роутер, до ліміту якого зараховується завдання
+        :param func: Функція, що викликається як func(job, *args)
+        :param args: Додаткові аргументи функції
+        :param owner_id: ID користувача, який може скасувати завдання
+        :param on_discard: Викликається, якщо завдання скасовано ще до запуску
+        :return: Створене завдання або None, якщо черга переповнена
+        """
+        self._start_workers()
+
+        job = ExecutionJob(router_name, func, args, owner_id, on_discard)
+        with self._lock:
+            if self._pending_count >= self.queue_size:
+                logging.warning(f"Черга виконання переповнена, завдання для {router_name} відхилено")
+                return None
+            self._pending_count += 1
+            self._jobs[job.id] = job
+
+        self._queue.put(job)
+        return job
+
+    def get_job(self, job_id: int) -> Optional[ExecutionJob]:
+        """Отримує завдання, що ще очікує або виконується"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: int) -> Optional[str]:
+        """
+        Скасовує завдання.
+
+        Завдання з черги не буде запущено (для нього одразу викликається on_discard),
+        а завдання, що виконується, має саме перевіряти job.cancel_event і
+        завершитися якнайшвидше.
+
+        :return: Стан завдання на момент скасування або None, якщо завдання вже завершилось
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.is_cancelled:
+                return None
+            job.cancel_event.set()
+            state = job.state
+
+        if state == JOB_QUEUED and job.on_discard is not None:
+            try:
+                job.on_discard(job)
+            except Exception as e:
+                logging.error(f"Помилка обробки скасованого завдання для {job.router_name}: {e}")
+
+        return state
+
+    def _take_slot(self, job: ExecutionJob) -> bool:
+        """Займає слот роутера або відкладає завдання, якщо ліміт вичерпано"""
+        with self._lock:
+            if job.is_cancelled:
+                # Скасоване до запуску завдання просто відкидаємо
+                self._pending_count -= 1
+                self._jobs.pop(job.id, None)
+                return False
+
+            if self._running[job.router_name] >= self.per_router_limit:
+                self._deferred[job.router_name].append(job)
+                return False
+
+            self._running[job.router_name] += 1
+            self._pending_count -= 1
+            job.state = JOB_RUNNING
+            return True
+
+    def _release_slot(self, job: ExecutionJob):
+        """Звільняє слот роутера та повертає в чергу відкладене завдання"""
+        router_name = job.router_name
+        with self._lock:
+            self._jobs.pop(job.id, None)
+            self._running[router_name] -= 1
+            if self._running[router_name] <= 0:
+                del self._running[router_name]
+
+            deferred = self._deferred.get(router_name)
+            next_job = deferred.popleft() if deferred else None
+            if deferred is not None and not deferred:
+                del self._deferred[router_name]
+
+        if next_job is not None:
+            self._queue.put(next_job)
+
+    def _worker_loop(self):
+        """Основний цикл робочого потоку"""
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+
+            if not self._take_slot(job):
+                continue
+
+            try:
+                job.func(job, *job.args)
+            except Exception as e:
+                logging.error(f"Помилка виконання фонового завдання для {job.router_name}: {e}")
+            finally:
+                self._release_slot(job)
+
+    def get_stats(self) -> dict:
+        """Отримує статистику черги та активних виконань"""
+        with self._lock:
+            return {
+                'workers': len(self._workers),
+                'queued': self._pending_count,
+                'running': sum(self._running.values()),
+                'running_by_router': dict(self._running)
+            }
+
+    def stop(self, timeout: float = 5.0):
+        """Зупиняє робочі потоки після завершення поточних завдань"""
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+            self._started = False
+
+        for _ in workers:
+            self._queue.put(None)
+        for worker in workers:
+            worker.join(timeout)
+
+        logging.info("Робочі потоки виконання скриптів зупинено")
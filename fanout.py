@@ -0,0 +1,175 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional
+from config import FANOUT_MAX_PARALLEL, FANOUT_EDIT_INTERVAL
+from constants import MESSAGES
+
+# Статуси виконання на окремому роутері
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_SUCCESS = 'success'
+STATUS_FAILED = 'failed'
+STATUS_SKIPPED = 'skipped'
+
+STATUS_ICONS = {
+    STATUS_PENDING: '🕓',
+    STATUS_RUNNING: '⏳',
+    STATUS_SUCCESS: '✅',
+    STATUS_FAILED: '❌',
+    STATUS_SKIPPED: '🔒'
+}
+
+# Максимальна довжина фрагмента результату в підсумку
+SUMMARY_LINE_LIMIT = 120
+# Ліміт Telegram на довжину повідомлення
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+class FanOutRun:
+    """Клас для паралельного виконання одного скрипта на кількох роутерах"""
+
+    def __init__(self, script: str, router_names: List[str], skipped: Optional[Dict[str, str]] = None,
+                 max_parallel: int = FANOUT_MAX_PARALLEL, edit_interval: float = FANOUT_EDIT_INTERVAL):
+        self.script = script
+        self.max_parallel = max_parallel
+        self.edit_interval = edit_interval
+
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+        self._last_publish = 0.0
+        self._submit: Optional[Callable[[str], bool]] = None
+        self._queue = deque(router_names)
+        self._active = 0
+        self._finish_claimed = False
+
+        # Порядок рядків у підсумку відповідає порядку вибору роутерів
+        self._statuses: "OrderedDict[str, str]" = OrderedDict()
+        self._outputs: Dict[str, str] = {}
+        for router_name in router_names:
+            self._statuses[router_name] = STATUS_PENDING
+        for router_name, reason in (skipped or {}).items():
+            self._statuses[router_name] = STATUS_SKIPPED
+            self._outputs[router_name] = reason
+
+    @property
+    def router_names(self) -> List[str]:
+        """Роутери, на яких виконується скрипт (без пропущених)"""
+        return [name for name, status in self._statuses.items() if status != STATUS_SKIPPED]
+
+    def start(self, submit: Callable[[str], bool]):
+        """
+        Запускає виконання, передаючи роутери у submit не більше max_parallel одночасно.
+
+        :param submit: Функція, що ставить завдання для роутера в чергу; повертає False, якщо черга переповнена
+        """
+        self._submit = submit
+        self._submit_next()
+
+    def _submit_next(self):
+        """Передає на виконання наступні роутери в межах ліміту паралельності"""
+        while True:
+            with self._lock:
+                if not self._queue or self._active >= self.max_parallel:
+                    return
+                router_name = self._queue.popleft()
+                self._active += 1
+
+            if not self._submit(router_name):
+                with self._lock:
+                    self._active -= 1
+                    self._statuses[router_name] = STATUS_FAILED
+                    self._outputs[router_name] = MESSAGES['execution_queue_full']
+
+    def mark_running(self, router_name: str):
+        """Позначає, що виконання на роутері розпочалося"""
+        with self._lock:
+            self._statuses[router_name] = STATUS_RUNNING
+
+    def complete(self, router_name: str, success: bool, output: str) -> bool:
+        """
+        Фіксує результат роутера та запускає наступний з черги.
+
+        :return: True, якщо це був останній роутер
+        """
+        with self._lock:
+            self._statuses[router_name] = STATUS_SUCCESS if success else STATUS_FAILED
+            self._outputs[router_name] = output
+            self._active -= 1
+
+        self._submit_next()
+        return self.claim_finish()
+
+    def _all_done(self) -> bool:
+        """Перевіряє, чи всі роутери в кінцевому статусі (викликається під self._lock)"""
+        return all(status not in (STATUS_PENDING, STATUS_RUNNING) for status in self._statuses.values())
+
+    @property
+    def is_finished(self) -> bool:
+        """Перевіряє, чи завершено виконання на всіх роутерах"""
+        with self._lock:
+            return self._all_done()
+
+    def claim_finish(self) -> bool:
+        """
+        Повертає True рівно один раз - коли виконання завершено на всіх роутерах.
+
+        Гарантує, що фінальне оновлення та сповіщення відправляються один раз.
+        """
+        with self._lock:
+            if self._finish_claimed or not self._all_done():
+                return False
+            self._finish_claimed = True
+            return True
+
+    def get_counts(self) -> Dict[str, int]:
+        """Отримує кількість роутерів у кожному статусі"""
+        with self._lock:
+            counts = {status: 0 for status in STATUS_ICONS}
+            for status in self._statuses.values():
+                counts[status] += 1
+            return counts
+
+    def render(self) -> str:
+        """Формує текст підсумкового повідомлення"""
+        counts = self.get_counts()
+        done = counts[STATUS_SUCCESS] + counts[STATUS_FAILED]
+        total = done + counts[STATUS_PENDING] + counts[STATUS_RUNNING]
+
+        lines = [MESSAGES['multi_summary_header'].format(self.script, done, total)]
+        with self._lock:
+            for router_name, status in self._statuses.items():
+                line = f"{STATUS_ICONS[status]} {router_name}"
+                output = _first_line(self._outputs.get(router_name, ''))
+                if output:
+                    line += f": {output}"
+                lines.append(line)
+
+        text = "\n".join(lines)
+        if len(text) > TELEGRAM_MESSAGE_LIMIT:
+            text = text[:TELEGRAM_MESSAGE_LIMIT - 1] + '…'
+        return text
+
+    def publish(self, edit: Callable[[str], None], final: bool = False):
+        """
+        Оновлює підсумкове повідомлення не частіше за edit_interval.
+
+        Фінальне оновлення відправляється завжди.
+        """
+        with self._publish_lock:
+            now = time.time()
+            if not final and now - self._last_publish < self.edit_interval:
+                return
+            self._last_publish = now
+            edit(self.render())
+
+
+def _first_line(output: str) -> str:
+    """Повертає перший непорожній рядок результату, обрізаний до SUMMARY_LINE_LIMIT"""
+    for line in (output or '').splitlines():
+        line = line.strip()
+        if line:
+            if len(line) > SUMMARY_LINE_LIMIT:
+                line = line[:SUMMARY_LINE_LIMIT - 1] + '…'
+            return line
+    return ''
@@ -0,0 +1,106 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+from typing import Callable, Optional
+
+# Константи inotify з <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+# Запис файлу на місці, атомарна заміна через rename та видалення
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# Заголовок події: wd, mask, cookie, len
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class FileWatcher:
+    """
+    Стеження за зміною файлу через inotify (лише Linux, через ctypes без залежностей).
+
+    Стежить за каталогом файлу, а не за самим файлом, щоб помічати і запис
+    на місці, і атомарну заміну через rename. Якщо inotify недоступний,
+    start() повертає False і викликач покладається на періодичну перевірку.
+    """
+
+    def __init__(self, path: str, on_change: Callable[[], None]):
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self._fd: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def start(self) -> bool:
+        """Запускає стеження; повертає False, якщо inotify недоступний"""
+        if self._thread is not None and self._thread.is_alive():
+            return True
+        if not sys.platform.startswith('linux'):
+            return False
+
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(IN_CLOEXEC | IN_NONBLOCK)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+            if libc.inotify_add_watch(fd, os.path.dirname(self.path).encode(), WATCH_MASK) < 0:
+                error = ctypes.get_errno()
+                os.close(fd)
+                raise OSError(error, os.strerror(error))
+        except (OSError, AttributeError) as e:
+            logging.warning(f"inotify недоступний для {self.path}, лишається періодична перевірка: {e}")
+            return False
+
+        self._fd = fd
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="file-watcher", daemon=True)
+        self._thread.start()
+        logging.info(f"Запущено стеження за змінами {self.path}")
+        return True
+
+    def stop(self):
+        """Зупиняє стеження"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(2)
+
+    def _run(self):
+        """Читає події inotify та викликає on_change для подій цього файлу"""
+        name = os.path.basename(self.path).encode()
+        try:
+            while not self._stop_event.is_set():
+                ready, _, _ = select.select([self._fd], [], [], 1)
+                if not ready:
+                    continue
+                try:
+                    data = os.read(self._fd, 4096)
+                except BlockingIOError:
+                    continue
+                if self._matches(data, name):
+                    try:
+                        self.on_change()
+                    except Exception as e:
+                        logging.error(f"Помилка обробки зміни {self.path}: {e}")
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    @staticmethod
+    def _matches(data: bytes, name: bytes) -> bool:
+        """Чи стосується хоча б одна подія з буфера файлу name"""
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            if data[offset:offset + length].rstrip(b'\0') == name:
+                return True
+            offset += length
+        return False
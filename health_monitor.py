@@ -0,0 +1,211 @@
+import logging
+import socket
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import schedule
+from config import (
+    HEALTH_PROBE_INTERVAL, HEALTH_PROBE_TIMEOUT, HEALTH_PROBE_PARALLEL, HEALTH_PROBE_SPREAD,
+    PREWARM_INTERVAL, PREWARM_TOP_ROUTERS, USAGE_HISTORY_SIZE
+)
+from router_manager import RouterManager
+from ssh_pool import SSHConnectionPool
+
+
+class RouterHealth:
+    """Результат останньої перевірки роутера"""
+
+    __slots__ = ('reachable', 'rtt', 'checked_at', 'error')
+
+    def __init__(self, reachable: bool, rtt: Optional[float], error: str = ''):
+        self.reachable = reachable
+        self.rtt = rtt
+        self.checked_at = time.time()
+        self.error = error
+
+
+class HealthMonitor:
+    """
+    Клас для фонової перевірки доступності роутерів за розкладом.
+
+    Найчастіше використовувані роутери отримують заздалегідь відкрите
+    SSH-з'єднання в пулі, яке підтримується живим keepalive-запитами
+    (вони ж вимірюють час відповіді). Решта роутерів перевіряється
+    TCP-підключенням до порту; підключення розподіляються на частину
+    інтервалу, щоб не відкривати їх до всього парку одночасно.
+    """
+
+    def __init__(self, router_manager: RouterManager, ssh_pool: SSHConnectionPool,
+                 probe_interval: int = HEALTH_PROBE_INTERVAL,
+                 prewarm_interval: int = PREWARM_INTERVAL,
+                 prewarm_top: int = PREWARM_TOP_ROUTERS,
+                 probe_timeout: float = HEALTH_PROBE_TIMEOUT,
+                 probe_parallel: int = HEALTH_PROBE_PARALLEL,
+                 probe_spread: float = HEALTH_PROBE_SPREAD,
+                 history_size: int = USAGE_HISTORY_SIZE):
+        self.router_manager = router_manager
+        self.ssh_pool = ssh_pool
+        self.probe_interval = probe_interval
+        self.prewarm_interval = prewarm_interval
+        self.prewarm_top = prewarm_top
+        self.probe_timeout = probe_timeout
+        self.probe_parallel = probe_parallel
+        self.probe_spread = probe_spread
+
+        self._lock = threading.Lock()
+        self._usage: "deque[str]" = deque(maxlen=history_size)
+        self._health: Dict[str, RouterHealth] = {}
+        self._scheduler = schedule.Scheduler()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        """Запускає фоновий потік розкладу (тільки один раз)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._scheduler.clear()
+        self._scheduler.every(self.prewarm_interval).seconds.do(self.prewarm)
+        if self.probe_interval > 0:
+            self._scheduler.every(self.probe_interval).seconds.do(self.probe_all)
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+        self._thread.start()
+        logging.info("Запущено фонову перевірку доступності роутерів")
+
+    def stop(self):
+        """Зупиняє фоновий потік"""
+        self._stop_event.set()
+        self._scheduler.clear()
+
+    def _run(self):
+        """Основний цикл: перша перевірка одразу, далі - за розкладом"""
+        self._safe_call(self.prewarm)
+        if self.probe_interval > 0:
+            self._safe_call(self.probe_all)
+        while not self._stop_event.wait(1):
+            try:
+                self._scheduler.run_pending()
+            except Exception as e:
+                logging.error(f"Помилка фонової перевірки роутерів: {e}")
+
+    @staticmethod
+    def _safe_call(job):
+        try:
+            job()
+        except Exception as e:
+            logging.error(f"Помилка фонової перевірки роутерів: {e}")
+
+    def record_usage(self, router_name: str):
+        """Фіксує запуск скрипта на роутері для вибору роутерів для попереднього підключення"""
+        with self._lock:
+            self._usage.append(router_name)
+
+    def get_top_routers(self, limit: int) -> List[str]:
+        """
+        Отримує найчастіше використовувані роутери за останніми запусками.
+
+        Поки історії немає (наприклад, одразу після запуску бота), повертає
+        перші роутери з routers.json.
+        """
+        with self._lock:
+            ranked = [name for name, _ in Counter(self._usage).most_common()]
+
+        known = self.router_manager.get_router_names()
+        top = [name for name in ranked if name in known]
+        for name in known:
+            if len(top) >= limit:
+                break
+            if name not in top:
+                top.append(name)
+        return top[:limit]
+
+    def prewarm(self):
+        """Відкриває та підтримує SSH-з'єднання з найуживанішими роутерами"""
+        # Пул закриває простійні з'єднання лише при видачі - без запитів вони лишались би відкритими
+        self.ssh_pool.evict_idle()
+        for router_name in self.get_top_routers(self.prewarm_top):
+            info = self.router_manager.get_router(router_name)
+            if not info or info.backend != 'ssh':
+                continue
+
+            try:
+                rtt = self.ssh_pool.probe(info.ip, info.username, self.router_manager.get_secret(info, 'ssh_password'),
+                                          info.ssh_port, connect_timeout=info.connect_timeout)
+                self._set_health(router_name, RouterHealth(True, rtt))
+            except Exception as e:
+                self._set_health(router_name, RouterHealth(False, None, str(e)))
+                logging.warning(f"Не вдалося заздалегідь підключитися до {router_name}: {e}")
+
+    def probe_all(self):
+        """
+        Перевіряє TCP-доступність роутерів, що не мають свіжої перевірки.
+
+        Для routers.d перевіряються лише роутери, модель яких уже в кеші, та
+        найуживаніші роутери: перевірка не читає файл кожного роутера.
+        """
+        fresh_after = time.time() - self.probe_interval / 2
+        with self._lock:
+            fresh = {name for name, health in self._health.items() if health.checked_at >= fresh_after}
+
+        targets = [name for name in self.router_manager.get_router_names() if name not in fresh]
+        if not targets:
+            return
+
+        top = set(self.get_top_routers(self.prewarm_top))
+        # Пауза між запусками перевірок, щоб розподілити їх на частину інтервалу
+        pace = self.probe_interval * self.probe_spread / len(targets)
+        with ThreadPoolExecutor(max_workers=self.probe_parallel) as executor:
+            for index, router_name in enumerate(targets):
+                if index and pace > 0 and self._stop_event.wait(pace):
+                    break
+                executor.submit(self._probe_and_record, router_name, router_name in top)
+
+    def _probe_and_record(self, router_name: str, load: bool):
+        try:
+            health = self._probe_router(router_name, load)
+        except Exception as e:
+            logging.error(f"Помилка перевірки доступності {router_name}: {e}")
+            return
+        if health is not None:
+            self._set_health(router_name, health)
+
+    def _probe_router(self, router_name: str, load: bool = True) -> Optional[RouterHealth]:
+        """
+        TCP-перевірка порту, через який бот підключається до роутера.
+
+        :param load: False - не читати файл routers.d, якщо модель ще не завантажена
+        """
+        info = self.router_manager.get_router(router_name) if load else self.router_manager.get_loaded_router(router_name)
+        if not info or not info.ip:
+            return None
+
+        started = time.monotonic()
+        try:
+            with socket.create_connection((info.ip, info.port), timeout=self.probe_timeout):
+                pass
+        except OSError as e:
+            return RouterHealth(False, None, str(e))
+        return RouterHealth(True, time.monotonic() - started)
+
+    def _set_health(self, router_name: str, health: RouterHealth):
+        with self._lock:
+            previous = self._health.get(router_name)
+            self._health[router_name] = health
+
+        if previous is not None and previous.reachable != health.reachable:
+            state = "знову доступний" if health.reachable else f"недоступний ({health.error})"
+            logging.info(f"Роутер {router_name} {state}")
+
+    def get_health(self, router_name: str) -> Optional[RouterHealth]:
+        """Отримує результат останньої перевірки роутера (None - ще не перевірявся)"""
+        with self._lock:
+            return self._health.get(router_name)
+
+    def is_unreachable(self, router_name: str) -> bool:
+        """Чи показала остання перевірка, що роутер недоступний"""
+        health = self.get_health(router_name)
+        return health is not None and not health.reachable
@@ -1,13 +1,113 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
 from telebot.types import InlineKeyboardButton, InlineKeyboardMarkup
+from config import KEYBOARD_CACHE_SIZE
 from constants import CALLBACK_PREFIXES
 
-def create_router_keyboard(router_names: list) -> InlineKeyboardMarkup:
-    """Створює клавіатуру для вибору роутера"""
+
+class KeyboardCache:
+    """
+    Кеш готових клавіатур роутерів з LRU-витісненням.
+
+    Клавіатура будується один раз і використовується повторно, доки не
+    зміняться налаштування роутера (invalidate_router). Збережені клавіатури
+    не можна змінювати після отримання.
+    """
+
+    def __init__(self, max_size: int = KEYBOARD_CACHE_SIZE):
+        self.max_size = max_size
+        # (роутер, вид клавіатури) -> клавіатура
+        self._items: "OrderedDict[Tuple[str, str], InlineKeyboardMarkup]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Лічильник скидань: клавіатура, побудована до скидання, не зберігається
+        self._generation = 0
+
+    def get(self, router_name: str, kind: str, build: Callable[[], InlineKeyboardMarkup]) -> InlineKeyboardMarkup:
+        """Отримує клавіатуру з кешу або будує її викликом build()"""
+        key = (router_name, kind)
+        with self._lock:
+            keyboard = self._items.get(key)
+            if keyboard is not None:
+                self._items.move_to_end(key)
+                return keyboard
+            generation = self._generation
+
+        keyboard = build()
+        with self._lock:
+            if generation != self._generation:
+                return keyboard
+            self._items[key] = keyboard
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+        return keyboard
+
+    def invalidate_router(self, router_name: str):
+        """Скидає всі клавіатури роутера"""
+        with self._lock:
+            self._generation += 1
+            for key in [key for key in self._items if key[0] == router_name]:
+                del self._items[key]
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._items.clear()
+
+
+def create_router_keyboard(router_names: list, include_multi: bool = False,
+                           unreachable: Optional[set] = None) -> InlineKeyboardMarkup:
+    """Створює клавіатуру для вибору роутера (недоступні роутери позначаються, але лишаються вибірними)"""
     keyboard = InlineKeyboardMarkup(row_width=1)
+    unreachable = unreachable or set()
     
     for router_name in router_names:
         callback_data = f"{CALLBACK_PREFIXES['router']}{router_name}"
-        keyboard.add(InlineKeyboardButton(router_name, callback_data=callback_data))
+        text = f"⚫ {router_name} (недоступний)" if router_name in unreachable else router_name
+        keyboard.add(InlineKeyboardButton(text, callback_data=callback_data))
+    
+    # Груповий запуск має сенс лише для кількох роутерів
+    if include_multi and len(router_names) > 1:
+        keyboard.add(InlineKeyboardButton("📡 Кілька роутерів", callback_data=f"{CALLBACK_PREFIXES['multi']}start"))
+    
+    return keyboard
+
+def create_multi_router_keyboard(router_names: list, selected: list, groups: list,
+                                 unreachable: Optional[set] = None) -> InlineKeyboardMarkup:
+    """Створює клавіатуру для вибору кількох роутерів
+    
+    Args:
+        router_names: доступні користувачу роутери
+        selected: вже вибрані роутери
+        groups: теги груп роутерів з routers.json
+        unreachable: роутери, які остання перевірка показала недоступними
+    """
+    keyboard = InlineKeyboardMarkup(row_width=1)
+    prefix = CALLBACK_PREFIXES['multi']
+    
+    unreachable = unreachable or set()
+    
+    for router_name in router_names:
+        mark = '✅' if router_name in selected else '⬜'
+        suffix = " ⚫" if router_name in unreachable else ""
+        keyboard.add(InlineKeyboardButton(f"{mark} {router_name}{suffix}", callback_data=f"{prefix}toggle_{router_name}"))
+    
+    for group in groups:
+        keyboard.add(InlineKeyboardButton(f"🏷 Група: {group}", callback_data=f"{prefix}group_{group}"))
+    
+    keyboard.add(InlineKeyboardButton("☑️ Всі роутери", callback_data=f"{prefix}all"))
+    keyboard.add(InlineKeyboardButton(f"▶️ Далі ({len(selected)})", callback_data=f"{prefix}done"))
+    
+    return keyboard
+
+def create_multi_script_keyboard(scripts: list) -> InlineKeyboardMarkup:
+    """Створює клавіатуру для вибору скрипта при груповому запуску"""
+    keyboard = InlineKeyboardMarkup(row_width=1)
+    
+    for script in scripts:
+        callback_data = f"{CALLBACK_PREFIXES['multi']}script_{script}"
+        keyboard.add(InlineKeyboardButton(script, callback_data=callback_data))
     
     return keyboard
 
@@ -21,6 +121,12 @@ def create_script_keyboard(router_name: str, scripts: list) -> InlineKeyboardMar
     
     return keyboard
 
+def create_cancel_keyboard(job_id: int) -> InlineKeyboardMarkup:
+    """Створює клавіатуру з кнопкою скасування виконання"""
+    keyboard = InlineKeyboardMarkup(row_width=1)
+    keyboard.add(InlineKeyboardButton("🚫 Скасувати", callback_data=f"{CALLBACK_PREFIXES['cancel']}{job_id}"))
+    return keyboard
+
 def create_empty_keyboard() -> InlineKeyboardMarkup:
     """Створює порожню клавіатуру"""
     return InlineKeyboardMarkup()
@@ -41,4 +147,19 @@ def create_custom_keyboard(buttons: list) -> InlineKeyboardMarkup:
     for text, callback_data in buttons:
         keyboard.add(InlineKeyboardButton(text, callback_data=callback_data))
     
-    return keyboard 
\ No newline at end of file
+    return keyboard 
+
+def create_schedule_keyboard(router_name: str, schedules: list) -> InlineKeyboardMarkup:
+    """Створює клавіатуру розкладів запусків роутера"""
+    keyboard = InlineKeyboardMarkup(row_width=1)
+    
+    for entry in schedules:
+        keyboard.add(InlineKeyboardButton(
+            f"❌ #{entry['id']} {entry['script']} — {entry['cron']}",
+            callback_data=f"access_unschedule_{entry['id']}"
+        ))
+    
+    keyboard.add(InlineKeyboardButton("➕ Додати розклад", callback_data=f"access_addschedule_{router_name}"))
+    keyboard.add(InlineKeyboardButton("⬅️ Назад до роутера", callback_data=f"access_router_details_{router_name}"))
+    
+    return keyboard
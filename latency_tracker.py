@@ -0,0 +1,157 @@
+import math
+import threading
+from array import array
+from collections import deque
+from typing import Dict, Optional, Tuple
+from config import (
+    LATENCY_WINDOW, LATENCY_MIN_SAMPLES, LATENCY_EWMA_ALPHA, TIMEOUT_P99_FACTOR,
+    CONNECT_TIMEOUT_FLOOR, CONNECT_TIMEOUT_CEILING, RUN_TIMEOUT_FLOOR, RUN_TIMEOUT_CEILING
+)
+
+# Ключ статистики: (ip, порт), як і в запобіжнику
+Endpoint = Tuple[str, int]
+
+# Кошики гістограми: логарифмічна шкала від 1 мс, кожен наступний на 25% ширший
+HISTOGRAM_BASE = 0.001
+HISTOGRAM_GROWTH = 1.25
+HISTOGRAM_BUCKETS = 72  # верхня межа останнього кошика - близько 2 годин
+
+# Види затримок
+LATENCY_CONNECT = 'connect'
+LATENCY_RUN = 'run'
+
+
+def bucket_index(seconds: float) -> int:
+    """Номер кошика гістограми для затримки"""
+    if seconds <= HISTOGRAM_BASE:
+        return 0
+    index = math.ceil(math.log(seconds / HISTOGRAM_BASE, HISTOGRAM_GROWTH))
+    return min(index, HISTOGRAM_BUCKETS - 1)
+
+
+def bucket_upper_bound(index: int) -> float:
+    """Верхня межа кошика (секунди)"""
+    return HISTOGRAM_BASE * HISTOGRAM_GROWTH ** index
+
+
+class LatencyHistogram:
+    """
+    Компактна ковзна гістограма затримок.
+
+    Зберігає лише номери кошиків останніх window вимірів та лічильники
+    кошиків, тож перцентилі рахуються без сортування, а похибка
+    не перевищує ширини кошика (25%). Окремо ведеться EWMA для відображення.
+    """
+
+    __slots__ = ('_samples', '_counts', 'ewma', 'last', 'total')
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: "deque[int]" = deque(maxlen=window)
+        self._counts = array('I', bytes(4 * HISTOGRAM_BUCKETS))
+        self.ewma: Optional[float] = None
+        self.last: Optional[float] = None
+        self.total = 0
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float, alpha: float = LATENCY_EWMA_ALPHA):
+        """Додає вимір, витісняючи найстаріший"""
+        if len(self._samples) == self._samples.maxlen:
+            self._counts[self._samples[0]] -= 1
+        index = bucket_index(seconds)
+        self._samples.append(index)
+        self._counts[index] += 1
+
+        self.ewma = seconds if self.ewma is None else alpha * seconds + (1 - alpha) * self.ewma
+        self.last = seconds
+        self.total += 1
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Оцінка перцентиля зверху (верхня межа кошика); None - вимірів немає"""
+        if not self._samples:
+            return None
+        rank = max(1, math.ceil(len(self._samples) * percent / 100))
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank:
+                return bucket_upper_bound(index)
+        return bucket_upper_bound(HISTOGRAM_BUCKETS - 1)
+
+
+class LatencyTracker:
+    """
+    Клас для обліку затримок підключення та виконання скриптів на кожному роутері
+    і розрахунку адаптивних таймаутів: p99 × factor в межах [floor, ceiling].
+
+    Поки вимірів менше min_samples, використовуються таймаути з налаштувань роутера.
+    Гістограма виконання спільна для всіх скриптів роутера, тому таймаут
+    виконання з налаштувань - нижня межа: адаптивний таймаут може його лише
+    подовжити, і довгий скрипт (експорт, резервна копія) на роутері, де
+    зазвичай виконуються швидкі скрипти, не обривається.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW,
+                 min_samples: int = LATENCY_MIN_SAMPLES,
+                 factor: float = TIMEOUT_P99_FACTOR,
+                 connect_limits: Tuple[float, float] = (CONNECT_TIMEOUT_FLOOR, CONNECT_TIMEOUT_CEILING),
+                 run_limits: Tuple[float, float] = (RUN_TIMEOUT_FLOOR, RUN_TIMEOUT_CEILING)):
+        self.window = window
+        self.min_samples = min_samples
+        self.factor = factor
+        self.limits = {LATENCY_CONNECT: connect_limits, LATENCY_RUN: run_limits}
+
+        self._histograms: Dict[Tuple[Endpoint, str], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, ip: str, port: int, kind: str, seconds: float):
+        """Фіксує затримку підключення (LATENCY_CONNECT) або виконання (LATENCY_RUN)"""
+        with self._lock:
+            histogram = self._histograms.get(((ip, port), kind))
+            if histogram is None:
+                histogram = LatencyHistogram(self.window)
+                self._histograms[((ip, port), kind)] = histogram
+            histogram.add(seconds)
+
+    def record_connect(self, ip: str, port: int, seconds: float):
+        """Фіксує час встановлення з'єднання"""
+        self.record(ip, port, LATENCY_CONNECT, seconds)
+
+    def record_run(self, ip: str, port: int, seconds: float):
+        """Фіксує час виконання скрипта"""
+        self.record(ip, port, LATENCY_RUN, seconds)
+
+    def _adaptive(self, ip: str, port: int, kind: str, default: float) -> float:
+        """Таймаут за p99 або default, якщо вимірів замало"""
+        with self._lock:
+            histogram = self._histograms.get(((ip, port), kind))
+            if histogram is None or len(histogram) < self.min_samples:
+                return default
+            p99 = histogram.percentile(99)
+
+        floor, ceiling = self.limits[kind]
+        return round(min(max(p99 * self.factor, floor), ceiling), 1)
+
+    def get_timeouts(self, ip: str, port: int, connect_default: float, run_default: float) -> Tuple[float, float]:
+        """Отримує адаптивні таймаути (підключення, виконання) для роутера"""
+        return (self._adaptive(ip, port, LATENCY_CONNECT, connect_default),
+                max(self._adaptive(ip, port, LATENCY_RUN, run_default), run_default))
+
+    def get_stats(self, ip: str, port: int) -> Dict[str, Optional[dict]]:
+        """Статистика затримок роутера для адміністративних екранів (None - вимірів немає)"""
+        stats = {}
+        with self._lock:
+            for kind in (LATENCY_CONNECT, LATENCY_RUN):
+                histogram = self._histograms.get(((ip, port), kind))
+                if histogram is None or not len(histogram):
+                    stats[kind] = None
+                    continue
+                stats[kind] = {
+                    'samples': len(histogram),
+                    'ewma': histogram.ewma,
+                    'last': histogram.last,
+                    'p50': histogram.percentile(50),
+                    'p99': histogram.percentile(99)
+                }
+        return stats
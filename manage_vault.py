@@ -0,0 +1,91 @@
+"""
+Керування зашифрованим сховищем паролів роутерів.
+
+Запуск з кореня проєкту (парольна фраза - зі змінної оточення ROUTER_VAULT_KEY
+або запитується):
+    python manage_vault.py import                         # перенести паролі з налаштувань роутерів у сховище
+    python manage_vault.py set office ssh_password        # задати пароль (запитується без відображення)
+    python manage_vault.py remove office                  # видалити паролі роутера
+
+import працює з поточним сховищем налаштувань (CONFIG_BACKEND) і прибирає з
+нього перенесені паролі.
+"""
+import argparse
+import getpass
+import logging
+import os
+import sys
+from config import VAULT_FILE, VAULT_KEY_ENV
+from config_backends import ADMINS_SECTION, create_config_backend
+from credential_vault import CredentialVault, VaultError, VAULT_FIELDS
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Керування зашифрованим сховищем паролів роутерів")
+    parser.add_argument('--vault', default=VAULT_FILE, help="Файл сховища")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('import', help="Перенести паролі з налаштувань роутерів у сховище")
+    set_parser = commands.add_parser('set', help="Задати пароль роутера")
+    set_parser.add_argument('router')
+    set_parser.add_argument('field', choices=VAULT_FIELDS)
+    remove_parser = commands.add_parser('remove', help="Видалити паролі роутера")
+    remove_parser.add_argument('router')
+    return parser.parse_args()
+
+
+def import_secrets(vault: CredentialVault) -> int:
+    """Переносить паролі з налаштувань роутерів у сховище та прибирає їх з налаштувань"""
+    backend = create_config_backend()
+    try:
+        routers = backend.load_full() if backend.lazy else backend.load()
+        if routers is None:
+            print("Не вдалося прочитати налаштування роутерів")
+            return 1
+
+        moved = 0
+        for name, router in routers.items():
+            if name == ADMINS_SECTION or not isinstance(router, dict):
+                continue
+            for field in VAULT_FIELDS:
+                secret = router.pop(field, None)
+                if secret is not None:
+                    vault.set_secret(name, field, str(secret))
+                    moved += 1
+
+        # Налаштування переписуються лише після того, як усі паролі збережено в сховищі
+        if moved:
+            backend.save(routers)
+    finally:
+        backend.close()
+
+    print(f"Перенесено паролів у {vault.vault_file}: {moved}")
+    return 0
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s - %(message)s')
+    args = parse_args()
+    passphrase = os.environ.get(VAULT_KEY_ENV) or getpass.getpass("Парольна фраза сховища: ")
+    vault = CredentialVault(args.vault, passphrase=passphrase)
+
+    try:
+        if args.command == 'import':
+            return import_secrets(vault)
+        if args.command == 'set':
+            vault.set_secret(args.router, args.field, getpass.getpass(f"{args.field} для {args.router}: "))
+            print(f"Пароль {args.field} роутера {args.router} збережено")
+            return 0
+        removed = vault.remove_router(args.router)
+    except VaultError as e:
+        print(f"Помилка сховища: {e}")
+        return 1
+
+    if not removed:
+        print(f"У сховищі немає паролів роутера {args.router}")
+        return 1
+    print(f"Паролі роутера {args.router} видалено")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
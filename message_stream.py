@@ -0,0 +1,91 @@
+import logging
+import threading
+import time
+from typing import Callable, List
+from config import STREAM_EDIT_INTERVAL
+
+# Ліміт Telegram на довжину повідомлення
+TELEGRAM_MESSAGE_LIMIT = 4096
+# Позначка, що показано лише кінець результату
+TRUNCATED_MARK = '…\n'
+
+
+class ThrottledMessageEditor:
+    """Клас для поступового оновлення одного повідомлення Telegram з обмеженням частоти редагувань"""
+
+    def __init__(self, edit: Callable[[str], None], header: str,
+                 interval: float = STREAM_EDIT_INTERVAL, limit: int = TELEGRAM_MESSAGE_LIMIT):
+        """
+        :param edit: Функція, що замінює текст повідомлення
+        :param header: Заголовок, що показується над результатом
+        :param interval: Мінімальний інтервал між редагуваннями (секунди)
+        :param limit: Максимальна довжина тексту повідомлення
+        """
+        self._edit = edit
+        self.header = header
+        self.interval = interval
+        self.limit = limit
+
+        self._lock = threading.Lock()
+        self._chunks: List[str] = []
+        self._length = 0
+        self._dirty = False
+        self._closed = False
+        self._last_edit = 0.0
+
+    def append(self, chunk: str):
+        """Додає новий фрагмент результату та оновлює повідомлення, якщо минув інтервал"""
+        if not chunk:
+            return
+
+        with self._lock:
+            self._chunks.append(chunk)
+            self._length += len(chunk)
+            self._dirty = True
+            self._trim()
+
+        self.tick()
+
+    def tick(self):
+        """Відправляє накопичені зміни, якщо з моменту останнього редагування минув інтервал"""
+        with self._lock:
+            if self._closed or not self._dirty or time.time() - self._last_edit < self.interval:
+                return
+            text = self._render(self.header)
+            self._dirty = False
+            self._last_edit = time.time()
+
+        try:
+            self._edit(text)
+        except Exception as e:
+            # Проміжне оновлення не критичне - наступне виправить стан
+            logging.warning(f"Не вдалося оновити повідомлення з результатом: {e}")
+
+    def finish(self, header: str) -> str:
+        """
+        Завершує оновлення та повертає фінальний текст з новим заголовком.
+
+        Після виклику проміжні редагування більше не відправляються, тож фінальний
+        текст не буде перезаписаний застарілим.
+        """
+        with self._lock:
+            self._closed = True
+            self._dirty = False
+            return self._render(header)
+
+    def _trim(self):
+        """Відкидає початок результату, що вже не вміщується в повідомлення (викликається під self._lock)"""
+        while len(self._chunks) > 1 and self._length - len(self._chunks[0]) >= self.limit:
+            self._length -= len(self._chunks.pop(0))
+
+    def _render(self, header: str) -> str:
+        """Формує текст повідомлення: заголовок та кінець результату (викликається під self._lock)"""
+        return fit_message(header, ''.join(self._chunks), self.limit)
+
+
+def fit_message(header: str, output: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> str:
+    """Формує текст із заголовком та кінцем результату, що вміщується в limit символів"""
+    available = limit - len(header)
+    if len(output) > available:
+        output = TRUNCATED_MARK + output[-(available - len(TRUNCATED_MARK)):]
+    return header + output
@@ -0,0 +1,70 @@
+"""
+Перенесення налаштувань роутерів між routers.json, базою SQLite та каталогом routers.d.
+
+Запуск з кореня проєкту:
+    python migrate_config.py import routers.json routers.db   # JSON -> SQLite
+    python migrate_config.py import routers.json routers.d    # JSON -> каталог з файлом на роутер
+    python migrate_config.py export routers.db routers.json   # SQLite (або routers.d) -> JSON
+
+Сховище визначається за шляхом: *.db - SQLite, каталог або *.d - routers.d.
+Після імпорту встановіть CONFIG_BACKEND = 'sqlite' або 'sharded' у config.py.
+"""
+import argparse
+import logging
+import os
+import sys
+from config_backends import ADMINS_SECTION, JSONConfigBackend, SQLiteConfigBackend, ShardedConfigBackend
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Перенесення налаштувань роутерів між routers.json, SQLite та routers.d")
+    parser.add_argument('direction', choices=['import', 'export'],
+                        help="import - з JSON у SQLite/routers.d, export - з SQLite/routers.d у JSON")
+    parser.add_argument('source', help="Файл або каталог, з якого читаються дані")
+    parser.add_argument('target', help="Файл або каталог, у який записуються дані (перезаписується)")
+    return parser.parse_args()
+
+
+def open_storage(path: str):
+    """Сховище SQLite або routers.d за шляхом"""
+    if path.endswith('.db'):
+        return SQLiteConfigBackend(path)
+    if os.path.isdir(path) or path.rstrip('/').endswith('.d'):
+        return ShardedConfigBackend(path)
+    raise ValueError(f"не вдалося визначити сховище для {path} (очікується *.db або каталог *.d)")
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s - %(message)s')
+    args = parse_args()
+    if not os.path.exists(args.source):
+        print(f"Файл {args.source} не знайдено")
+        return 1
+
+    try:
+        if args.direction == 'import':
+            source, target = JSONConfigBackend(args.source, write_delay=0), open_storage(args.target)
+        else:
+            source, target = open_storage(args.source), JSONConfigBackend(args.target, write_delay=0)
+    except ValueError as e:
+        print(e)
+        return 1
+
+    try:
+        routers = source.load_full() if source.lazy else source.load()
+        if routers is None:
+            print(f"Не вдалося прочитати {args.source}")
+            return 1
+        target.save(routers)
+    finally:
+        source.close()
+        target.close()
+
+    router_count = sum(1 for name in routers if name != ADMINS_SECTION)
+    admin_count = len(routers.get(ADMINS_SECTION, []))
+    print(f"Перенесено роутерів: {router_count}, адміністраторів: {admin_count} ({args.source} -> {args.target})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
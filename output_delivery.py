@@ -0,0 +1,157 @@
+import gzip
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import List, Optional
+from config import OUTPUT_INLINE_MAX_MESSAGES, OUTPUT_SPOOL_MEMORY_LIMIT
+from message_stream import TELEGRAM_MESSAGE_LIMIT
+
+
+class ScriptOutput:
+    """
+    Клас для накопичення результату скрипта з обмеженим використанням пам'яті.
+
+    Невеликий результат зберігається в пам'яті як є. Коли він перевищує ліміт
+    для відправки повідомленнями, уже накопичене та весь подальший вивід
+    стискаються gzip у тимчасовий файл (до OUTPUT_SPOOL_MEMORY_LIMIT байтів
+    тримається в пам'яті, далі - на диску), а в пам'яті лишаються тільки
+    початок і кінець результату для попереднього перегляду.
+    """
+
+    def __init__(self, inline_limit: int = OUTPUT_INLINE_MAX_MESSAGES * TELEGRAM_MESSAGE_LIMIT,
+                 spool_memory_limit: int = OUTPUT_SPOOL_MEMORY_LIMIT,
+                 preview_size: int = TELEGRAM_MESSAGE_LIMIT):
+        """
+        :param inline_limit: Максимальна довжина результату, що зберігається як текст
+        :param spool_memory_limit: Скільки стиснених байтів тримати в пам'яті до запису на диск
+        :param preview_size: Довжина початку та кінця результату для перегляду
+        """
+        self.inline_limit = inline_limit
+        self.spool_memory_limit = spool_memory_limit
+        self.preview_size = preview_size
+
+        self._lock = threading.Lock()
+        self._chunks: List[str] = []
+        self._length = 0
+        self._head = ''
+        self._tail = ''
+        self._file: Optional[tempfile.SpooledTemporaryFile] = None
+        self._gzip: Optional[gzip.GzipFile] = None
+
+    @classmethod
+    def from_text(cls, text: str) -> 'ScriptOutput':
+        """Створює завершений результат з готового тексту"""
+        output = cls()
+        output.write(text)
+        output.close()
+        return output
+
+    def write(self, text: str):
+        """Додає фрагмент виводу"""
+        if not text:
+            return
+
+        self._length += len(text)
+        if self._gzip is None:
+            self._chunks.append(text)
+            if self._length > self.inline_limit:
+                self._spool()
+            return
+
+        self._gzip.write(text.encode('utf-8'))
+        self._tail = (self._tail + text)[-self.preview_size:]
+
+    def _spool(self):
+        """Переводить накопичений результат у стиснений тимчасовий файл"""
+        text = ''.join(self._chunks)
+        self._chunks = []
+        self._head = text[:self.preview_size]
+        self._tail = text[-self.preview_size:]
+
+        self._file = tempfile.SpooledTemporaryFile(max_size=self.spool_memory_limit)
+        self._gzip = gzip.GzipFile(fileobj=self._file, mode='wb')
+        self._gzip.write(text.encode('utf-8'))
+
+    def close(self):
+        """Завершує запис (після цього стиснений файл можна відправляти)"""
+        if self._gzip is not None and not self._gzip.closed:
+            self._gzip.close()
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def is_spooled(self) -> bool:
+        """Чи завеликий результат для відправки повідомленнями"""
+        return self._file is not None
+
+    @property
+    def compressed_size(self) -> int:
+        """Розмір стисненого результату в байтах"""
+        if self._file is None:
+            return 0
+        with self._lock:
+            self._file.seek(0, 2)
+            return self._file.tell()
+
+    @property
+    def preview(self) -> str:
+        """Початок результату (для невеликого результату - весь текст)"""
+        return self._head if self.is_spooled else ''.join(self._chunks)
+
+    @property
+    def tail(self) -> str:
+        """Кінець результату (для невеликого результату - весь текст)"""
+        return self._tail if self.is_spooled else ''.join(self._chunks)
+
+    def getvalue(self) -> str:
+        """
+        Повертає весь результат як текст.
+
+        Для великого результату це розпаковує його в пам'ять повністю,
+        тому для відправки користувачу слід використовувати compressed_file().
+        """
+        if not self.is_spooled:
+            return ''.join(self._chunks)
+
+        with self.compressed_file() as compressed:
+            with gzip.GzipFile(fileobj=compressed, mode='rb') as decompressed:
+                return decompressed.read().decode('utf-8', errors='replace')
+
+    @contextmanager
+    def compressed_file(self):
+        """
+        Видає стиснений файл, встановлений на початок.
+
+        Файл спільний для всіх, хто отримав цей результат, тому читання
+        виконуються по черзі.
+        """
+        with self._lock:
+            self._file.seek(0)
+            yield self._file
+
+
+def split_message(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+    """
+    Розбиває текст на частини не довші за limit по межах рядків.
+
+    Рядок, довший за limit, розбивається примусово.
+    """
+    parts = []
+    current = ''
+    for line in text.splitlines(keepends=True):
+        while len(line) > limit:
+            if current:
+                parts.append(current)
+                current = ''
+            parts.append(line[:limit])
+            line = line[limit:]
+
+        if len(current) + len(line) > limit:
+            parts.append(current)
+            current = ''
+        current += line
+
+    if current or not parts:
+        parts.append(current)
+    return parts
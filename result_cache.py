@@ -0,0 +1,73 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from config import RESULT_CACHE_MAX_SIZE
+
+
+class ScriptResultCache:
+    """Клас для кешування результатів скриптів лише для читання з LRU-витісненням"""
+
+    def __init__(self, max_size: int = RESULT_CACHE_MAX_SIZE):
+        self.max_size = max_size
+        # (роутер, скрипт) -> (результат, час отримання, TTL)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, router_name: str, script: str) -> Optional[Tuple[str, float]]:
+        """
+        Отримує збережений результат, якщо його TTL ще не минув.
+
+        :return: Кортеж (результат, вік у секундах) або None
+        """
+        key = (router_name, script)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            output, stored_at, ttl = entry
+            age = time.time() - stored_at
+            if age >= ttl:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return output, age
+
+    def put(self, router_name: str, script: str, output: str, ttl: float):
+        """Зберігає результат на ttl секунд"""
+        if ttl <= 0:
+            return
+
+        key = (router_name, script)
+        with self._lock:
+            self._entries[key] = (output, time.time(), ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_router(self, router_name: str):
+        """Видаляє всі результати роутера (після зміни його налаштувань)"""
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == router_name]
+            for key in keys:
+                del self._entries[key]
+
+        if keys:
+            logging.info(f"Кеш результатів роутера {router_name} очищено ({len(keys)} записів)")
+
+    def clear(self):
+        """Очищає кеш результатів"""
+        with self._lock:
+            self._entries.clear()
+        logging.info("Кеш результатів скриптів очищено")
+
+    def get_stats(self) -> dict:
+        """Отримує статистику кешу"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size
+            }
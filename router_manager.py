@@ -1,86 +1,90 @@
-import json
+import hmac
 import logging
-from typing import Dict, List, Optional, Any
-from constants import MESSAGES, LOG_MESSAGES
+from typing import Dict, List, Optional, Any, Tuple
+from config_store import ConfigStore, peek_router
+from router_model import Router
+from credential_vault import CredentialVault
 
 class RouterManager:
-    """Клас для управління роутерами з кешуванням даних"""
+    """Клас для читання налаштувань роутерів зі спільного сховища конфігурації"""
     
-    def __init__(self, config_file: str = 'routers.json'):
-        self.config_file = config_file
-        self._routers_cache = None
-        self._cache_timestamp = 0
-        self._cache_ttl = 300  # 5 хвилин TTL для кешу
-        
-    def _load_routers_from_file(self) -> Dict[str, Any]:
-        """Завантажує роутери з файлу"""
-        try:
-            with open(self.config_file, 'r', encoding='utf-8') as file:
-                routers = json.load(file)
-                logging.info(LOG_MESSAGES['routers_loaded'].format(routers))
-                return routers
-        except FileNotFoundError:
-            logging.error(f"Файл {self.config_file} не знайдено")
-            return {}
-        except json.JSONDecodeError as e:
-            logging.error(f"Помилка парсингу JSON у файлі {self.config_file}: {e}")
-            return {}
-        except Exception as e:
-            logging.error(f"Невідома помилка при завантаженні {self.config_file}: {e}")
-            return {}
-    
-    def _is_cache_valid(self) -> bool:
-        """Перевіряє, чи є кеш актуальним"""
-        import time
-        current_time = time.time()
-        return (self._routers_cache is not None and 
-                current_time - self._cache_timestamp < self._cache_ttl)
+    def __init__(self, store: ConfigStore, vault: Optional[CredentialVault] = None):
+        """
+        :param store: Спільне сховище routers.json (одне на процес)
+        :param vault: Зашифроване сховище паролів роутерів (None - лише паролі з routers.json)
+        """
+        self.store = store
+        self.vault = vault
     
     def get_routers(self, force_reload: bool = False) -> Dict[str, Any]:
-        """Отримує роутери з кешу або файлу"""
-        if force_reload or not self._is_cache_valid():
-            self._routers_cache = self._load_routers_from_file()
-            import time
-            self._cache_timestamp = time.time()
-        
-        return self._routers_cache
+        """Отримує роутери з поточного знімка конфігурації (лише для читання)"""
+        if force_reload:
+            return self.store.reload().routers
+        return self.store.get_snapshot().routers
+    
+    def get_router(self, router_name: str) -> Optional[Router]:
+        """Отримує модель роутера за назвою (None - немає або запис некоректний)"""
+        return self.store.get_snapshot().models.get(router_name)
     
-    def get_router(self, router_name: str) -> Optional[Dict[str, Any]]:
-        """Отримує конкретний роутер за назвою"""
-        routers = self.get_routers()
-        return routers.get(router_name)
+    def get_loaded_router(self, router_name: str) -> Optional[Router]:
+        """Отримує модель роутера без читання файлу routers.d (None - немає або ще не завантажена)"""
+        return peek_router(self.store.get_snapshot().models, router_name)
     
     def user_has_access(self, user_id: int, router_name: str) -> bool:
-        """Перевіряє, чи має користувач доступ до роутера"""
+        """Перевіряє, чи має користувач доступ до роутера (через індекс доступу, O(1))"""
+        return self.store.get_snapshot().access.has_access(user_id, router_name)
+    
+    def get_router_names(self) -> List[str]:
+        """Отримує назви всіх роутерів"""
+        return list(self.store.get_snapshot().models)
+    
+    def get_user_routers(self, user_id: int) -> List[str]:
+        """Отримує список роутерів, до яких має доступ користувач (у порядку routers.json)"""
+        return self.store.get_snapshot().access.get_user_routers(user_id)
+    
+    def get_router_tags(self, router_name: str) -> Tuple[str, ...]:
+        """Отримує теги (групи) роутера"""
         router = self.get_router(router_name)
-        if not router:
-            return False
+        return router.tags if router else ()
+    
+    def get_user_router_groups(self, user_id: int) -> Dict[str, List[str]]:
+        """Групує доступні користувачу роутери за тегами"""
+        groups = {}
+        
+        for router_name in self.get_user_routers(user_id):
+            for tag in self.get_router_tags(router_name):
+                groups.setdefault(tag, []).append(router_name)
         
-        allowed_users = router.get('allowed_users', [])
-        return str(user_id) in allowed_users
+        return groups
     
-    def get_user_routers(self, user_id: int) -> List[str]:
-        """Отримує список роутерів, до яких має доступ користувач"""
-        routers = self.get_routers()
-        user_routers = []
+    def get_common_scripts(self, router_names: List[str]) -> List[str]:
+        """Отримує скрипти, спільні для всіх вказаних роутерів (у порядку першого роутера)"""
+        if not router_names:
+            return []
         
-        for router_name, router_data in routers.items():
-            # Пропускаємо секцію адміністраторів та інші не-роутери
-            if router_name == 'admins' or not isinstance(router_data, dict):
-                continue
-            
-            if self.user_has_access(user_id, router_name):
-                user_routers.append(router_name)
+        common = set(self.get_router_scripts(router_names[0]))
+        for router_name in router_names[1:]:
+            common &= set(self.get_router_scripts(router_name))
         
-        return user_routers
+        return [script for script in self.get_router_scripts(router_names[0]) if script in common]
     
-    def get_router_scripts(self, router_name: str) -> List[str]:
+    def get_router_scripts(self, router_name: str) -> Tuple[str, ...]:
         """Отримує список скриптів для конкретного роутера"""
         router = self.get_router(router_name)
-        if not router:
-            return []
-        
-        return router.get('scripts', [])
+        return router.scripts if router else ()
+    
+    def get_script_cache_ttl(self, router_name: str, script: str) -> int:
+        """Отримує TTL кешу результату скрипта (0 - скрипт не кешується)"""
+        router = self.get_router(router_name)
+        return router.cacheable_scripts.get(script, 0) if router else 0
+    
+    def get_secret(self, router: Router, field: str) -> Optional[str]:
+        """Пароль роутера ('ssh_password' або 'script_password'): зі сховища паролів, інакше з routers.json"""
+        if self.vault is not None:
+            secret = self.vault.get_secret(router.name, field)
+            if secret is not None:
+                return secret
+        return getattr(router, field)
     
     def validate_script_password(self, router_name: str, password: str) -> bool:
         """Перевіряє пароль для виконання скрипта"""
@@ -88,28 +92,16 @@ class RouterManager:
         if not router:
             return False
         
-        return password == router.get('script_password')
-    
-    def get_router_connection_info(self, router_name: str) -> Optional[Dict[str, Any]]:
-        """Отримує інформацію для підключення до роутера"""
-        router = self.get_router(router_name)
-        if not router:
-            return None
-        
-        return {
-            'ip': router.get('ip'),
-            'username': router.get('username'),
-            'ssh_password': router.get('ssh_password'),
-            'ssh_port': router.get('ssh_port', 22)
-        }
+        expected = self.get_secret(router, 'script_password')
+        if expected is None:
+            return False
+        return hmac.compare_digest(password.encode(), expected.encode())
     
     def clear_cache(self):
-        """Очищає кеш роутерів"""
-        self._routers_cache = None
-        self._cache_timestamp = 0
+        """Примусово перечитує routers.json при наступному зверненні"""
+        self.store.reload()
         logging.info("Кеш роутерів очищено")
     
     def reload_routers(self):
         """Примусово перезавантажує роутери з файлу"""
-        self.clear_cache()
-        return self.get_routers(force_reload=True) 
\ No newline at end of file
+        return self.get_routers(force_reload=True)
@@ -0,0 +1,129 @@
+from types import MappingProxyType
+from typing import Any, FrozenSet, Mapping, Optional, Tuple
+from config import (
+    SSH_CONNECT_TIMEOUT, SCRIPT_RUN_TIMEOUT, ADAPTIVE_TIMEOUTS, SSH_MAX_CHANNELS_PER_ROUTER,
+    ROUTEROS_API_PORT, ROUTEROS_API_SSL_PORT
+)
+
+# Підтримувані способи виконання скриптів
+BACKENDS = ('ssh', 'api')
+
+
+class RouterConfigError(ValueError):
+    """Некоректний запис роутера в routers.json"""
+
+
+def _port(name: str, value: Any) -> int:
+    if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= 65535:
+        raise RouterConfigError(f"'{name}' має бути портом 1-65535, отримано {value!r}")
+    return value
+
+
+def _positive(name: str, value: Any) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+        raise RouterConfigError(f"'{name}' має бути додатним числом, отримано {value!r}")
+    return value
+
+
+def _strings(name: str, value: Any) -> Tuple[str, ...]:
+    if not isinstance(value, (list, tuple)):
+        raise RouterConfigError(f"'{name}' має бути списком, отримано {value!r}")
+    return tuple(str(item).strip() for item in value)
+
+
+class Router:
+    """
+    Налаштування одного роутера з routers.json.
+
+    Створюється один раз на версію конфігурації та не змінюється: скрипти й
+    теги зберігаються кортежами, дозволені користувачі - frozenset.
+    """
+
+    __slots__ = (
+        'name', 'ip', 'username', 'ssh_password', 'ssh_port', 'script_password',
+        'allowed_users', 'scripts', 'tags', 'cacheable_scripts',
+        'connect_timeout', 'run_timeout', 'adaptive_timeouts', 'max_channels',
+        'backend', 'api_port', 'api_ssl'
+    )
+
+    def __init__(self, name: str, ip: str, username: Optional[str] = None, ssh_password: Optional[str] = None,
+                 ssh_port: int = 22, script_password: Optional[str] = None,
+                 allowed_users: FrozenSet[str] = frozenset(), scripts: Tuple[str, ...] = (),
+                 tags: Tuple[str, ...] = (), cacheable_scripts: Mapping[str, int] = MappingProxyType({}),
+                 connect_timeout: float = SSH_CONNECT_TIMEOUT, run_timeout: float = SCRIPT_RUN_TIMEOUT,
+                 adaptive_timeouts: bool = ADAPTIVE_TIMEOUTS, max_channels: int = SSH_MAX_CHANNELS_PER_ROUTER,
+                 backend: str = 'ssh', api_port: int = ROUTEROS_API_PORT, api_ssl: bool = False):
+        self.name = name
+        self.ip = ip
+        self.username = username
+        self.ssh_password = ssh_password
+        self.ssh_port = ssh_port
+        self.script_password = script_password
+        self.allowed_users = allowed_users
+        self.scripts = scripts
+        self.tags = tags
+        self.cacheable_scripts = cacheable_scripts
+        self.connect_timeout = connect_timeout
+        self.run_timeout = run_timeout
+        self.adaptive_timeouts = adaptive_timeouts
+        self.max_channels = max_channels
+        self.backend = backend
+        self.api_port = api_port
+        self.api_ssl = api_ssl
+
+    @classmethod
+    def from_config(cls, name: str, data: Mapping[str, Any]) -> 'Router':
+        """
+        Створює роутер із запису routers.json з перевіркою полів.
+
+        :raises RouterConfigError: Якщо запис некоректний
+        """
+        if not isinstance(data, Mapping):
+            raise RouterConfigError("запис роутера має бути об'єктом")
+
+        ip = data.get('ip')
+        if not isinstance(ip, str) or not ip.strip():
+            raise RouterConfigError("не вказано 'ip'")
+
+        backend = data.get('backend', 'ssh')
+        if backend not in BACKENDS:
+            raise RouterConfigError(f"'backend' має бути одним з {', '.join(BACKENDS)}, отримано {backend!r}")
+
+        max_channels = data.get('max_channels', SSH_MAX_CHANNELS_PER_ROUTER)
+        if isinstance(max_channels, bool) or not isinstance(max_channels, int) or max_channels < 1:
+            raise RouterConfigError(f"'max_channels' має бути цілим числом від 1, отримано {max_channels!r}")
+
+        cacheable = data.get('cacheable_scripts', {})
+        if not isinstance(cacheable, Mapping):
+            raise RouterConfigError(f"'cacheable_scripts' має бути об'єктом, отримано {cacheable!r}")
+        cacheable_scripts = {}
+        for script, ttl in cacheable.items():
+            if isinstance(ttl, bool) or not isinstance(ttl, int) or ttl < 0:
+                raise RouterConfigError(f"TTL кешу скрипта '{script}' має бути цілим числом від 0, отримано {ttl!r}")
+            cacheable_scripts[script] = ttl
+
+        api_ssl = bool(data.get('api_ssl', False))
+        return cls(
+            name=name,
+            ip=ip.strip(),
+            username=data.get('username'),
+            ssh_password=data.get('ssh_password'),
+            ssh_port=_port('ssh_port', data.get('ssh_port', 22)),
+            script_password=data.get('script_password'),
+            allowed_users=frozenset(_strings('allowed_users', data.get('allowed_users', []))),
+            scripts=_strings('scripts', data.get('scripts', [])),
+            tags=_strings('tags', data.get('tags', [])),
+            cacheable_scripts=MappingProxyType(cacheable_scripts),
+            connect_timeout=_positive('connect_timeout', data.get('connect_timeout', SSH_CONNECT_TIMEOUT)),
+            run_timeout=_positive('run_timeout', data.get('run_timeout', SCRIPT_RUN_TIMEOUT)),
+            adaptive_timeouts=bool(data.get('adaptive_timeouts', ADAPTIVE_TIMEOUTS)),
+            max_channels=max_channels,
+            backend=backend,
+            api_port=_port('api_port', data.get('api_port', ROUTEROS_API_SSL_PORT if api_ssl else ROUTEROS_API_PORT)),
+            api_ssl=api_ssl
+        )
+
+    @property
+    def port(self) -> int:
+        """Порт, через який бот підключається до роутера (за ним ведеться облік запобіжника)"""
+        return self.api_port if self.backend == 'api' else self.ssh_port
@@ -0,0 +1,381 @@
+import logging
+import socket
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+from circuit_breaker import CircuitBreaker
+from config import ROUTEROS_API_PORT, STREAM_POLL_INTERVAL
+from constants import MESSAGES
+from execution_engine import ExecutionCancelled, ExecutionTimeout
+from latency_tracker import LatencyTracker
+from output_delivery import ScriptOutput
+
+# Ключ пулу: (ip, порт, ім'я користувача)
+APIPoolKey = Tuple[str, int, str]
+
+# Помилки, після яких сокет API вважається мертвим
+DEAD_API_ERRORS = (OSError, EOFError)
+
+
+class RouterOSAPIError(Exception):
+    """Роутер відхилив запит API (!trap або !fatal)"""
+
+
+class RouterOSAuthError(RouterOSAPIError):
+    """Роутер відхилив облікові дані API"""
+
+
+def encode_length(length: int) -> bytes:
+    """Кодує довжину слова за протоколом RouterOS API"""
+    if length < 0x80:
+        return bytes([length])
+    if length < 0x4000:
+        return (length | 0x8000).to_bytes(2, 'big')
+    if length < 0x200000:
+        return (length | 0xC00000).to_bytes(3, 'big')
+    if length < 0x10000000:
+        return (length | 0xE0000000).to_bytes(4, 'big')
+    return b'\xF0' + length.to_bytes(4, 'big')
+
+
+def encode_sentence(words: List[str]) -> bytes:
+    """Кодує речення API: слова з довжинами та порожнє слово в кінці"""
+    data = bytearray()
+    for word in words:
+        encoded = word.encode('utf-8')
+        data += encode_length(len(encoded))
+        data += encoded
+    data += b'\x00'
+    return bytes(data)
+
+
+def parse_reply(sentence: List[str]) -> Tuple[str, Dict[str, str]]:
+    """Розбирає речення відповіді на тип (!re, !done, !trap, !fatal) та атрибути"""
+    attributes = {}
+    for word in sentence[1:]:
+        if word.startswith('='):
+            name, _, value = word[1:].partition('=')
+            attributes[name] = value
+        elif word.startswith('.tag='):
+            attributes['.tag'] = word[5:]
+    return sentence[0] if sentence else '', attributes
+
+
+class RouterOSAPIConnection:
+    """Постійне з'єднання з бінарним API RouterOS"""
+
+    def __init__(self, ip: str, port: int, username: str, password: str,
+                 use_ssl: bool = False, connect_timeout: Optional[float] = None):
+        self.ip = ip
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.connect_timeout = connect_timeout
+        self._socket: Optional[socket.socket] = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self._socket is not None
+
+    def open(self):
+        """Відкриває сокет та виконує вхід"""
+        sock = socket.create_connection((self.ip, self.port), timeout=self.connect_timeout)
+        if self.use_ssl:
+            # RouterOS зазвичай використовує самопідписаний сертифікат
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+            sock = context.wrap_socket(sock, server_hostname=self.ip)
+        self._socket = sock
+
+        # Вхід теж обмежуємо таймаутом підключення, щоб роутер, що мовчить, не тримав потік
+        deadline = time.monotonic() + self.connect_timeout if self.connect_timeout else None
+        try:
+            replies = self.talk(['/login', f'=name={self.username}', f'=password={self.password}'], deadline=deadline)
+        except ExecutionTimeout:
+            self.close()
+            raise socket.timeout(f"RouterOS API {self.ip}:{self.port} не відповів на вхід")
+        except Exception:
+            self.close()
+            raise
+
+        for reply_type, attributes in replies:
+            if reply_type in ('!trap', '!fatal'):
+                self.close()
+                raise RouterOSAuthError(attributes.get('message', 'вхід відхилено'))
+        logging.info(f"Відкрито з'єднання з RouterOS API {self.ip}:{self.port}")
+
+    def close(self):
+        """Закриває сокет, ігноруючи помилки"""
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except Exception:
+                pass
+            self._socket = None
+
+    def talk(self, words: List[str], on_idle: Optional[Callable[[], None]] = None,
+             cancel_event: Optional[threading.Event] = None,
+             deadline: Optional[float] = None) -> List[Tuple[str, Dict[str, str]]]:
+        """
+        Відправляє команду та читає відповіді до !done.
+
+        Якщо читання перервано (скасування або таймаут), сокет лишається
+        посеред відповіді, тому з'єднання потрібно закрити.
+        """
+        self._socket.settimeout(STREAM_POLL_INTERVAL)
+        self._socket.sendall(encode_sentence(words))
+
+        replies = []
+        while True:
+            reply_type, attributes = parse_reply(self._read_sentence(on_idle, cancel_event, deadline))
+            replies.append((reply_type, attributes))
+            if reply_type == '!fatal':
+                self.close()
+                raise RouterOSAPIError(attributes.get('message', 'роутер закрив з\'єднання'))
+            if reply_type == '!done':
+                return replies
+
+    def _read_sentence(self, on_idle, cancel_event, deadline) -> List[str]:
+        """Читає одне речення відповіді"""
+        words = []
+        while True:
+            length = self._read_length(on_idle, cancel_event, deadline)
+            if length == 0:
+                return words
+            words.append(self._read_exact(length, on_idle, cancel_event, deadline).decode('utf-8', errors='replace'))
+
+    def _read_length(self, on_idle, cancel_event, deadline) -> int:
+        """Читає закодовану довжину слова"""
+        first = self._read_exact(1, on_idle, cancel_event, deadline)[0]
+        if first & 0x80 == 0:
+            return first
+        if first & 0xC0 == 0x80:
+            extra, mask = 1, 0x3F
+        elif first & 0xE0 == 0xC0:
+            extra, mask = 2, 0x1F
+        elif first & 0xF0 == 0xE0:
+            extra, mask = 3, 0x0F
+        else:
+            return int.from_bytes(self._read_exact(4, on_idle, cancel_event, deadline), 'big')
+        rest = self._read_exact(extra, on_idle, cancel_event, deadline)
+        return int.from_bytes(bytes([first & mask]) + rest, 'big')
+
+    def _read_exact(self, size: int, on_idle, cancel_event, deadline) -> bytes:
+        """Читає рівно size байтів, перевіряючи скасування та таймаут під час очікування"""
+        data = bytearray()
+        while len(data) < size:
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExecutionCancelled()
+            if deadline is not None and time.monotonic() > deadline:
+                raise ExecutionTimeout()
+            try:
+                chunk = self._socket.recv(size - len(data))
+            except socket.timeout:
+                if on_idle:
+                    on_idle()
+                continue
+            if not chunk:
+                raise EOFError("RouterOS API закрив з'єднання")
+            data += chunk
+        return bytes(data)
+
+
+class _PooledAPIConnection:
+    """Запис пулу: з'єднання API та блокування на час запиту"""
+
+    def __init__(self):
+        self.connection: Optional[RouterOSAPIConnection] = None
+        self.lock = threading.Lock()
+
+
+class RouterOSAPIPool:
+    """Клас для постійних з'єднань з API роутерів (одне з'єднання на роутер)"""
+
+    def __init__(self, on_connect: Optional[Callable[[str, int, float], None]] = None):
+        """
+        :param on_connect: Отримує (ip, порт, секунди) після кожного підключення або його таймауту
+        """
+        self.on_connect = on_connect
+        self._connections: Dict[APIPoolKey, _PooledAPIConnection] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self, ip: str, port: int, username: str, password: str,
+                   use_ssl: bool = False, connect_timeout: Optional[float] = None):
+        """
+        Видає відкрите з'єднання роутера на час одного запиту.
+
+        Запити через одне з'єднання виконуються по черзі. Після будь-якої
+        помилки з'єднання закривається й наступний запит відкриє нове.
+        """
+        key = (ip, port, username)
+        with self._lock:
+            entry = self._connections.setdefault(key, _PooledAPIConnection())
+
+        with entry.lock:
+            conn = entry.connection
+            if conn is None or not conn.is_connected or conn.password != password:
+                if conn is not None:
+                    conn.close()
+                conn = RouterOSAPIConnection(ip, port, username, password, use_ssl, connect_timeout)
+                entry.connection = None
+                started = time.monotonic()
+                try:
+                    conn.open()
+                except socket.timeout:
+                    self._report_connect(ip, port, time.monotonic() - started)
+                    raise
+                self._report_connect(ip, port, time.monotonic() - started)
+                entry.connection = conn
+
+            try:
+                yield conn
+            except Exception:
+                conn.close()
+                entry.connection = None
+                raise
+            if self._connections.get(key) is not entry:
+                # Запис прибрано з пулу (close_router) під час запиту
+                conn.close()
+                entry.connection = None
+
+    def _report_connect(self, ip: str, port: int, seconds: float):
+        if self.on_connect is not None:
+            try:
+                self.on_connect(ip, port, seconds)
+            except Exception as e:
+                logging.error(f"Помилка обліку часу підключення до {ip}:{port}: {e}")
+
+    def close_router(self, ip: str, port: int, username: str):
+        """
+        Закриває з'єднання з роутером (наприклад, після зміни його адреси чи облікових даних).
+
+        З'єднання, яким зараз користуються, прибирається з пулу й закривається
+        після завершення поточного запиту.
+        """
+        with self._lock:
+            entry = self._connections.pop((ip, port, username), None)
+        if entry is None or not entry.lock.acquire(blocking=False):
+            return
+        try:
+            if entry.connection is not None:
+                entry.connection.close()
+                entry.connection = None
+        finally:
+            entry.lock.release()
+        logging.info(f"Закрито з'єднання RouterOS API з {ip}:{port} після зміни налаштувань роутера")
+
+    def close_all(self):
+        """Закриває всі з'єднання пулу"""
+        with self._lock:
+            entries = list(self._connections.values())
+            self._connections.clear()
+
+        for entry in entries:
+            if entry.connection is not None:
+                entry.connection.close()
+        logging.info("Усі з'єднання RouterOS API закрито")
+
+
+class RouterAPIClient:
+    """Клієнт виконання скриптів через бінарний API RouterOS (замість SSH)"""
+
+    def __init__(self, ip: str, username: str, password: str, pool: RouterOSAPIPool,
+                 breaker: CircuitBreaker, api_port: int = ROUTEROS_API_PORT, use_ssl: bool = False,
+                 connect_timeout: Optional[float] = None, run_timeout: float = 300,
+                 latency: Optional[LatencyTracker] = None):
+        """
+        :param ip: IP-адреса маршрутизатора
+        :param username: Ім'я користувача
+        :param password: Пароль
+        :param pool: Пул постійних з'єднань API
+        :param breaker: Запобіжник доступності
+        :param api_port: Порт API (8728, для API-SSL - 8729)
+        :param use_ssl: Використовувати API-SSL
+        :param connect_timeout: Таймаут підключення (секунди)
+        :param run_timeout: Максимальний час виконання скрипта (секунди)
+        :param latency: Облік затримок для адаптивних таймаутів
+        """
+        self.ip = ip
+        self.username = username
+        self.password = password
+        self.pool = pool
+        self.breaker = breaker
+        self.api_port = api_port
+        self.use_ssl = use_ssl
+        self.connect_timeout = connect_timeout
+        self.run_timeout = run_timeout
+        self.latency = latency
+
+    def stream_script(self, script: str, on_output: Optional[Callable[[str], None]] = None,
+                      on_idle: Optional[Callable[[], None]] = None,
+                      cancel_event: Optional[threading.Event] = None) -> Tuple[Optional[int], ScriptOutput]:
+        """
+        Виконання скрипта через API з тим самим інтерфейсом, що й RouterSSHClient.stream_script.
+
+        API повертає вивід скрипта цілим після завершення, тому on_output
+        викликається один раз.
+
+        :return: Кортеж (0 або 1 для !trap, None у разі помилки; результат або текст помилки)
+        """
+        if not self.breaker.allow(self.ip, self.api_port):
+            status = self.breaker.get_status(self.ip, self.api_port)
+            return None, ScriptOutput.from_text(
+                MESSAGES['circuit_open'].format(self.ip, status['consecutive_failures'], status['retry_in'])
+            )
+
+        try:
+            with self.pool.connection(self.ip, self.api_port, self.username, self.password,
+                                      self.use_ssl, self.connect_timeout) as conn:
+                started = time.monotonic()
+                deadline = started + self.run_timeout
+                replies = conn.talk(
+                    ['/execute', f'=script=/system script run {script}', '=as-string='],
+                    on_idle, cancel_event, deadline
+                )
+                if self.latency is not None:
+                    self.latency.record_run(self.ip, self.api_port, time.monotonic() - started)
+            self.breaker.record_success(self.ip, self.api_port)
+        except Exception as e:
+            return None, ScriptOutput.from_text(self._handle_error(e))
+
+        exit_status = 0
+        output = ScriptOutput()
+        for reply_type, attributes in replies:
+            if reply_type == '!trap':
+                exit_status = 1
+                output.write(attributes.get('message', '') + '\n')
+            elif 'ret' in attributes:
+                output.write(attributes['ret'])
+        output.close()
+
+        if on_output and len(output):
+            on_output(output.tail)
+        return exit_status, output
+
+    def _handle_error(self, error: Exception) -> str:
+        """Фіксує помилку в запобіжнику та повертає її опис для користувача"""
+        if isinstance(error, ExecutionCancelled):
+            logging.info(f"Виконання скрипта на {self.ip} через API скасовано")
+            return MESSAGES['execution_cancelled']
+        if isinstance(error, ExecutionTimeout):
+            if self.latency is not None:
+                self.latency.record_run(self.ip, self.api_port, self.run_timeout)
+            logging.warning(f"Скрипт на {self.ip} перевищив час виконання {self.run_timeout} с")
+            return MESSAGES['execution_timeout'].format(self.run_timeout)
+        if isinstance(error, RouterOSAuthError):
+            # Роутер відповідає - це не проблема доступності
+            self.breaker.record_success(self.ip, self.api_port)
+            logging.error(f"Помилка аутентифікації RouterOS API: {error}")
+            return "Помилка аутентифікації. Перевірте правильність пароля SSH."
+        if isinstance(error, DEAD_API_ERRORS):
+            self.breaker.record_failure(self.ip, self.api_port, str(error))
+            logging.error(f"Помилка з'єднання з RouterOS API: {error}")
+            return MESSAGES['api_connection_error'].format(self.ip, self.api_port)
+
+        logging.error(f"Помилка RouterOS API: {error}")
+        return MESSAGES['api_error'].format(error)
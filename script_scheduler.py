@@ -0,0 +1,306 @@
+import json
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Set, Tuple
+from config import SCHEDULES_FILE, SCHEDULE_JITTER
+from constants import MESSAGES
+from config_backends import write_json_atomic
+
+# Допустимі значення полів cron: хвилина, година, день місяця, місяць, день тижня
+CRON_FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+# Ліміт Telegram на довжину повідомлення
+TELEGRAM_MESSAGE_LIMIT = 4096
+# Максимальна довжина фрагмента результату в зведенні
+DIGEST_LINE_LIMIT = 120
+# Скільки пропущених хвилин наздоганяти, якщо потік розкладу запізнився
+MAX_CATCH_UP_MINUTES = 5
+
+
+class CronExpression:
+    """Вираз розкладу у форматі cron: "хвилина година день місяць день_тижня" """
+
+    def __init__(self, expression: str):
+        """
+        :param expression: Наприклад "0 3 * * *" (щодня о 03:00) або "*/15 8-18 * * 1-5"
+        :raises ValueError: Якщо вираз некоректний
+        """
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError("очікується 5 полів: хвилина година день місяць день_тижня")
+
+        self.expression = ' '.join(fields)
+        self._values = [self._parse_field(field, low, high) for field, (low, high) in zip(fields, CRON_FIELD_RANGES)]
+        # Неділя може бути записана як 0 або 7
+        if 7 in self._values[4]:
+            self._values[4].add(0)
+        self._day_restricted = fields[2] != '*'
+        self._weekday_restricted = fields[4] != '*'
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> Set[int]:
+        """Розбирає одне поле: *, число, діапазон, список та крок"""
+        values = set()
+        for item in field.split(','):
+            item_range, _, step_text = item.partition('/')
+            step = int(step_text) if step_text else 1
+            if step < 1:
+                raise ValueError(f"некоректний крок у '{item}'")
+
+            if item_range == '*':
+                start, end = low, high
+            elif '-' in item_range:
+                start_text, _, end_text = item_range.partition('-')
+                start, end = int(start_text), int(end_text)
+            else:
+                start = int(item_range)
+                end = high if step_text else start
+
+            if start < low or end > high or start > end:
+                raise ValueError(f"значення '{item}' поза межами {low}-{high}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def matches(self, moment: datetime) -> bool:
+        """Перевіряє, чи припадає хвилина moment на розклад"""
+        minutes, hours, days, months, weekdays = self._values
+        if moment.minute not in minutes or moment.hour not in hours or moment.month not in months:
+            return False
+
+        day_match = moment.day in days
+        weekday_match = (moment.weekday() + 1) % 7 in weekdays
+        # Як у cron: якщо обмежено і день місяця, і день тижня, достатньо збігу одного з них
+        if self._day_restricted and self._weekday_restricted:
+            return day_match or weekday_match
+        return day_match and weekday_match
+
+
+class ScheduleStore:
+    """Клас для зберігання розкладів запусків у JSON-файлі поруч з routers.json"""
+
+    def __init__(self, config_file: str = SCHEDULES_FILE):
+        self.config_file = config_file
+        self._lock = threading.Lock()
+
+    def _load(self) -> List[dict]:
+        """Завантажує розклади з файлу"""
+        try:
+            with open(self.config_file, 'r', encoding='utf-8') as file:
+                return json.load(file).get('schedules', [])
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            logging.error(f"Помилка завантаження розкладів з {self.config_file}: {e}")
+            return []
+
+    def _save(self, schedules: List[dict]):
+        """Зберігає розклади у файл"""
+        write_json_atomic(self.config_file, {'schedules': schedules})
+
+    def get_schedules(self, router_name: Optional[str] = None) -> List[dict]:
+        """Отримує всі розклади або розклади одного роутера"""
+        with self._lock:
+            schedules = self._load()
+        if router_name is None:
+            return schedules
+        return [entry for entry in schedules if entry['router'] == router_name]
+
+    def add_schedule(self, router_name: str, script: str, cron: str, created_by: str = '') -> Tuple[bool, str]:
+        """Додає розклад запуску скрипта на роутері"""
+        try:
+            expression = CronExpression(cron)
+        except ValueError as e:
+            return False, f"Некоректний розклад '{cron}': {e}"
+
+        with self._lock:
+            schedules = self._load()
+            if any(entry['router'] == router_name and entry['script'] == script and
+                   entry['cron'] == expression.expression for entry in schedules):
+                return False, f"Такий розклад для скрипта '{script}' вже існує"
+
+            schedule_id = max((entry['id'] for entry in schedules), default=0) + 1
+            schedules.append({
+                'id': schedule_id,
+                'router': router_name,
+                'script': script,
+                'cron': expression.expression,
+                'created_by': created_by
+            })
+            try:
+                self._save(schedules)
+            except Exception as e:
+                logging.error(f"Помилка збереження розкладів: {e}")
+                return False, f"Помилка збереження розкладу: {e}"
+
+        logging.info(f"Додано розклад #{schedule_id}: скрипт '{script}' на роутері {router_name} ({expression.expression})")
+        return True, f"Розклад #{schedule_id} додано: скрипт '{script}' на роутері '{router_name}' ({expression.expression})"
+
+    def remove_schedule(self, schedule_id: int) -> Tuple[bool, str, Optional[dict]]:
+        """Видаляє розклад; повертає також видалений запис"""
+        with self._lock:
+            schedules = self._load()
+            removed = next((entry for entry in schedules if entry['id'] == schedule_id), None)
+            if removed is None:
+                return False, f"Розклад #{schedule_id} не знайдено", None
+
+            schedules.remove(removed)
+            try:
+                self._save(schedules)
+            except Exception as e:
+                logging.error(f"Помилка збереження розкладів: {e}")
+                return False, f"Помилка видалення розкладу: {e}", None
+
+        logging.info(f"Видалено розклад #{schedule_id}: скрипт '{removed['script']}' на роутері {removed['router']}")
+        return True, f"Розклад #{schedule_id} видалено", removed
+
+
+class ScheduledBatch:
+    """Запуски, що припали на одну хвилину розкладу; після завершення всіх формується зведення"""
+
+    def __init__(self, moment: datetime, entries: List[dict], on_complete: Callable[[str], None]):
+        self.moment = moment
+        self._on_complete = on_complete
+        self._lock = threading.Lock()
+        self._pending = len(entries)
+        self._results: List[Tuple[dict, bool, str]] = []
+
+    def complete(self, entry: dict, success: bool, output: str):
+        """Фіксує результат одного запуску; останній запуск відправляє зведення"""
+        with self._lock:
+            self._results.append((entry, success, output))
+            self._pending -= 1
+            finished = self._pending == 0
+
+        if finished:
+            try:
+                self._on_complete(self.render())
+            except Exception as e:
+                logging.error(f"Помилка відправки зведення запусків за розкладом: {e}")
+
+    def render(self) -> str:
+        """Формує текст зведення"""
+        with self._lock:
+            results = sorted(self._results, key=lambda result: (result[0]['router'], result[0]['script']))
+
+        succeeded = sum(1 for _, success, _ in results if success)
+        lines = [MESSAGES['schedule_digest_header'].format(self.moment.strftime('%Y-%m-%d %H:%M'), succeeded, len(results))]
+        for entry, success, output in results:
+            line = f"{'✅' if success else '❌'} {entry['router']} — {entry['script']}"
+            first_line = next((text.strip() for text in output.splitlines() if text.strip()), '')
+            if first_line:
+                if len(first_line) > DIGEST_LINE_LIMIT:
+                    first_line = first_line[:DIGEST_LINE_LIMIT - 1] + '…'
+                line += f": {first_line}"
+            lines.append(line)
+
+        text = "\n".join(lines)
+        if len(text) > TELEGRAM_MESSAGE_LIMIT:
+            text = text[:TELEGRAM_MESSAGE_LIMIT - 1] + '…'
+        return text
+
+
+class ScriptScheduler:
+    """
+    Клас для запуску скриптів за розкладом.
+
+    Щохвилини визначає розклади, що припали на поточну хвилину, і
+    розподіляє їх запуск випадково в межах jitter секунд, щоб усі роутери
+    не отримали команду одночасно. Самі запуски передаються у submit
+    (фоновий пул виконання з обмеженою чергою).
+    """
+
+    def __init__(self, store: ScheduleStore,
+                 submit: Callable[[ScheduledBatch, dict], bool],
+                 on_digest: Callable[[str], None],
+                 jitter: float = SCHEDULE_JITTER):
+        """
+        :param store: Сховище розкладів
+        :param submit: Ставить запуск у чергу; повертає False, якщо черга переповнена
+        :param on_digest: Отримує текст зведення, коли всі запуски хвилини завершились
+        :param jitter: Максимальна випадкова затримка запуску (секунди)
+        """
+        self.store = store
+        self.submit = submit
+        self.on_digest = on_digest
+        self.jitter = jitter
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        # Після stop() жоден запуск вже не потрапить у пул виконання
+        self._dispatch_lock = threading.Lock()
+        self._last_minute: Optional[datetime] = None
+
+    def start(self):
+        """Запускає фоновий потік розкладу (тільки один раз)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._last_minute = datetime.now().replace(second=0, microsecond=0)
+        self._thread = threading.Thread(target=self._run, name="script-scheduler", daemon=True)
+        self._thread.start()
+        logging.info("Запущено виконання скриптів за розкладом")
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Зупиняє фоновий потік і чекає на його завершення.
+
+        Запуски, що вже в черзі пулу, завершаться; відкладені (jitter) вже не
+        передаються в пул і позначаються скасованими.
+        """
+        with self._dispatch_lock:
+            self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        """Прокидається на початку кожної хвилини та запускає розклади, що настали"""
+        while not self._stop_event.wait(60 - time.time() % 60 + 0.1):
+            current = datetime.now().replace(second=0, microsecond=0)
+            minute = max(self._last_minute + timedelta(minutes=1), current - timedelta(minutes=MAX_CATCH_UP_MINUTES))
+            while minute <= current:
+                try:
+                    self.run_due(minute)
+                except Exception as e:
+                    logging.error(f"Помилка запуску скриптів за розкладом: {e}")
+                minute += timedelta(minutes=1)
+            self._last_minute = current
+
+    def run_due(self, moment: datetime) -> int:
+        """Запускає розклади, що припали на хвилину moment; повертає їх кількість"""
+        due = []
+        for entry in self.store.get_schedules():
+            try:
+                if CronExpression(entry['cron']).matches(moment):
+                    due.append(entry)
+            except ValueError as e:
+                logging.error(f"Некоректний розклад #{entry.get('id')}: {e}")
+
+        if not due:
+            return 0
+
+        logging.info(f"За розкладом на {moment.strftime('%H:%M')} запускається {len(due)} скриптів")
+        batch = ScheduledBatch(moment, due, self.on_digest)
+        for entry in due:
+            timer = threading.Timer(random.uniform(0, self.jitter), self._dispatch, args=(batch, entry))
+            timer.daemon = True
+            timer.start()
+        return len(due)
+
+    def _dispatch(self, batch: ScheduledBatch, entry: dict):
+        """Передає один запуск у пул виконання"""
+        with self._dispatch_lock:
+            if self._stop_event.is_set():
+                submitted, error = False, MESSAGES['execution_cancelled']
+            else:
+                try:
+                    submitted, error = self.submit(batch, entry), MESSAGES['execution_queue_full']
+                except Exception as e:
+                    # Інакше запуск лишився б незавершеним і зведення за хвилину не надійшло б
+                    logging.error(f"Помилка запуску розкладу #{entry.get('id')}: {e}")
+                    submitted, error = False, str(e)
+        if not submitted:
+            batch.complete(entry, False, error)
@@ -0,0 +1,131 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class _Flight:
+    """Виконання, що триває: його учасники та ідентифікатор завдання"""
+
+    __slots__ = ('participants', 'handle')
+
+    def __init__(self):
+        # Учасник -> (ID користувача, функція отримання результату)
+        self.participants: "OrderedDict[Hashable, Tuple[Optional[int], Callable[[Any], None]]]" = OrderedDict()
+        self.handle: Any = None
+
+
+class SingleFlight:
+    """
+    Клас для об'єднання однакових одночасних виконань в одне.
+
+    Кожен, хто запросив виконання (і той, хто його запустив, і ті, хто
+    приєднався), є учасником зі своїм ідентифікатором, наприклад
+    (chat_id, message_id) повідомлення з ходом виконання. Учасник може вийти
+    з виконання (leave); саме виконання варто скасовувати лише тоді, коли
+    учасників не лишилося.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        # Учасник -> ключ виконання, в якому він бере участь
+        self._participants: Dict[Hashable, Hashable] = {}
+        self._lock = threading.Lock()
+
+    def join(self, key: Hashable, on_result: Callable[[Any], None],
+             participant: Optional[Hashable] = None, owner_id: Optional[int] = None) -> bool:
+        """
+        Додає учасника до виконання з таким самим ключем або починає нове.
+
+        :param key: Ключ виконання, наприклад (роутер, скрипт)
+        :param on_result: Викликається з результатом, коли виконання завершиться
+        :param participant: Ідентифікатор учасника для leave() (за замовчуванням - унікальний)
+        :param owner_id: ID користувача, від імені якого учасник приєднався
+        :return: True - приєднано до наявного виконання;
+                 False - виконання немає, викликач став лідером і має викликати complete()
+        """
+        if participant is None:
+            participant = object()
+        with self._lock:
+            flight = self._flights.get(key)
+            joined = flight is not None
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+            flight.participants[participant] = (owner_id, on_result)
+            self._participants[participant] = key
+            return joined
+
+    def set_handle(self, key: Hashable, handle: Any) -> List[Hashable]:
+        """
+        Запам'ятовує ідентифікатор завдання виконання (наприклад, для кнопки скасування).
+
+        :return: Учасники, що вже приєднались до виконання
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                return []
+            flight.handle = handle
+            return list(flight.participants)
+
+    def get_handle(self, key: Hashable) -> Any:
+        """Ідентифікатор завдання виконання (None - ще не відомий або виконання завершено)"""
+        with self._lock:
+            flight = self._flights.get(key)
+            return flight.handle if flight is not None else None
+
+    def get_owner(self, participant: Hashable) -> Tuple[bool, Optional[int]]:
+        """Пара (чи бере учасник участь у виконанні, ID його користувача)"""
+        with self._lock:
+            key = self._participants.get(participant)
+            if key is None:
+                return False, None
+            return True, self._flights[key].participants[participant][0]
+
+    def is_participant(self, participant: Hashable) -> bool:
+        """Чи чекає учасник на результат виконання"""
+        with self._lock:
+            return participant in self._participants
+
+    def leave(self, participant: Hashable) -> Optional[Tuple[Hashable, Any, int]]:
+        """
+        Виводить учасника з виконання: результат йому вже не передається.
+
+        :return: (ключ, ідентифікатор завдання, кількість учасників, що лишились)
+                 або None, якщо учасник не бере участі (виконання вже завершено)
+        """
+        with self._lock:
+            key = self._participants.pop(participant, None)
+            if key is None:
+                return None
+            flight = self._flights[key]
+            del flight.participants[participant]
+            return key, flight.handle, len(flight.participants)
+
+    def complete(self, key: Hashable, result: Any):
+        """Завершує виконання та передає результат усім учасникам, що лишились"""
+        with self._lock:
+            flight = self._flights.pop(key, None)
+            if flight is None:
+                return
+            for participant in flight.participants:
+                self._participants.pop(participant, None)
+
+        for _, on_result in flight.participants.values():
+            try:
+                on_result(result)
+            except Exception as e:
+                logging.error(f"Помилка передачі спільного результату для {key}: {e}")
+
+    def is_in_flight(self, key: Hashable) -> bool:
+        """Перевіряє, чи триває виконання з таким ключем"""
+        with self._lock:
+            return key in self._flights
+
+    def get_stats(self) -> dict:
+        """Отримує кількість поточних виконань та тих, хто на них чекає"""
+        with self._lock:
+            return {
+                'in_flight': len(self._flights),
+                'waiters': sum(len(flight.participants) for flight in self._flights.values())
+            }
@@ -0,0 +1,345 @@
+import logging
+import socket
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Optional, Tuple
+from fabric import Connection
+from paramiko.ssh_exception import SSHException
+from config import SSH_POOL_MAX_SIZE, SSH_POOL_IDLE_TIMEOUT, SSH_KEEPALIVE_INTERVAL, SSH_MAX_CHANNELS_PER_ROUTER
+
+# Ключ пулу: (ip, порт, ім'я користувача)
+PoolKey = Tuple[str, int, str]
+
+# Помилки, після яких з'єднання вважається мертвим
+DEAD_CONNECTION_ERRORS = (SSHException, EOFError, socket.error)
+
+# Чи відкрито exec-канал у поточному потоці (run повторює команду лише до відкриття каналу)
+_channel_state = threading.local()
+
+
+class _TrackedConnection(Connection):
+    """З'єднання Fabric, що позначає в потоці виклику момент відкриття exec-каналу"""
+
+    def create_session(self):
+        channel = super().create_session()
+        _channel_state.opened = True
+        return channel
+
+
+class _PooledConnection:
+    """Запис пулу: відкрите з'єднання та його службові дані"""
+
+    def __init__(self, connection: Connection, ssh_password: str, max_channels: int):
+        self.connection = connection
+        self.ssh_password = ssh_password
+        # Блокування на час (пере)підключення
+        self.lock = threading.Lock()
+        # Обмеження одночасних каналів через одне з'єднання
+        self.channels = threading.BoundedSemaphore(max_channels)
+        self.last_used = time.time()
+        self.in_use = 0
+        # Запис прибрано з пулу, поки ним користувались - закривається після звільнення
+        self.retired = False
+
+    def is_alive(self) -> bool:
+        """Перевіряє, чи активний транспорт з'єднання"""
+        try:
+            return bool(self.connection.is_connected)
+        except Exception:
+            return False
+
+    def close(self):
+        """Закриває з'єднання, ігноруючи помилки"""
+        try:
+            self.connection.close()
+        except Exception:
+            pass
+
+
+class SSHConnectionPool:
+    """Клас для повторного використання SSH-з'єднань з роутерами"""
+
+    def __init__(self, max_size: int = SSH_POOL_MAX_SIZE,
+                 idle_timeout: int = SSH_POOL_IDLE_TIMEOUT,
+                 keepalive_interval: int = SSH_KEEPALIVE_INTERVAL,
+                 max_channels: int = SSH_MAX_CHANNELS_PER_ROUTER,
+                 on_connect: Optional[Callable[[str, int, float], None]] = None):
+        """
+        :param on_connect: Отримує (ip, порт, секунди) після кожного підключення або його таймауту
+        """
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self.max_channels = max_channels
+        self.on_connect = on_connect
+        self._connections: "OrderedDict[PoolKey, _PooledConnection]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _create_connection(self, ip: str, username: str, ssh_password: str, ssh_port: int,
+                           connect_timeout: Optional[float] = None) -> Connection:
+        """Створює та відкриває нове з'єднання через Fabric"""
+        conn = _TrackedConnection(
+            host=ip,
+            user=username,
+            connect_kwargs={"password": ssh_password},
+            port=ssh_port,
+            connect_timeout=connect_timeout
+        )
+        started = time.monotonic()
+        try:
+            conn.open()
+        except socket.timeout:
+            # Таймаут теж враховуємо, інакше повільний роутер не отримав би довшого таймауту
+            self._report_connect(ip, ssh_port, time.monotonic() - started)
+            raise
+        self._report_connect(ip, ssh_port, time.monotonic() - started)
+        if self.keepalive_interval and conn.transport:
+            conn.transport.set_keepalive(self.keepalive_interval)
+        logging.info(f"Відкрито SSH-з'єднання з {ip}:{ssh_port}")
+        return conn
+
+    def _report_connect(self, ip: str, ssh_port: int, seconds: float):
+        if self.on_connect is not None:
+            try:
+                self.on_connect(ip, ssh_port, seconds)
+            except Exception as e:
+                logging.error(f"Помилка обліку часу підключення до {ip}:{ssh_port}: {e}")
+
+    def evict_idle(self):
+        """
+        Закриває з'єднання, що простоювали довше idle_timeout.
+
+        Викликається під час кожної видачі з'єднання та періодично фоновою
+        перевіркою роутерів (HealthMonitor), тож простій не триває довше
+        за idle_timeout плюс інтервал перевірки.
+        """
+        with self._lock:
+            self._evict_idle()
+
+    def _evict_idle(self):
+        """Закриває з'єднання, що простоювали довше idle_timeout (викликається під self._lock)"""
+        now = time.time()
+        for key in list(self._connections.keys()):
+            entry = self._connections[key]
+            if entry.in_use == 0 and now - entry.last_used > self.idle_timeout:
+                del self._connections[key]
+                entry.close()
+                logging.info(f"Закрито SSH-з'єднання з {key[0]}:{key[1]} після простою")
+
+    def _evict_lru(self) -> bool:
+        """Звільняє місце, закриваючи найдавніше невикористовуване з'єднання"""
+        for key, entry in self._connections.items():
+            if entry.in_use == 0:
+                del self._connections[key]
+                entry.close()
+                return True
+        return False
+
+    def _reserve(self, key: PoolKey, ssh_password: str, max_channels: int) -> Optional[_PooledConnection]:
+        """Резервує запис пулу для ключа або повертає None, якщо пул переповнений"""
+        with self._lock:
+            self._evict_idle()
+
+            entry = self._connections.get(key)
+            if entry is not None and entry.ssh_password != ssh_password and entry.in_use == 0:
+                # Облікові дані змінилися - старе з'єднання більше не придатне
+                del self._connections[key]
+                entry.close()
+                entry = None
+
+            if entry is None:
+                if len(self._connections) >= self.max_size and not self._evict_lru():
+                    return None
+                entry = _PooledConnection(None, ssh_password, max_channels)
+                self._connections[key] = entry
+
+            self._connections.move_to_end(key)
+            entry.in_use += 1
+            return entry
+
+    def _release(self, key: PoolKey, entry: _PooledConnection):
+        """Повертає запис у пул після використання"""
+        with self._lock:
+            entry.in_use -= 1
+            entry.last_used = time.time()
+            retired = entry.retired and entry.in_use == 0
+        if retired:
+            entry.close()
+
+    def _discard(self, key: PoolKey, entry: _PooledConnection, connection: Connection):
+        """Видаляє мертве з'єднання з пулу"""
+        with self._lock:
+            if self._connections.get(key) is entry and entry.connection is connection:
+                del self._connections[key]
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def _checkout(self, ip: str, username: str, ssh_password: str, ssh_port: int,
+                  connect_timeout: Optional[float] = None, max_channels: Optional[int] = None):
+        """
+        Видає пару (з'єднання, чи було воно використане повторно).
+
+        Одне з'єднання одночасно обслуговує до max_channels викликачів, кожен
+        зі своїм каналом; решта чекає, поки канал звільниться.
+        """
+        key = (ip, ssh_port, username)
+        entry = self._reserve(key, ssh_password, max_channels or self.max_channels)
+
+        if entry is None:
+            conn = self._create_connection(ip, username, ssh_password, ssh_port, connect_timeout)
+            try:
+                yield conn, False
+            finally:
+                conn.close()
+            return
+
+        try:
+            with entry.channels:
+                with entry.lock:
+                    reused = entry.connection is not None and entry.is_alive()
+                    if not reused:
+                        if entry.connection is not None:
+                            logging.warning(f"SSH-з'єднання з {ip}:{ssh_port} втрачено, перепідключення")
+                            entry.close()
+                            entry.connection = None
+                        entry.connection = self._create_connection(ip, username, ssh_password, ssh_port, connect_timeout)
+                        entry.ssh_password = ssh_password
+                    conn = entry.connection
+
+                try:
+                    yield conn, reused
+                except DEAD_CONNECTION_ERRORS:
+                    # Помилка каналу (наприклад, роутер відмовив у новій сесії)
+                    # не означає, що транспорт мертвий для інших каналів
+                    if not conn.is_connected:
+                        self._discard(key, entry, conn)
+                    raise
+        finally:
+            self._release(key, entry)
+
+    @contextmanager
+    def connection(self, ip: str, username: str, ssh_password: str, ssh_port: int = 22,
+                   connect_timeout: Optional[float] = None, max_channels: Optional[int] = None):
+        """
+        Видає живе з'єднання з пулу на час виконання команди.
+
+        Мертвий транспорт перевідкривається автоматично. Якщо пул переповнений,
+        видається тимчасове з'єднання, яке закривається після використання.
+        """
+        with self._checkout(ip, username, ssh_password, ssh_port, connect_timeout, max_channels) as (conn, _):
+            yield conn
+
+    def run(self, ip: str, username: str, ssh_password: str, ssh_port: int, command: str,
+            connect_timeout: Optional[float] = None, max_channels: Optional[int] = None, **run_kwargs):
+        """
+        Виконує команду через з'єднання з пулу.
+
+        Якщо повторно використане з'єднання виявилося мертвим ще до відкриття
+        exec-каналу, команда виконується через нове з'єднання. Помилка після
+        відкриття каналу передається викликачу: команда могла вже частково
+        виконатися, і повторний запуск неідемпотентного скрипта неприпустимий.
+        """
+        reused = False
+        _channel_state.opened = False
+        try:
+            with self._checkout(ip, username, ssh_password, ssh_port, connect_timeout, max_channels) as (conn, reused):
+                return conn.run(command, **run_kwargs)
+        except DEAD_CONNECTION_ERRORS as e:
+            if _channel_state.opened or not reused:
+                raise
+            logging.warning(f"Повторна спроба виконання на {ip}:{ssh_port} після помилки з'єднання: {e}")
+
+        with self.connection(ip, username, ssh_password, ssh_port, connect_timeout, max_channels) as conn:
+            return conn.run(command, **run_kwargs)
+
+    @contextmanager
+    def session(self, ip: str, username: str, ssh_password: str, ssh_port: int = 22,
+                connect_timeout: Optional[float] = None, max_channels: Optional[int] = None):
+        """
+        Відкриває новий exec-канал поверх з'єднання з пулу.
+
+        Якщо канал не вдалося відкрити на повторно використаному з'єднанні,
+        спроба повторюється через нове з'єднання.
+        """
+        reused = False
+        opened = False
+        try:
+            with self._checkout(ip, username, ssh_password, ssh_port, connect_timeout, max_channels) as (conn, reused):
+                channel = conn.transport.open_session()
+                opened = True
+                try:
+                    yield channel
+                finally:
+                    channel.close()
+                return
+        except DEAD_CONNECTION_ERRORS as e:
+            if opened or not reused:
+                raise
+            logging.warning(f"Повторне відкриття каналу до {ip}:{ssh_port} після помилки з'єднання: {e}")
+
+        with self._checkout(ip, username, ssh_password, ssh_port, connect_timeout, max_channels) as (conn, _):
+            channel = conn.transport.open_session()
+            try:
+                yield channel
+            finally:
+                channel.close()
+
+    def probe(self, ip: str, username: str, ssh_password: str, ssh_port: int = 22,
+              connect_timeout: Optional[float] = None) -> float:
+        """
+        Відкриває з'єднання заздалегідь (якщо його ще немає) та вимірює час відповіді.
+
+        Замість команди відправляється keepalive-запит транспорту, тож роутер
+        не запускає жодної сесії, а з'єднання не закривається як неактивне.
+
+        :return: Час відповіді роутера (секунди)
+        """
+        with self._checkout(ip, username, ssh_password, ssh_port, connect_timeout) as (conn, _):
+            started = time.monotonic()
+            # Роутер може відповісти відмовою - це теж повний обмін з ним
+            conn.transport.global_request('keepalive@openssh.com', wait=True)
+            return time.monotonic() - started
+
+    def get_stats(self) -> dict:
+        """Отримує статистику пулу"""
+        with self._lock:
+            return {
+                'size': len(self._connections),
+                'max_size': self.max_size,
+                'in_use': sum(1 for entry in self._connections.values() if entry.in_use)
+            }
+
+    def close_router(self, ip: str, ssh_port: int, username: str):
+        """
+        Закриває з'єднання з роутером (наприклад, після зміни його адреси чи облікових даних).
+
+        З'єднання, яким зараз користуються, прибирається з пулу й закривається
+        після завершення останньої команди.
+        """
+        key = (ip, ssh_port, username)
+        with self._lock:
+            entry = self._connections.pop(key, None)
+            if entry is None:
+                return
+            if entry.in_use:
+                entry.retired = True
+                entry = None
+
+        if entry is not None:
+            entry.close()
+        logging.info(f"Закрито SSH-з'єднання з {ip}:{ssh_port} після зміни налаштувань роутера")
+
+    def close_all(self):
+        """Закриває всі з'єднання пулу"""
+        with self._lock:
+            entries = list(self._connections.values())
+            self._connections.clear()
+
+        for entry in entries:
+            entry.close()
+        logging.info("Усі SSH-з'єднання пулу закрито")
@@ -0,0 +1,30 @@
+import json
+import os
+import stat
+
+import pytest
+
+from config_backends import write_json_atomic
+
+
+def test_write_json_atomic_replaces_file_and_keeps_mode(tmp_path):
+    path = tmp_path / 'routers.json'
+    path.write_text('{}')
+    os.chmod(path, 0o640)
+
+    write_json_atomic(str(path), {'router': 'офіс'})
+
+    assert json.loads(path.read_text(encoding='utf-8')) == {'router': 'офіс'}
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    assert os.listdir(tmp_path) == ['routers.json']
+
+
+def test_write_json_atomic_failure_keeps_previous_version(tmp_path):
+    path = tmp_path / 'routers.json'
+    path.write_text('{"a": 1}')
+
+    with pytest.raises(TypeError):
+        write_json_atomic(str(path), {'a': object()})
+
+    assert json.loads(path.read_text()) == {'a': 1}
+    assert os.listdir(tmp_path) == ['routers.json']
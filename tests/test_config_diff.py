@@ -0,0 +1,83 @@
+from config_backends import REVISION_FIELD
+from config_diff import ConfigDiff, RouterChange, ROUTER_ADDED, ROUTER_CHANGED, ROUTER_REMOVED
+
+ROUTER = {
+    'ip': '10.0.0.1', 'username': 'admin', 'ssh_password': 'secret',
+    'allowed_users': ['1', '2'], 'scripts': ['status', 'backup'], 'tags': ['office']
+}
+
+
+def changed(**fields):
+    return RouterChange('r1', ROUTER, {**ROUTER, **fields})
+
+
+def test_added_and_removed_routers():
+    added = RouterChange('r1', None, ROUTER)
+    removed = RouterChange('r1', ROUTER, None)
+    assert added.kind == ROUTER_ADDED and added.users_added == {'1', '2'}
+    assert removed.kind == ROUTER_REMOVED and removed.scripts_removed == {'status', 'backup'}
+    for change in (added, removed):
+        assert change.connection_changed and change.affects_results()
+
+
+def test_users_only_change_keeps_results_and_connections():
+    change = changed(allowed_users=['2', '3'])
+    assert change.kind == ROUTER_CHANGED
+    assert change.users_added == {'3'} and change.users_removed == {'1'}
+    assert not change.fields_changed
+    assert not change.affects_results()
+    assert not change.connection_changed
+
+
+def test_tags_only_change_keeps_results():
+    change = changed(tags=['branch'])
+    assert change.fields_changed == {'tags'}
+    assert not change.affects_results()
+    assert not change.connection_changed
+
+
+def test_scripts_change_affects_results_only():
+    change = changed(scripts=['status', 'reboot'])
+    assert change.scripts_added == {'reboot'} and change.scripts_removed == {'backup'}
+    assert change.affects_results()
+    assert not change.connection_changed
+
+
+def test_connection_fields_close_connections():
+    assert changed(ip='10.0.0.2').connection_changed
+    assert changed(ssh_password='other').connection_changed
+    assert changed(**{REVISION_FIELD: 2}).connection_changed
+    assert not changed(run_timeout=60).connection_changed
+    assert changed(run_timeout=60).affects_results()
+
+
+def test_describe_lists_field_names_without_values():
+    change = changed(ip='10.0.0.2', ssh_password='other', allowed_users=['1'], scripts=['status', 'backup', 'x'])
+    text = change.describe()
+    assert text == "~r1 (користувачі +0/−1; скрипти +1/−0; поля: ip, ssh_password)"
+    assert 'other' not in text
+
+
+def test_between_skips_admins_and_invalid_entries():
+    old = {'admins': ['1'], 'r1': ROUTER, 'r2': ROUTER, 'broken': 'x'}
+    new = {'admins': ['1', '2'], 'r1': {**ROUTER, 'ip': '10.0.0.9'}, 'r3': ROUTER, 'broken': 'y'}
+    diff = ConfigDiff.between(old, new, {'admins', 'r1', 'r2', 'r3', 'broken'})
+
+    assert [(change.name, change.kind) for change in diff.changes] == [
+        ('r1', ROUTER_CHANGED), ('r2', ROUTER_REMOVED), ('r3', ROUTER_ADDED)
+    ]
+    assert diff.admins_changed
+    assert diff.summary() == ("додано 1, видалено 1, змінено 1; ~r1 (поля: ip), −r2, +r3; "
+                              "змінено список адміністраторів")
+
+
+def test_empty_diff_is_false():
+    diff = ConfigDiff.between({'r1': ROUTER}, {'r1': ROUTER}, set())
+    assert not diff
+    assert diff.summary() == "додано 0, видалено 0, змінено 0"
+
+
+def test_summary_truncates_long_lists():
+    names = {f"r{i:02d}" for i in range(12)}
+    diff = ConfigDiff.between({}, {name: ROUTER for name in names}, names)
+    assert diff.summary().endswith("+r09, та ще 2")
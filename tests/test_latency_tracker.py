@@ -0,0 +1,45 @@
+import pytest
+
+from latency_tracker import LatencyHistogram, bucket_index, bucket_upper_bound
+
+
+def test_empty_histogram_has_no_percentiles():
+    assert LatencyHistogram().percentile(99) is None
+
+
+def test_percentile_is_upper_bound_of_bucket():
+    histogram = LatencyHistogram(window=100)
+    for _ in range(90):
+        histogram.add(0.010)
+    for _ in range(10):
+        histogram.add(1.0)
+
+    p50 = histogram.percentile(50)
+    p99 = histogram.percentile(99)
+    assert 0.010 <= p50 <= 0.010 * 1.25
+    assert 1.0 <= p99 <= 1.0 * 1.25
+    assert histogram.percentile(90) == p50
+
+
+def test_window_evicts_oldest_samples():
+    histogram = LatencyHistogram(window=3)
+    for seconds in (5.0, 5.0, 5.0, 0.002, 0.002, 0.002):
+        histogram.add(seconds)
+    assert len(histogram) == 3
+    assert histogram.percentile(100) == bucket_upper_bound(bucket_index(0.002))
+    assert histogram.total == 6 and histogram.last == 0.002
+
+
+def test_ewma():
+    histogram = LatencyHistogram()
+    histogram.add(1.0, alpha=0.5)
+    histogram.add(3.0, alpha=0.5)
+    assert histogram.ewma == pytest.approx(2.0)
+
+
+def test_bucket_bounds():
+    assert bucket_index(0.0) == 0
+    assert bucket_index(0.001) == 0
+    assert bucket_index(10 ** 6) == bucket_index(10 ** 7)
+    for seconds in (0.0015, 0.3, 12.0):
+        assert seconds <= bucket_upper_bound(bucket_index(seconds)) < seconds * 1.25
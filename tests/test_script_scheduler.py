@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import pytest
+
+from script_scheduler import CronExpression, ScheduledBatch
+
+
+def test_parse_field_star_range_list_and_step():
+    assert CronExpression._parse_field('*', 0, 5) == {0, 1, 2, 3, 4, 5}
+    assert CronExpression._parse_field('8-11', 0, 23) == {8, 9, 10, 11}
+    assert CronExpression._parse_field('1,5,7', 0, 59) == {1, 5, 7}
+    assert CronExpression._parse_field('*/15', 0, 59) == {0, 15, 30, 45}
+    assert CronExpression._parse_field('10-20/5', 0, 59) == {10, 15, 20}
+    # Число з кроком означає "від числа до кінця діапазону"
+    assert CronExpression._parse_field('50/5', 0, 59) == {50, 55}
+
+
+@pytest.mark.parametrize('field', ['60', '5-4', '*/0', '-1', 'a', '1-'])
+def test_parse_field_rejects_invalid_values(field):
+    with pytest.raises(ValueError):
+        CronExpression._parse_field(field, 0, 59)
+
+
+@pytest.mark.parametrize('expression', ['* * * *', '0 24 * * *', '0 0 0 * *', '0 0 * 13 *', '0 0 * * 8'])
+def test_expression_rejects_invalid(expression):
+    with pytest.raises(ValueError):
+        CronExpression(expression)
+
+
+@pytest.mark.parametrize('weekday', ['0', '7'])
+def test_sunday_is_0_or_7(weekday):
+    cron = CronExpression(f"0 3 * * {weekday}")
+    assert cron.matches(datetime(2026, 10, 18, 3, 0))  # неділя
+    assert not cron.matches(datetime(2026, 10, 19, 3, 0))  # понеділок
+
+
+def test_matches_minute_hour_and_weekdays():
+    cron = CronExpression("*/15 8-18 * * 1-5")
+    assert cron.matches(datetime(2026, 10, 16, 8, 45))  # п'ятниця
+    assert not cron.matches(datetime(2026, 10, 16, 8, 40))
+    assert not cron.matches(datetime(2026, 10, 16, 19, 0))
+    assert not cron.matches(datetime(2026, 10, 17, 9, 0))  # субота
+
+
+def test_day_and_weekday_restricted_match_either():
+    cron = CronExpression("0 0 1 * 1")
+    assert cron.matches(datetime(2026, 10, 1, 0, 0))  # 1-ше число, четвер
+    assert cron.matches(datetime(2026, 10, 5, 0, 0))  # понеділок
+    assert not cron.matches(datetime(2026, 10, 6, 0, 0))
+
+
+def test_batch_sends_digest_once_after_last_run():
+    digests = []
+    entries = [{'router': 'b', 'script': 'backup'}, {'router': 'a', 'script': 'status'}]
+    batch = ScheduledBatch(datetime(2026, 10, 17, 3, 0), entries, digests.append)
+
+    batch.complete(entries[0], False, "\n  timeout\nmore")
+    assert digests == []
+    batch.complete(entries[1], True, "ok")
+
+    assert len(digests) == 1
+    lines = digests[0].splitlines()
+    assert "2026-10-17 03:00" in lines[0] and "1 з 2" in lines[0]
+    assert lines[1:] == ["✅ a — status: ok", "❌ b — backup: timeout"]
+
+
+def test_batch_digest_error_does_not_propagate():
+    def fail(_):
+        raise RuntimeError("telegram")
+
+    entry = {'router': 'a', 'script': 's'}
+    batch = ScheduledBatch(datetime(2026, 10, 17, 3, 0), [entry], fail)
+    batch.complete(entry, True, "")
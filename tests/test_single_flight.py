@@ -0,0 +1,54 @@
+from single_flight import SingleFlight
+
+
+def test_joiners_share_the_leaders_result():
+    flight = SingleFlight()
+    results = []
+    assert not flight.join('key', lambda result: results.append(('leader', result)), participant=(1, 10), owner_id=1)
+    assert flight.join('key', lambda result: results.append(('joiner', result)), participant=(2, 20), owner_id=2)
+    assert flight.set_handle('key', 7) == [(1, 10), (2, 20)]
+    assert flight.get_owner((2, 20)) == (True, 2)
+
+    flight.complete('key', 'done')
+
+    assert results == [('leader', 'done'), ('joiner', 'done')]
+    assert not flight.is_in_flight('key')
+    assert not flight.is_participant((1, 10))
+    assert flight.get_stats() == {'in_flight': 0, 'waiters': 0}
+
+
+def test_leave_detaches_only_that_participant():
+    flight = SingleFlight()
+    results = []
+    flight.join('key', lambda result: results.append('leader'), participant='a')
+    flight.join('key', lambda result: results.append('joiner'), participant='b')
+    flight.set_handle('key', 7)
+
+    assert flight.leave('a') == ('key', 7, 1)
+    assert flight.leave('a') is None
+    flight.complete('key', 'done')
+
+    assert results == ['joiner']
+
+
+def test_last_leave_reports_no_participants_left():
+    flight = SingleFlight()
+    flight.join('key', lambda result: None, participant='a')
+    assert flight.leave('a') == ('key', None, 0)
+    # Виконання лишається до complete(): скасування вирішує викликач
+    assert flight.is_in_flight('key')
+    flight.complete('key', None)
+    assert not flight.is_in_flight('key')
+
+
+def test_callback_error_does_not_stop_other_participants():
+    flight = SingleFlight()
+    results = []
+
+    def fail(_):
+        raise RuntimeError("send failed")
+
+    flight.join('key', fail)
+    flight.join('key', results.append)
+    flight.complete('key', 'done')
+    assert results == ['done']
@@ -1,4 +1,4 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from constants import USER_STATES
 
 class UserStateManager:
@@ -63,6 +63,26 @@ class UserStateManager:
         self.set_state(user_id, USER_STATES['waiting_for_confirmation'], 
                       router=router_name, script=script)
     
+    def set_selecting_routers(self, user_id: int, router_names: List[str]):
+        """Встановлює стан вибору кількох роутерів"""
+        self.set_state(user_id, USER_STATES['waiting_for_multi_routers'], routers=list(router_names))
+    
+    def set_waiting_for_multi_script(self, user_id: int, router_names: List[str]):
+        """Встановлює стан очікування вибору скрипта для кількох роутерів"""
+        self.set_state(user_id, USER_STATES['waiting_for_multi_script'], routers=list(router_names))
+    
+    def set_waiting_for_multi_password(self, user_id: int, script: str):
+        """Встановлює стан очікування пароля для групового запуску"""
+        self.set_state(user_id, USER_STATES['waiting_for_multi_password'], script=script)
+    
+    def set_waiting_for_multi_confirmation(self, user_id: int, script: str):
+        """Встановлює стан очікування підтвердження для групового запуску"""
+        self.set_state(user_id, USER_STATES['waiting_for_multi_confirmation'], script=script)
+    
+    def get_selected_routers(self, user_id: int) -> List[str]:
+        """Отримує список вибраних роутерів для групового запуску"""
+        return list(self.get_user_data(user_id, 'routers', []))
+    
     def get_router_name(self, user_id: int) -> Optional[str]:
         """Отримує назву роутера з стану користувача"""
         return self.get_user_data(user_id, 'router')